@@ -1,11 +1,185 @@
-from fastapi import APIRouter
-from datetime import datetime
-from app.schemas.response import AnalysisResponse
+import json
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from typing import List, Optional
+from app.schemas.response import AnalysisResponse, BatchResponse
 from app.schemas.request import AnalysisRequest
-from app.services.pipeline import run_analysis
+from app.services import profiling
+from app.services.batch import item_error, run_batch
+from app.services.bgzf import is_bgzf
+from app.services.llm_service import request_deadline
+from app.services.parser import VcfAccumulator
+from app.services.pipeline import run_analysis, analyze_variants, evaluate_request, stream_analysis
+from app.services.serialization import respond
+from app.services.vcf_stream import VcfStreamDecoder, iter_file_chunks, parse_indexed_vcf, parse_vcf_stream
 
 router = APIRouter()
 
 @router.post("/analyze", response_model=AnalysisResponse)
-def analyze(request: AnalysisRequest):
-    return run_analysis(request)
\ No newline at end of file
+def analyze(request: AnalysisRequest, http_request: Request):
+    if profiling.profile_requested(http_request):
+        return profiled_analyze(request, http_request)
+    return respond(http_request, run_analysis(request))
+
+def profiled_analyze(request: AnalysisRequest, http_request: Request):
+    # X-Profile-Token requests (PROFILE_TOKEN set): the analysis runs under a profiler
+    # and X-Profile-Id names the stored profile, also on error responses.
+    profiling.authorize(http_request)
+    mode = profiling.requested_mode(http_request)
+    with profiling.profile_session(mode, label=f"analyze {request.patient_id}") as session:
+        try:
+            response = run_analysis(request)
+        except HTTPException as exc:
+            exc.headers = {**(exc.headers or {}), "X-Profile-Id": session["id"]}
+            raise
+    result = respond(http_request, response)
+    if not isinstance(result, Response):
+        result = JSONResponse(result)
+    result.headers["X-Profile-Id"] = session["id"]
+    return result
+
+
+async def _encode_events(events, sse: bool):
+    async for event, data in events:
+        if sse:
+            yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        else:
+            yield json.dumps({"event": event, "data": data}) + "\n"
+
+@router.post("/analyze/stream")
+async def analyze_stream(
+    request: AnalysisRequest,
+    http_request: Request,
+    stream_format: Optional[str] = Query(None, alias="format", pattern="^(ndjson|sse)$"),
+):
+    # Same input as /analyze. Deterministic results are sent as soon as they are known
+    # and each explanation follows as its own event; see stream_analysis for the order.
+    # NDJSON by default, Server-Sent Events with ?format=sse or Accept: text/event-stream.
+    sse = stream_format == "sse" or (
+        stream_format is None and "text/event-stream" in http_request.headers.get("accept", "")
+    )
+    deadline = request_deadline()
+    # Validation and CPIC errors surface here as ordinary 4xx responses.
+    parsed_variants, results, missing_genes = await run_in_threadpool(evaluate_request, request)
+    events = stream_analysis(request.patient_id, request.drugs, parsed_variants, results, missing_genes, deadline)
+    return StreamingResponse(
+        _encode_events(events, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _split_drugs(values) -> list:
+    drugs = []
+    for value in values or []:
+        drugs.extend(d.strip() for d in str(value).split(",") if d.strip())
+    return drugs
+
+def _consume_chunk(decoder: VcfStreamDecoder, accumulator: VcfAccumulator, chunk: bytes):
+    for block in decoder.feed_blocks(chunk):
+        accumulator.add_text(block)
+
+def _finish_stream(decoder: VcfStreamDecoder, accumulator: VcfAccumulator) -> list:
+    for block in decoder.close_blocks():
+        accumulator.add_text(block)
+    return accumulator.variants()
+
+
+async def parse_uploaded_file(upload, index=None) -> list:
+    # A multipart VCF field; an `index` field (.tbi/.csi) next to a BGZF file limits
+    # decoding to the PGx loci.
+    if index is not None and not isinstance(index, str) and is_bgzf(await upload.read(18)):
+        index_data = await index.read()
+        await upload.seek(0)
+        return await run_in_threadpool(parse_indexed_vcf, upload.file, index_data)
+    await upload.seek(0)
+    return await run_in_threadpool(parse_vcf_stream, iter_file_chunks(upload.file))
+
+async def parse_request_body(request: Request) -> list:
+    # The raw (optionally chunked, plain/gzip/BGZF) request body, parsed as it arrives.
+    decoder = VcfStreamDecoder()
+    accumulator = VcfAccumulator()
+    async for chunk in request.stream():
+        if chunk:
+            await run_in_threadpool(_consume_chunk, decoder, accumulator, chunk)
+    return await run_in_threadpool(_finish_stream, decoder, accumulator)
+
+
+@router.post("/analyze/upload", response_model=AnalysisResponse)
+async def analyze_upload(
+    request: Request,
+    patient_id: Optional[str] = None,
+    drugs: Optional[List[str]] = Query(None),
+):
+    # Accepts .vcf, .vcf.gz or BGZF either as a multipart `file` field or as the raw
+    # (optionally chunked) request body, and parses it incrementally. A multipart
+    # `index` field (.tbi/.csi) next to a BGZF file limits decoding to the PGx loci.
+    drug_values = drugs or []
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        async with request.form() as form:
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Multipart upload requires a 'file' field")
+            patient_id = form.get("patient_id") or patient_id
+            drug_values = form.getlist("drugs") or drug_values
+            parsed_variants = await parse_uploaded_file(upload, form.get("index"))
+    else:
+        if not patient_id or not _split_drugs(drug_values):
+            raise HTTPException(status_code=400, detail="patient_id and drugs are required")
+        parsed_variants = await parse_request_body(request)
+
+    drug_list = _split_drugs(drug_values)
+    if not patient_id or not drug_list:
+        raise HTTPException(status_code=400, detail="patient_id and drugs are required")
+
+    response = await run_in_threadpool(analyze_variants, patient_id, drug_list, parsed_variants)
+    return await run_in_threadpool(respond, request, response)
+
+
+NDJSON_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+
+@router.post("/analyze/batch", response_model=BatchResponse)
+async def analyze_batch(request: Request):
+    # Body is a JSON array of AnalysisRequest payloads (or {"requests": [...]}), or
+    # newline-delimited JSON with one payload per line. Items fail independently.
+    content_type = request.headers.get("content-type", "")
+    payloads, errors = [], {}
+
+    if content_type.startswith(NDJSON_TYPES):
+        pending = b""
+
+        def take(raw: bytes):
+            line = raw.strip()
+            if not line:
+                return
+            try:
+                payloads.append(json.loads(line))
+            except ValueError as exc:
+                errors[len(payloads)] = item_error(400, f"Invalid JSON: {exc}")
+                payloads.append(None)
+
+        async for chunk in request.stream():
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                take(line)
+        take(pending)
+    else:
+        try:
+            body = json.loads(await request.body() or b"null")
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {exc}")
+        if isinstance(body, dict):
+            body = body.get("requests")
+        if not isinstance(body, list):
+            raise HTTPException(status_code=400, detail="Expected a JSON array of analysis requests")
+        payloads = body
+
+    if not payloads:
+        raise HTTPException(status_code=400, detail="Batch is empty")
+
+    response = await run_in_threadpool(run_batch, payloads, errors)
+    return await run_in_threadpool(respond, request, response)
@@ -0,0 +1,96 @@
+import asyncio
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from app.api.analyze import NDJSON_TYPES, _split_drugs
+from app.schemas.response import CohortReportResponse
+from app.services.batch import BATCH_PROCESS_THRESHOLD, for_pool, get_executor
+from app.services.serialization import respond
+from app.services.vcf_stream import VcfStreamDecoder
+
+router = APIRouter()
+
+
+def _feed_cohort(decoder: VcfStreamDecoder, accumulator, chunk: bytes):
+    for line in decoder.feed(chunk):
+        accumulator.add_line(line)
+
+def _finish_cohort(decoder: VcfStreamDecoder, accumulator, report):
+    for line in decoder.close():
+        accumulator.add_line(line)
+    report.add_cohort(accumulator.genotypes())
+
+
+async def _report_ndjson(request: Request, report):
+    from app.services.cohort_report import COHORT_REPORT_CHUNK_SIZE, report_payloads
+
+    # Patients are evaluated in chunks as lines arrive; past BATCH_PROCESS_THRESHOLD
+    # chunks the process pool takes them, with a bounded number in flight.
+    chunk, pending, chunks, executor = [], [], 0, None
+    pending_bytes = b""
+
+    async def flush():
+        nonlocal chunk, chunks, executor
+        if not chunk:
+            return
+        chunks += 1
+        if executor is None and chunks >= BATCH_PROCESS_THRESHOLD:
+            executor = get_executor()
+        if executor is None:
+            report.merge(await run_in_threadpool(report_payloads, report.drugs, chunk))
+        else:
+            pending.append(asyncio.wrap_future(executor.submit(report_payloads, report.drugs, for_pool(chunk))))
+            while len(pending) > 2 * getattr(executor, "_max_workers", 1):
+                report.merge(await pending.pop(0))
+        chunk = []
+
+    async def take(raw: bytes):
+        line = raw.strip()
+        if not line:
+            return
+        try:
+            chunk.append(json.loads(line))
+        except ValueError:
+            report.failed += 1
+            return
+        if len(chunk) >= COHORT_REPORT_CHUNK_SIZE:
+            await flush()
+
+    async for data in request.stream():
+        lines = (pending_bytes + data).split(b"\n")
+        pending_bytes = lines.pop()
+        for line in lines:
+            await take(line)
+    await take(pending_bytes)
+    await flush()
+    for future in pending:
+        report.merge(await future)
+
+
+@router.post("/cohort/report", response_model=CohortReportResponse)
+async def cohort_report(request: Request, drugs: Optional[List[str]] = Query(None)):
+    # Aggregate counts over a cohort: phenotype frequencies per gene, risk labels per
+    # drug and actionable (Toxic/Ineffective) patients. Body is a multi-sample VCF
+    # (plain, gzip or BGZF, streamed), or NDJSON with one /analyze-style payload per
+    # patient (variants, vcf_content or genotype_id). `drugs` is comma-separated or
+    # repeated. No explanations are generated.
+
+    # The cohort modules need numpy, so they are imported on the first report rather
+    # than at startup.
+    from app.services.cohort import CohortAccumulator
+    from app.services.cohort_report import CohortReport
+
+    report = CohortReport(_split_drugs(drugs))
+
+    if request.headers.get("content-type", "").startswith(NDJSON_TYPES):
+        await _report_ndjson(request, report)
+    else:
+        decoder = VcfStreamDecoder()
+        accumulator = CohortAccumulator()
+        async for chunk in request.stream():
+            if chunk:
+                await run_in_threadpool(_feed_cohort, decoder, accumulator, chunk)
+        await run_in_threadpool(_finish_cohort, decoder, accumulator, report)
+
+    return await run_in_threadpool(respond, request, report.to_dict())
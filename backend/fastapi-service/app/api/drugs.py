@@ -0,0 +1,12 @@
+from fastapi import APIRouter, Query
+from app.schemas.response import DrugSearchResponse
+from app.services.drug_gene_map import get_drug_index
+
+router = APIRouter()
+
+
+@router.get("/drugs", response_model=DrugSearchResponse)
+def search_drugs(prefix: str = "", limit: int = Query(20, ge=1, le=100)):
+    # Autocomplete: drugs whose generic name or a brand/alias starts with `prefix`
+    # (case, spaces and hyphens ignored), with the gene each resolves to.
+    return {"prefix": prefix, "drugs": get_drug_index().prefix(prefix, limit)}
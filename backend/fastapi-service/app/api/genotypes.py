@@ -0,0 +1,58 @@
+import json
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from app.api.analyze import parse_request_body, parse_uploaded_file
+from app.schemas.request import GenotypeRequest
+from app.schemas.response import GenotypeResponse
+from app.services.genotype_store import get_genotype_store
+from app.services.parser import parse_variants
+
+router = APIRouter()
+
+
+def _profile(profile_id: str, variants: list, created: bool = False) -> dict:
+    return {"genotype_id": profile_id, "created": created, "variant_count": len(variants), "variants": variants}
+
+def _store(variants: list) -> dict:
+    profile_id, created = get_genotype_store().put(variants)
+    return _profile(profile_id, variants, created)
+
+
+@router.post("/genotypes", response_model=GenotypeResponse, status_code=201)
+async def create_genotype(request: Request):
+    # Parses a VCF once and keeps the normalized profile; pass the returned
+    # genotype_id to /analyze (or /analyze/stream, /jobs, batches) with any drug list.
+    # Body: JSON {"vcf_content": ...} or {"variants": [...]}, a multipart `file`
+    # (plus optional `index`), or the raw .vcf/.vcf.gz/BGZF bytes.
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("application/json"):
+        try:
+            payload = json.loads(await request.body() or b"null")
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON: {exc}")
+        try:
+            body = GenotypeRequest.model_validate(payload)
+        except ValidationError as exc:
+            raise HTTPException(status_code=422, detail=exc.errors(include_url=False, include_context=False))
+        if not body.variants and not body.vcf_content:
+            raise HTTPException(status_code=400, detail="Provide vcf_content or variants")
+        variants = await run_in_threadpool(parse_variants, body)
+    elif content_type.startswith("multipart/form-data"):
+        async with request.form() as form:
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(status_code=400, detail="Multipart upload requires a 'file' field")
+            variants = await parse_uploaded_file(upload, form.get("index"))
+    else:
+        variants = await parse_request_body(request)
+
+    return await run_in_threadpool(_store, variants)
+
+@router.get("/genotypes/{genotype_id}", response_model=GenotypeResponse)
+def get_genotype(genotype_id: str):
+    variants = get_genotype_store().get(genotype_id)
+    if variants is None:
+        raise HTTPException(status_code=404, detail=f"Genotype not found or expired: {genotype_id}")
+    return _profile(genotype_id, variants)
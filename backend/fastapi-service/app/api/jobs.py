@@ -0,0 +1,142 @@
+import json
+import os
+import shutil
+import tempfile
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from app.api.analyze import _consume_chunk, _finish_stream, _split_drugs
+from app.schemas.request import AnalysisRequest
+from app.schemas.response import JobStatus
+from app.services.batch import run_batch
+from app.services.bgzf import is_bgzf
+from app.services.jobs import SUCCEEDED, get_job_manager, public_job
+from app.services.parser import VcfAccumulator
+from app.services.pipeline import analyze_variants, run_analysis
+from app.services.serialization import respond
+from app.services.vcf_stream import VcfStreamDecoder, iter_file_chunks, parse_indexed_vcf
+
+router = APIRouter()
+
+
+def _analysis_job(payload, progress):
+    return run_analysis(AnalysisRequest.model_validate(payload), progress)
+
+def _batch_job(payloads, progress):
+    return run_batch(payloads, progress=progress)
+
+def _upload_job(upload, progress):
+    # A VCF spooled to disk by submit_job (plain, gzip or BGZF; with an index, only
+    # the PGx loci of a BGZF file are decoded). Parsing happens here, not in the
+    # request, so the request only lasts as long as the upload.
+    with open(upload["path"], "rb") as f:
+        if upload["index"] is not None and is_bgzf(f.read(18)):
+            f.seek(0)
+            parsed_variants = parse_indexed_vcf(f, upload["index"])
+        else:
+            f.seek(0)
+            decoder, accumulator = VcfStreamDecoder(), VcfAccumulator()
+            for chunk in iter_file_chunks(f):
+                _consume_chunk(decoder, accumulator, chunk)
+                progress(lines_parsed=accumulator.lines_parsed)
+            parsed_variants = _finish_stream(decoder, accumulator)
+            progress(lines_parsed=accumulator.lines_parsed)
+    return analyze_variants(upload["patient_id"], upload["drugs"], parsed_variants, progress)
+
+def _spool_file() -> tuple:
+    # mkstemp creates the file 0600: uploads are patient data.
+    fd, path = tempfile.mkstemp(prefix="pharmaguard_upload_", suffix=".vcf")
+    return os.fdopen(fd, "wb"), path
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+async def _spool_upload(request: Request, patient_id, drug_values) -> dict:
+    # The VCF of a multipart `file` field or of the raw body, written to a temp file.
+    content_type = request.headers.get("content-type", "")
+    index = None
+    f, path = await run_in_threadpool(_spool_file)
+    try:
+        with f:
+            if content_type.startswith("multipart/form-data"):
+                async with request.form() as form:
+                    upload = form.get("file")
+                    if upload is None or isinstance(upload, str):
+                        raise HTTPException(status_code=400, detail="Multipart upload requires a 'file' field")
+                    patient_id = form.get("patient_id") or patient_id
+                    drug_values = form.getlist("drugs") or drug_values
+                    index_field = form.get("index")
+                    if index_field is not None and not isinstance(index_field, str):
+                        index = await index_field.read()
+                    await upload.seek(0)
+                    await run_in_threadpool(shutil.copyfileobj, upload.file, f)
+            else:
+                if not patient_id or not _split_drugs(drug_values):
+                    raise HTTPException(status_code=400, detail="patient_id and drugs are required")
+                async for chunk in request.stream():
+                    if chunk:
+                        await run_in_threadpool(f.write, chunk)
+        drugs = _split_drugs(drug_values)
+        if not patient_id or not drugs:
+            raise HTTPException(status_code=400, detail="patient_id and drugs are required")
+    except BaseException:
+        _remove(path)
+        raise
+    return {"patient_id": patient_id, "drugs": drugs, "path": path, "index": index}
+
+def _get_job(job_id: str) -> dict:
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found or expired: {job_id}")
+    return job
+
+
+@router.post("/jobs", response_model=JobStatus, status_code=202)
+async def submit_job(
+    request: Request,
+    patient_id: Optional[str] = None,
+    drugs: Optional[List[str]] = Query(None),
+):
+    # A JSON object is a single AnalysisRequest; a JSON array is a batch. Any other
+    # body is a VCF upload as for /analyze/upload (multipart `file` field, or the raw
+    # plain/gzip/BGZF body with patient_id and drugs as query parameters): it is
+    # spooled to disk as it arrives and parsed by the job.
+    content_type = request.headers.get("content-type", "")
+    if content_type and not content_type.startswith("application/json"):
+        upload = await _spool_upload(request, patient_id, drugs)
+        job = get_job_manager().submit("analysis", _upload_job, upload, cleanup=lambda: _remove(upload["path"]))
+        return public_job(job)
+
+    try:
+        body = json.loads(await request.body() or b"null")
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid JSON: {exc}")
+
+    if isinstance(body, list):
+        if not body:
+            raise HTTPException(status_code=400, detail="Batch is empty")
+        job = get_job_manager().submit("batch", _batch_job, body)
+    elif isinstance(body, dict):
+        job = get_job_manager().submit("analysis", _analysis_job, body)
+    else:
+        raise HTTPException(status_code=400, detail="Expected an analysis request object or an array of them")
+    return public_job(job)
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+def get_job(job_id: str):
+    return public_job(_get_job(job_id))
+
+@router.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str, request: Request):
+    job = _get_job(job_id)
+    if job["status"] != SUCCEEDED:
+        raise HTTPException(status_code=409, detail={"status": job["status"], "error": job["error"]})
+    return respond(request, get_job_manager().result(job_id))
+
+@router.delete("/jobs/{job_id}", response_model=JobStatus)
+def cancel_job(job_id: str):
+    _get_job(job_id)
+    return public_job(get_job_manager().cancel(job_id))
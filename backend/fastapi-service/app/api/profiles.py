@@ -0,0 +1,30 @@
+from typing import Optional
+from fastapi import APIRouter, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
+from app.services import profiling
+
+router = APIRouter()
+
+
+@router.get("/admin/profiles")
+async def list_profiles(request: Request):
+    # Newest first; send the same X-Profile-Token header that produced them.
+    profiling.authorize(request)
+    return await run_in_threadpool(profiling.list_profiles)
+
+@router.get("/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    request: Request,
+    profile_format: Optional[str] = Query("speedscope", alias="format", pattern="^(speedscope|collapsed|json)$"),
+):
+    # speedscope JSON (open in speedscope.app), collapsed stacks for flamegraph.pl /
+    # inferno, or the stored profile with its tracemalloc stats.
+    profiling.authorize(request)
+    profile = await run_in_threadpool(profiling.load_profile, profile_id)
+    if profile_format == "collapsed":
+        return PlainTextResponse(profiling.to_collapsed(profile))
+    if profile_format == "speedscope":
+        return profiling.to_speedscope(profile)
+    return profile
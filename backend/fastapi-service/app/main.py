@@ -1,10 +1,72 @@
-from fastapi import FastAPI
+import os
+from contextlib import asynccontextmanager
+from anyio import to_thread
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse
 from app.api.analyze import router as analyze_router
+from app.api.cohort import router as cohort_router
+from app.api.drugs import router as drugs_router
+from app.api.genotypes import router as genotypes_router
+from app.api.jobs import router as jobs_router
+from app.api.profiles import router as profiles_router
+from app.services.decision_table import get_decision_table
+from app.services.explanation_cache import get_explanation_cache
+from app.services.genotype_store import get_genotype_store
+from app.services import llm_service, metrics
+from app.services.result_cache import get_result_cache
 
-app=FastAPI(title="demo")
+
+def prewarm():
+    # Pays up front for what is otherwise loaded on first use: the drug map (extended
+    # map included), the rule table, groq's client and the LLM loop.
+    get_decision_table()
+    api_key = os.getenv("GROQ_API_KEY")
+    if api_key:
+        llm_service.get_client(api_key, os.getenv("GROQ_BASE_URL") or None, llm_service.LLM_MAX_RETRIES)
+        llm_service.get_llm_loop()
+
+@asynccontextmanager
+async def lifespan(app):
+    # Sync routes (/analyze) run in anyio's thread pool, 40 threads by default;
+    # size it per worker with THREADPOOL_SIZE (see benchmarks/load_test.py).
+    threads = int(os.getenv("THREADPOOL_SIZE", "0"))
+    if threads > 0:
+        to_thread.current_default_thread_limiter().total_tokens = threads
+    # Off by default so serverless cold starts only load what a request needs;
+    # long-running servers can set PREWARM_ON_STARTUP=true.
+    if os.getenv("PREWARM_ON_STARTUP", "false").lower() == "true":
+        await run_in_threadpool(prewarm)
+    yield
+
+app=FastAPI(title="demo", lifespan=lifespan)
+app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(analyze_router)
+app.include_router(jobs_router)
+app.include_router(genotypes_router)
+app.include_router(drugs_router)
+app.include_router(cohort_router)
+app.include_router(profiles_router)
 
 @app.get("/health")
 def health():
-    return {"status": "ok"}
+    # The LLM breaker is reported, not folded into the status: when it is open the
+    # service still answers (with template explanations).
+    return {"status": "ok", "llm_circuit": llm_service.get_breaker().state}
+
+@app.get("/cache/stats")
+def cache_stats():
+    explanations = get_explanation_cache()
+    results = get_result_cache()
+    return {
+        "explanations": explanations.stats() if explanations is not None else None,
+        "results": results.stats() if results is not None else None,
+        "genotypes": get_genotype_store().stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    if not metrics.ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled (METRICS_ENABLED=false)")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -11,3 +11,9 @@ class AnalysisRequest(BaseModel):
     drugs: List[str]
     variants: Optional[List[VariantInput]] = None
     vcf_content: Optional[str] = None
+    # Returned by POST /genotypes; replaces variants/vcf_content.
+    genotype_id: Optional[str] = None
+
+class GenotypeRequest(BaseModel):
+    variants: Optional[List[VariantInput]] = None
+    vcf_content: Optional[str] = None
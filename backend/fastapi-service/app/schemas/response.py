@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Any, Dict, List, Optional
 
 class RiskAssessment(BaseModel):
     risk_label: str
@@ -32,3 +32,61 @@ class AnalysisResponse(BaseModel):
     timestamp: str
     results: List[DrugResult]
     quality_metrics: dict
+
+class BatchItemError(BaseModel):
+    status_code: int
+    detail: Any
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: str
+    response: Optional[AnalysisResponse] = None
+    error: Optional[BatchItemError] = None
+
+class BatchResponse(BaseModel):
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
+
+class JobStatus(BaseModel):
+    id: str
+    kind: str
+    status: str
+    progress: dict
+    error: Optional[dict] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    expires_at: Optional[float] = None
+
+class GenotypeResponse(BaseModel):
+    genotype_id: str
+    created: bool
+    variant_count: int
+    variants: List[dict]
+
+class DrugMatch(BaseModel):
+    drug: str
+    gene: str
+    matched: str
+
+class DrugSearchResponse(BaseModel):
+    prefix: str
+    drugs: List[DrugMatch]
+
+class GenePhenotypeCounts(BaseModel):
+    phenotypes: Dict[str, int]
+    frequencies: Dict[str, float]
+    missing: int
+
+class DrugRiskCounts(BaseModel):
+    gene: str
+    risk_labels: Dict[str, int]
+    actionable: int
+
+class CohortReportResponse(BaseModel):
+    patients: int
+    failed: int
+    actionable_patients: int
+    genes: Dict[str, GenePhenotypeCounts]
+    drugs: Dict[str, DrugRiskCounts]
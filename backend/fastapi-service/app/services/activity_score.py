@@ -0,0 +1,214 @@
+"""Allele function tables -> activity score -> phenotype, scalar or per cohort.
+
+    python -m app.services.activity_score CYP2D6 "*1/*4xN" "*2/*41"
+
+Each allele's function and activity value comes from the CPIC allele function
+tables. A diplotype's score is the sum over both haplotypes of activity x copy
+number (`*1x2`, `*4xN`; xN counts as two copies), and that score is binned into
+the gene's phenotype labels. CYP2C19 and SLCO1B1 phenotypes are defined by
+function categories rather than scores; their values are chosen so the sums fall
+into the same bins CPIC assigns (e.g. CYP2C19 *2/*17 -> IM).
+
+Alleles are interned per gene, so a cohort is scored with a handful of array
+operations over allele-id pairs instead of one dict lookup per patient. NumPy is
+only imported by the array path; single lookups stay on plain Python.
+"""
+import re
+from bisect import bisect_left
+from functools import cached_property, lru_cache
+
+UNKNOWN = "Unknown"
+
+ALLELE_FUNCTIONS = {
+    "CYP2D6": {
+        "*1": ("Normal function", 1.0),
+        "*2": ("Normal function", 1.0),
+        "*3": ("No function", 0.0),
+        "*4": ("No function", 0.0),
+        "*5": ("No function", 0.0),
+        "*6": ("No function", 0.0),
+        "*9": ("Decreased function", 0.5),
+        "*10": ("Decreased function", 0.25),
+        "*17": ("Decreased function", 0.5),
+        "*29": ("Decreased function", 0.5),
+        "*41": ("Decreased function", 0.5),
+    },
+    "CYP2C19": {
+        "*1": ("Normal function", 1.0),
+        "*2": ("No function", 0.0),
+        "*3": ("No function", 0.0),
+        "*4": ("No function", 0.0),
+        "*17": ("Increased function", 1.5),
+    },
+    "CYP2C9": {
+        "*1": ("Normal function", 1.0),
+        "*2": ("Decreased function", 0.5),
+        "*3": ("No function", 0.0),
+        "*5": ("Decreased function", 0.5),
+        "*6": ("No function", 0.0),
+        "*8": ("Decreased function", 0.5),
+        "*11": ("Decreased function", 0.5),
+    },
+    "SLCO1B1": {
+        "*1": ("Normal function", 1.0),
+        "*1B": ("Normal function", 1.0),
+        "*5": ("No function", 0.0),
+        "*15": ("No function", 0.0),
+        "*37": ("Normal function", 1.0),
+    },
+    "TPMT": {
+        "*1": ("Normal function", 1.0),
+        "*2": ("No function", 0.0),
+        "*3A": ("No function", 0.0),
+        "*3B": ("No function", 0.0),
+        "*3C": ("No function", 0.0),
+        "*4": ("No function", 0.0),
+    },
+    "DPYD": {
+        "*1": ("Normal function", 1.0),
+        "*2A": ("No function", 0.0),
+        "*13": ("No function", 0.0),
+        "C.2846A>T": ("Decreased function", 0.5),
+        "C.1129-5923C>G": ("Decreased function", 0.5),
+    },
+}
+
+# (upper bounds, labels): a score s gets labels[bisect_left(bounds, s)], i.e. the
+# first label whose bound is >= s; the last label is open-ended.
+PHENOTYPE_BINS = {
+    "CYP2D6": ((0.0, 1.0, 2.25), ("PM", "IM", "NM", "UM")),
+    "CYP2C19": ((0.0, 1.5, 2.0, 2.5), ("PM", "IM", "NM", "RM", "UM")),
+    "CYP2C9": ((0.5, 1.5), ("PM", "IM", "NM")),
+    "SLCO1B1": ((0.5, 1.5), ("Low", "Decreased", "Normal")),
+    "TPMT": ((0.5, 1.5), ("Low", "Intermediate", "Normal")),
+    "DPYD": ((0.5, 1.5), ("Deficient", "Intermediate", "Normal")),
+}
+
+COPY_NUMBER_RE = re.compile(r"^(.+?)X(\d+|N)$")
+
+
+def split_haplotype(haplotype: str) -> tuple:
+    # "*4xN" -> ("*4", 2), "*1x3" -> ("*1", 3), "*2a" -> ("*2A", 1).
+    haplotype = haplotype.strip().upper()
+    match = COPY_NUMBER_RE.match(haplotype)
+    if not match:
+        return haplotype, 1
+    copies = match.group(2)
+    return match.group(1), 2 if copies == "N" else int(copies)
+
+
+class GeneTable:
+    def __init__(self, gene: str, functions: dict, bins: tuple):
+        self.gene = gene
+        self.alleles = list(functions)
+        self.index = {allele: i for i, allele in enumerate(self.alleles)}
+        self.function = [functions[a][0] for a in self.alleles]
+        self.values = [functions[a][1] for a in self.alleles]
+        self.bounds = list(bins[0])
+        self.labels = [*bins[1], UNKNOWN]
+
+    @cached_property
+    def arrays(self) -> tuple:
+        # (activity, bounds, labels); id -1 (unknown allele) reads the trailing NaN,
+        # which scores as UNKNOWN.
+        import numpy as np
+
+        return (
+            np.array(self.values + [np.nan]),
+            np.array(self.bounds),
+            np.array(self.labels, dtype=object),
+        )
+
+    def allele_id(self, allele: str) -> int:
+        return self.index.get(allele, -1)
+
+    def encode(self, haplotypes) -> tuple:
+        # Haplotype strings -> (allele ids, copy numbers); each distinct string is
+        # parsed once and broadcast back.
+        import numpy as np
+
+        haplotypes = haplotypes.tolist() if hasattr(haplotypes, "tolist") else list(haplotypes)
+        codes = {}
+        inverse = np.fromiter((codes.setdefault(h, len(codes)) for h in haplotypes), dtype=np.int32, count=len(haplotypes))
+        parsed = [split_haplotype(h) for h in codes]
+        ids = np.array([self.allele_id(a) for a, _ in parsed], dtype=np.int32)
+        copies = np.array([c for _, c in parsed], dtype=np.int16)
+        return ids[inverse], copies[inverse]
+
+    def scores(self, left_ids, right_ids, left_copies=1, right_copies=1):
+        activity = self.arrays[0]
+        return activity[left_ids] * left_copies + activity[right_ids] * right_copies
+
+    def phenotypes(self, scores):
+        import numpy as np
+
+        _, bounds, labels = self.arrays
+        scores = np.asarray(scores, dtype=float)
+        bins = np.searchsorted(bounds, scores, side="left")
+        bins[np.isnan(scores)] = len(labels) - 1
+        return labels[bins]
+
+    def score(self, diplotype: str) -> float | None:
+        parts = diplotype.split("/")
+        if len(parts) != 2:
+            return None
+        total = 0.0
+        for part in parts:
+            allele, copies = split_haplotype(part)
+            i = self.index.get(allele)
+            if i is None:
+                return None
+            total += self.values[i] * copies
+        return total
+
+    def phenotype(self, diplotype: str) -> str:
+        score = self.score(diplotype)
+        if score is None:
+            return UNKNOWN
+        return self.labels[bisect_left(self.bounds, score)]
+
+
+@lru_cache(maxsize=None)
+def get_gene_table(gene: str) -> GeneTable | None:
+    if gene not in ALLELE_FUNCTIONS:
+        return None
+    return GeneTable(gene, ALLELE_FUNCTIONS[gene], PHENOTYPE_BINS[gene])
+
+def phenotype_labels(gene: str) -> tuple:
+    return PHENOTYPE_BINS.get(gene, ((), ()))[1]
+
+def activity_score(gene: str, diplotype: str) -> float | None:
+    table = get_gene_table(gene)
+    return table.score(diplotype) if table else None
+
+def get_phenotype(gene: str, diplotype: str) -> str:
+    table = get_gene_table(gene)
+    return table.phenotype(diplotype) if table else UNKNOWN
+
+def call_phenotypes(gene: str, left, right):
+    # Object array with the phenotype of each (left, right) haplotype pair, e.g.
+    # one pair per cohort sample.
+    table = get_gene_table(gene)
+    if table is None:
+        import numpy as np
+
+        return np.full(len(left), UNKNOWN, dtype=object)
+    left_ids, left_copies = table.encode(left)
+    right_ids, right_copies = table.encode(right)
+    return table.phenotypes(table.scores(left_ids, right_ids, left_copies, right_copies))
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("gene")
+    parser.add_argument("diplotypes", nargs="+")
+    args = parser.parse_args()
+
+    gene = args.gene.upper()
+    print(json.dumps([
+        {"diplotype": d, "activity_score": activity_score(gene, d), "phenotype": get_phenotype(gene, d)}
+        for d in args.diplotypes
+    ], indent=2))
@@ -0,0 +1,236 @@
+"""Star-allele calling from CHROM/POS/REF/ALT, for VCFs without STAR= tags.
+
+    python -m app.services.allele_definitions stats
+    python -m app.services.allele_definitions lookup chr22:42128945:C:T 10:94781859:G:A
+    python -m app.services.allele_definitions call CYP2D6 rs3892097=1 rs1065852=2 rs1135840=2
+    python -m app.services.allele_definitions export > definitions.tsv
+
+Each allele is the set of its defining variants (CPIC allele definition tables,
+GRCh38). Variants are kept in a sorted array of chrom << 32 | pos keys with parallel
+arrays for the variant ids, so a VCF record is one binary search however many
+definitions are loaded; rsIDs are a second way in, for files on another build.
+
+A gene's call takes the alt dosage of every matched variant. Each haplotype gets the
+most specific allele whose variants are all present (*4 = 100C>T + 1846G>A +
+4180G>C wins over *10 = 100C>T + 4180G>C), or, failing that, the allele with the
+largest unique share of its variants present (a partial match: sparse VCFs often
+list only the key variant); its variants are then used up and the second haplotype
+is called from what is left. Phased genotypes are called per haplotype.
+
+ALLELE_DEFINITIONS_PATH points at a TSV (gene, allele, rsid, chrom, pos, ref, alt;
+one row per defining variant) that replaces the built-in table. Positions outside
+the pharmacogene intervals in gene_regions are only seen by rsID unless
+VCF_POSITION_PREFILTER=false.
+"""
+import os
+from array import array
+from bisect import bisect_left
+from functools import lru_cache
+from app.services.gene_regions import normalize_chrom
+
+# (gene, allele, [(rsid, chrom, pos, ref, alt), ...]), GRCh38.
+_CYP2D6_2 = [("rs16947", "22", 42127941, "G", "A"), ("rs1135840", "22", 42126611, "C", "G")]
+ALLELE_DEFINITIONS = [
+    ("CYP2C19", "*2", [("rs4244285", "10", 94781859, "G", "A")]),
+    ("CYP2C19", "*3", [("rs4986893", "10", 94780653, "G", "A")]),
+    ("CYP2C19", "*17", [("rs12248560", "10", 94761900, "C", "T")]),
+    ("CYP2C9", "*2", [("rs1799853", "10", 94942290, "C", "T")]),
+    ("CYP2C9", "*3", [("rs1057910", "10", 94981296, "A", "C")]),
+    ("CYP2D6", "*2", _CYP2D6_2),
+    ("CYP2D6", "*4", [("rs3892097", "22", 42128945, "C", "T"), ("rs1065852", "22", 42130692, "G", "A"), _CYP2D6_2[1]]),
+    ("CYP2D6", "*10", [("rs1065852", "22", 42130692, "G", "A"), _CYP2D6_2[1]]),
+    ("CYP2D6", "*17", [("rs28371706", "22", 42129770, "G", "A"), *_CYP2D6_2]),
+    ("CYP2D6", "*41", [("rs28371725", "22", 42127803, "C", "T"), *_CYP2D6_2]),
+    ("SLCO1B1", "*1B", [("rs2306283", "12", 21176804, "A", "G")]),
+    ("SLCO1B1", "*5", [("rs4149056", "12", 21178615, "T", "C")]),
+    ("SLCO1B1", "*15", [("rs4149056", "12", 21178615, "T", "C"), ("rs2306283", "12", 21176804, "A", "G")]),
+    ("TPMT", "*2", [("rs1800462", "6", 18143724, "C", "G")]),
+    ("TPMT", "*3B", [("rs1800460", "6", 18138997, "C", "T")]),
+    ("TPMT", "*3C", [("rs1142345", "6", 18130687, "T", "C")]),
+    ("TPMT", "*3A", [("rs1800460", "6", 18138997, "C", "T"), ("rs1142345", "6", 18130687, "T", "C")]),
+    ("DPYD", "*2A", [("rs3918290", "1", 97450058, "C", "T")]),
+    ("DPYD", "*13", [("rs55886062", "1", 97515787, "A", "C")]),
+    ("DPYD", "c.2846A>T", [("rs67376798", "1", 97082391, "T", "A")]),
+]
+
+CHROM_CODES = {**{str(i): i for i in range(1, 23)}, "X": 23, "Y": 24, "M": 25, "MT": 25}
+TSV_COLUMNS = ("gene", "allele", "rsid", "chrom", "pos", "ref", "alt")
+
+
+def position_key(chrom: str, pos) -> int | None:
+    code = CHROM_CODES.get(normalize_chrom(chrom).upper())
+    if code is None:
+        return None
+    try:
+        return code << 32 | int(pos)
+    except ValueError:
+        return None
+
+def _variant_key(variant) -> int:
+    # variant is (gene, rsid, chrom, pos, ref, alt)
+    return position_key(variant[2], variant[3])
+
+
+class AlleleDefinitions:
+    def __init__(self, definitions):
+        variant_ids = {}
+        self.variants = []
+        self.alleles = {}
+        for gene, allele, variants in definitions:
+            ids = set()
+            for rsid, chrom, pos, ref, alt in variants:
+                key = position_key(chrom, pos)
+                if key is None:
+                    raise ValueError(f"{gene} {allele}: unsupported chromosome {chrom}")
+                identity = (key, ref.upper(), alt.upper())
+                vid = variant_ids.get(identity)
+                if vid is None:
+                    vid = variant_ids[identity] = len(self.variants)
+                    self.variants.append((gene, rsid, chrom, int(pos), ref.upper(), alt.upper()))
+                ids.add(vid)
+            self.alleles.setdefault(gene, []).append((allele, frozenset(ids)))
+        # Most specific first, so the first full match is the one that subsumes the rest.
+        for candidates in self.alleles.values():
+            candidates.sort(key=lambda entry: -len(entry[1]))
+
+        order = sorted(range(len(self.variants)), key=lambda vid: _variant_key(self.variants[vid]))
+        self._keys = array("q", (_variant_key(self.variants[vid]) for vid in order))
+        self._ids = array("i", order)
+        self.rsids = {}
+        for vid, variant in enumerate(self.variants):
+            if variant[1]:
+                self.rsids.setdefault(variant[1], []).append(vid)
+
+    def __len__(self) -> int:
+        return len(self.variants)
+
+    def lookup(self, chrom: str, pos, ref: str, alts) -> list:
+        # [(alt index (1-based, as in GT), variant id)] for the record's ALT alleles.
+        key = position_key(chrom, pos)
+        if key is None:
+            return []
+        i = bisect_left(self._keys, key)
+        if i == len(self._keys) or self._keys[i] != key:
+            return []
+        ref = ref.upper()
+        alts = [alt.upper() for alt in alts]
+        hits = []
+        while i < len(self._keys) and self._keys[i] == key:
+            vid = self._ids[i]
+            _, _, _, _, vref, valt = self.variants[vid]
+            if vref == ref and valt in alts:
+                hits.append((alts.index(valt) + 1, vid))
+            i += 1
+        return hits
+
+    def lookup_rsid(self, rsid: str, alts) -> list:
+        # Same as lookup, by ID column (coordinates from another build); the ALT
+        # must still match.
+        alts = [alt.upper() for alt in alts]
+        return [(alts.index(self.variants[vid][5]) + 1, vid) for vid in self.rsids.get(rsid, ()) if self.variants[vid][5] in alts]
+
+    def gene_of(self, vid: int) -> str:
+        return self.variants[vid][0]
+
+    def best_allele(self, gene: str, present) -> tuple | None:
+        # (allele, variant ids it uses, partial) for one haplotype, or None.
+        partial, tied = None, False
+        for allele, ids in self.alleles.get(gene, ()):
+            matched = ids & present
+            if not matched:
+                continue
+            if matched == ids:
+                return allele, ids, False
+            score = (len(matched) / len(ids), len(matched))
+            if partial is None or score > partial[0]:
+                partial, tied = (score, allele, matched), False
+            elif score == partial[0]:
+                tied = True
+        if partial is None or tied:
+            return None
+        return partial[1], partial[2], True
+
+    def call(self, gene: str, dosages: dict) -> list:
+        # Up to two stars from unphased {variant id: alt count}.
+        remaining = {vid: min(count, 2) for vid, count in dosages.items() if count > 0}
+        stars = []
+        for _ in range(2):
+            best = self.best_allele(gene, remaining.keys())
+            if best is None:
+                break
+            stars.append(best[0])
+            for vid in best[1]:
+                remaining[vid] -= 1
+                if not remaining[vid]:
+                    del remaining[vid]
+        return stars
+
+    def call_phased(self, gene: str, haplotypes) -> list:
+        # One star per haplotype (a set of variant ids each); reference haplotypes are *1.
+        stars = []
+        for present in haplotypes:
+            best = self.best_allele(gene, present)
+            stars.append(best[0] if best is not None else "*1")
+        return stars
+
+def load_definitions_tsv(path: str) -> list:
+    # Rows of TSV_COLUMNS (a header line and "#" comments are skipped), grouped per allele.
+    grouped = {}
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            line = line.rstrip("\r\n")
+            if not line.strip() or line.startswith("#") or line.lower().startswith("gene\t"):
+                continue
+            fields = line.split("\t")
+            if len(fields) != len(TSV_COLUMNS):
+                raise ValueError(f"{path}:{number}: expected {len(TSV_COLUMNS)} columns ({', '.join(TSV_COLUMNS)})")
+            gene, allele, rsid, chrom, pos, ref, alt = (field.strip() for field in fields)
+            grouped.setdefault((gene.upper(), allele), []).append((rsid, chrom, int(pos), ref, alt))
+    return [(gene, allele, variants) for (gene, allele), variants in grouped.items()]
+
+def export_definitions_tsv(definitions=ALLELE_DEFINITIONS) -> str:
+    lines = ["\t".join(TSV_COLUMNS)]
+    for gene, allele, variants in definitions:
+        for rsid, chrom, pos, ref, alt in variants:
+            lines.append("\t".join([gene, allele, rsid, chrom, str(pos), ref, alt]))
+    return "\n".join(lines) + "\n"
+
+@lru_cache(maxsize=1)
+def get_allele_definitions() -> AlleleDefinitions:
+    path = os.getenv("ALLELE_DEFINITIONS_PATH")
+    return AlleleDefinitions(load_definitions_tsv(path) if path else ALLELE_DEFINITIONS)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import sys
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["stats", "lookup", "call", "export"])
+    parser.add_argument("args", nargs="*")
+    args = parser.parse_args()
+
+    definitions = get_allele_definitions()
+    if args.command == "stats":
+        print(json.dumps({
+            "variants": len(definitions),
+            "alleles": {gene: len(alleles) for gene, alleles in definitions.alleles.items()},
+            "index_bytes": definitions._keys.itemsize * len(definitions._keys) + definitions._ids.itemsize * len(definitions._ids),
+        }, indent=2))
+    elif args.command == "lookup":
+        out = {}
+        for record in args.args:
+            chrom, pos, ref, alt = record.split(":")
+            out[record] = [definitions.variants[vid][:2] for _, vid in definitions.lookup(chrom, pos, ref, alt.split(","))]
+        print(json.dumps(out, indent=2))
+    elif args.command == "call":
+        gene, *dosages = args.args
+        counts = {}
+        for item in dosages:
+            rsid, _, count = item.partition("=")
+            for vid in definitions.rsids.get(rsid, ()):
+                counts[vid] = int(count or 1)
+        print(json.dumps({"gene": gene, "stars": definitions.call(gene.upper(), counts)}))
+    else:
+        sys.stdout.write(export_definitions_tsv())
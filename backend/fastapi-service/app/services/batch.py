@@ -0,0 +1,130 @@
+import os
+import threading
+from fastapi import HTTPException
+from pydantic import ValidationError
+from app.schemas.request import AnalysisRequest
+from app.services.parser import parse_variants
+from app.services.pipeline import assess_drugs, build_response, explain_results, explanation_args
+from app.services.llm_service import explanation_cache_key, run_llm
+from app.services.resilience import Deadline
+
+# Batches smaller than this are evaluated inline; pickling overhead outweighs the pool.
+BATCH_PROCESS_THRESHOLD = int(os.getenv("BATCH_PROCESS_THRESHOLD", "8"))
+# Latency budget for all explanations of one batch (seconds, 0 = none); past it the
+# remaining ones get the template explanation.
+BATCH_LLM_BUDGET_SECONDS = float(os.getenv("BATCH_LLM_BUDGET_SECONDS", "120"))
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def available_cpus() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def batch_max_workers() -> int:
+    return int(os.getenv("BATCH_MAX_WORKERS", "0")) or available_cpus()
+
+def get_executor():
+    # Spawned (not forked) workers: the parent holds the LLM loop thread and the
+    # server threadpool, which must not be duplicated into children.
+    # multiprocessing is imported here, off the cold-start path.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            try:
+                _executor = ProcessPoolExecutor(
+                    max_workers=batch_max_workers(),
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            except (OSError, NotImplementedError):
+                # Some serverless runtimes lack the semaphores multiprocessing needs.
+                return None
+    return _executor
+
+
+def item_error(status_code: int, detail) -> dict:
+    return {"ok": False, "error": {"status_code": status_code, "detail": detail}}
+
+def evaluate_payload(payload) -> dict:
+    # Worker-side: validation, VCF parsing and CPIC rules. No LLM calls here.
+    try:
+        request = AnalysisRequest.model_validate(payload)
+        parsed_variants = parse_variants(request)
+        results, missing_genes = assess_drugs(request.drugs, parsed_variants)
+        return {"ok": True, "response": build_response(request.patient_id, results, parsed_variants, missing_genes)}
+    except HTTPException as exc:
+        return item_error(exc.status_code, exc.detail)
+    except ValidationError as exc:
+        return item_error(422, exc.errors(include_url=False, include_context=False))
+    except Exception as exc:
+        return item_error(500, f"{type(exc).__name__}: {exc}")
+
+def for_pool(payloads) -> list:
+    # A memory-only genotype store lives in this process, so payloads bound for pool
+    # workers carry the stored variants instead of their genotype_id (unknown ids
+    # are left for the worker to report).
+    from app.services.genotype_store import get_genotype_store
+
+    store = get_genotype_store()
+    if store.path is not None:
+        return list(payloads)
+    out = []
+    for payload in payloads:
+        stored = store.get(payload["genotype_id"]) if isinstance(payload, dict) and payload.get("genotype_id") else None
+        if stored is not None:
+            payload = {**{k: v for k, v in payload.items() if k != "genotype_id"}, "variants": stored}
+        out.append(payload)
+    return out
+
+def evaluate_batch(payloads, executor=None, progress=None) -> list:
+    payloads = list(payloads)
+    if executor is None and len(payloads) >= BATCH_PROCESS_THRESHOLD:
+        executor = get_executor()
+    if executor is None:
+        evaluated = map(evaluate_payload, payloads)
+    else:
+        payloads = for_pool(payloads)
+        workers = getattr(executor, "_max_workers", 1)
+        chunksize = max(1, len(payloads) // (workers * 4))
+        evaluated = executor.map(evaluate_payload, payloads, chunksize=chunksize)
+
+    items = []
+    for item in evaluated:
+        items.append(item)
+        if progress:
+            progress(items_evaluated=len(items))
+    return items
+
+def run_batch(payloads, errors=None, progress=None) -> dict:
+    # `errors` maps batch positions that already failed upstream (e.g. malformed
+    # NDJSON lines) to their error items; everything else is evaluated.
+    errors = errors or {}
+    valid = [i for i in range(len(payloads)) if i not in errors]
+    evaluated = dict(zip(valid, evaluate_batch((payloads[i] for i in valid), progress=progress)))
+    items = [errors.get(i) or evaluated[i] for i in range(len(payloads))]
+
+    # Patients sharing a (gene, phenotype, drug, risk) share one explanation call, so a
+    # cold cache costs one call per distinct tuple rather than one per result.
+    results = [r for item in items if item["ok"] for r in item["response"]["results"]]
+    keys = [explanation_cache_key(*explanation_args(r)) for r in results]
+    unique = {}
+    for key, result in zip(keys, results):
+        unique.setdefault(key, result)
+    explanations = run_llm(explain_results(list(unique.values()), Deadline(BATCH_LLM_BUDGET_SECONDS)))
+    explained = dict(zip(unique, explanations))
+    for key, result in zip(keys, results):
+        result["llm_generated_explanation"] = dict(explained[key])
+
+    out = []
+    for index, item in enumerate(items):
+        if item["ok"]:
+            out.append({"index": index, "status": "ok", "response": item["response"], "error": None})
+        else:
+            out.append({"index": index, "status": "error", "response": None, "error": item["error"]})
+    succeeded = sum(1 for item in items if item["ok"])
+    return {"results": out, "succeeded": succeeded, "failed": len(items) - succeeded}
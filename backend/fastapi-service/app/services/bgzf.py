@@ -0,0 +1,117 @@
+import struct
+import zlib
+
+# BGZF: concatenated gzip members of at most 64 KiB, each carrying its own
+# compressed size in a 'BC' extra subfield so readers can seek to any block.
+# Positions inside a BGZF file are "virtual offsets": (block offset << 16) | offset
+# within the uncompressed block.
+BGZF_HEADER = struct.Struct("<4BI2BH")
+BLOCK_DATA_SIZE = 0xFF00
+EOF_BLOCK = bytes.fromhex("1f8b08040000000000ff0600424302001b0003000000000000000000")
+
+
+def is_bgzf(head: bytes) -> bool:
+    return (
+        len(head) >= 16
+        and head[:4] == b"\x1f\x8b\x08\x04"
+        and head[12:14] == b"BC"
+    )
+
+def split_virtual_offset(voffset: int):
+    return voffset >> 16, voffset & 0xFFFF
+
+
+class BgzfReader:
+    def __init__(self, fileobj):
+        self._file = fileobj
+        self._cache_offset = None
+        self._cache = (b"", 0)
+
+    def read_block(self, coffset: int):
+        # Returns (uncompressed data, offset of the next block).
+        if coffset == self._cache_offset:
+            return self._cache
+
+        self._file.seek(coffset)
+        header = self._file.read(BGZF_HEADER.size)
+        if len(header) < BGZF_HEADER.size:
+            return b"", coffset
+        id1, id2, _cm, flags, _mtime, _xfl, _os, xlen = BGZF_HEADER.unpack(header)
+        if (id1, id2) != (0x1F, 0x8B) or not flags & 0x04:
+            raise ValueError(f"Not a BGZF block at offset {coffset}")
+
+        extra = self._file.read(xlen)
+        bsize = None
+        pos = 0
+        while pos + 4 <= len(extra):
+            si1, si2, slen = extra[pos], extra[pos + 1], struct.unpack_from("<H", extra, pos + 2)[0]
+            if (si1, si2) == (66, 67):
+                bsize = struct.unpack_from("<H", extra, pos + 4)[0]
+            pos += 4 + slen
+        if bsize is None:
+            raise ValueError(f"BGZF block at offset {coffset} has no BC subfield")
+
+        remaining = bsize + 1 - BGZF_HEADER.size - xlen
+        payload = self._file.read(remaining)
+        data = zlib.decompress(payload[:-8], -15)
+
+        self._cache_offset = coffset
+        self._cache = (data, coffset + bsize + 1)
+        return self._cache
+
+    def read_range(self, start_voffset: int, end_voffset: int):
+        # Yields the uncompressed bytes between two virtual offsets, block by block.
+        coffset, uoffset = split_virtual_offset(start_voffset)
+        end_coffset, end_uoffset = split_virtual_offset(end_voffset)
+        while coffset <= end_coffset:
+            data, next_offset = self.read_block(coffset)
+            if not data and next_offset == coffset:
+                return
+            stop = end_uoffset if coffset == end_coffset else len(data)
+            if uoffset < stop:
+                yield data[uoffset:stop]
+            coffset, uoffset = next_offset, 0
+
+
+def compress_block(data: bytes, level: int = 6) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    cdata = compressor.compress(data) + compressor.flush()
+    bsize = BGZF_HEADER.size + 6 + len(cdata) + 8 - 1
+    header = BGZF_HEADER.pack(0x1F, 0x8B, 8, 4, 0, 0, 0xFF, 6)
+    return (
+        header
+        + b"BC" + struct.pack("<HH", 2, bsize)
+        + cdata
+        + struct.pack("<II", zlib.crc32(data) & 0xFFFFFFFF, len(data))
+    )
+
+
+class BgzfWriter:
+    def __init__(self, fileobj, level: int = 6):
+        self._file = fileobj
+        self._level = level
+        self._buffer = bytearray()
+        self._coffset = 0
+
+    def tell(self) -> int:
+        return (self._coffset << 16) | len(self._buffer)
+
+    def write(self, data: bytes):
+        self._buffer += data
+        while len(self._buffer) >= BLOCK_DATA_SIZE:
+            self._flush_block(bytes(self._buffer[:BLOCK_DATA_SIZE]))
+            del self._buffer[:BLOCK_DATA_SIZE]
+
+    def flush(self):
+        if self._buffer:
+            self._flush_block(bytes(self._buffer))
+            self._buffer.clear()
+
+    def close(self):
+        self.flush()
+        self._file.write(EOF_BLOCK)
+
+    def _flush_block(self, data: bytes):
+        block = compress_block(data, self._level)
+        self._file.write(block)
+        self._coffset += len(block)
@@ -1,12 +1,18 @@
-import pandas as pd
+import os
 from pathlib import Path
 
 TARGET_GENES = {"CYP2D6","CYP2C19","CYP2C9","SLCO1B1","TPMT","DPYD"}
 SUPPORTED_DRUGS = {"Codeine","Warfarin","Clopidogrel","Simvastatin","Azathioprine","Fluorouracil"}
 
+def relationships_path() -> str:
+    default = Path(__file__).resolve().parent.parent / "data" / "relationships.tsv"
+    return os.getenv("RELATIONSHIPS_PATH") or str(default)
+
 def load_relationships():
-    data_path = Path(__file__).resolve().parent.parent / "data" / "relationships.tsv"
-    df = pd.read_csv(data_path, sep="\t", dtype=str)
+    # pandas is only needed on this path; the compiled artifact (kb_artifact) avoids it.
+    import pandas as pd
+
+    df = pd.read_csv(relationships_path(), sep="\t", dtype=str)
     df["Entity2_name"] = df["Entity2_name"].str.strip().str.lower()
     df["Entity1_name"] = df["Entity1_name"].str.strip().str.upper()
     df = df[df["Entity1_name"].isin(TARGET_GENES)]
@@ -0,0 +1,246 @@
+import numpy as np
+from fastapi import HTTPException
+from app.services.activity_score import UNKNOWN, get_gene_table
+from app.services.parser import PgxRecordFilter, alt_allele_count, call_diplotype
+from app.services.vcf_stream import iter_vcf_lines
+
+
+class CohortGenotypes:
+    # One row per PGx record, one column per sample. `counts` holds the alt-allele
+    # count of every sample's GT as int8, so star/diplotype calls are array ops.
+    # `defined_calls` maps a gene to per-sample (left, right, called) arrays from the
+    # allele definitions, used where a sample has no STAR-tagged call for the gene.
+
+    def __init__(self, samples, record_genes, record_stars, gene_rsids, counts, defined_calls=None):
+        self.samples = samples
+        self.record_genes = record_genes
+        self.record_stars = record_stars
+        self.gene_rsids = gene_rsids
+        self.counts = counts
+        self.defined_calls = defined_calls or {}
+
+    @property
+    def genes(self) -> list:
+        return list(self.gene_rsids)
+
+    def _called_rows(self, gene: str) -> tuple:
+        # Same rule as call_diplotype: the first two non-*1 stars, in record order,
+        # each repeated by its alt-allele count. Returns the stars and, per sample,
+        # the index into them of the first/second call and the number of calls.
+        rows = [
+            i for i, (g, star) in enumerate(zip(self.record_genes, self.record_stars))
+            if g == gene and star and star != "*1"
+        ]
+        if not rows:
+            return None
+        stars = np.array([self.record_stars[i] for i in rows], dtype=object)
+        cumulative = np.cumsum(self.counts[rows].astype(np.int16), axis=0)
+        first = np.argmax(cumulative >= 1, axis=0)
+        second = np.argmax(cumulative >= 2, axis=0)
+        return stars, first, second, cumulative[-1]
+
+    @staticmethod
+    def _pairs(called, n_samples: int, reference, values) -> tuple:
+        # (left, right) per sample from per-record `values` (stars or allele ids).
+        left = np.full(n_samples, reference, dtype=values.dtype)
+        right = np.full(n_samples, reference, dtype=values.dtype)
+        _, first, second, total = called
+        one = total == 1
+        two = total >= 2
+        right[one] = values[first[one]]
+        left[two] = values[first[two]]
+        right[two] = values[second[two]]
+        return left, right
+
+    def _tagged(self, gene: str) -> np.ndarray:
+        # Samples with an alt allele on any STAR-tagged record of the gene (*1 tags
+        # included, as in VcfAccumulator): their call comes from the tags.
+        rows = [i for i, (g, star) in enumerate(zip(self.record_genes, self.record_stars)) if g == gene and star]
+        return self.counts[rows].sum(axis=0) > 0
+
+    def haplotypes(self, gene: str) -> tuple:
+        called = self._called_rows(gene)
+        if called is None:
+            left, right = np.full(len(self.samples), "*1", dtype=object), np.full(len(self.samples), "*1", dtype=object)
+        else:
+            left, right = self._pairs(called, len(self.samples), "*1", called[0])
+        defined = self.defined_calls.get(gene)
+        if defined is not None:
+            use = defined[2] & ~self._tagged(gene)
+            left[use] = defined[0][use]
+            right[use] = defined[1][use]
+        return left, right
+
+    def diplotypes(self, gene: str) -> np.ndarray:
+        left, right = self.haplotypes(gene)
+        return left + "/" + right
+
+    def phenotypes(self, gene: str) -> np.ndarray:
+        # Scored for the whole cohort at once: each record's star is interned to an
+        # allele id once, then scoring is array indexing over (left, right) ids.
+        n_samples = len(self.samples)
+        table = get_gene_table(gene)
+        if table is None:
+            return np.full(n_samples, UNKNOWN, dtype=object)
+        if gene in self.defined_calls:
+            (left_ids, left_copies), (right_ids, right_copies) = (table.encode(side) for side in self.haplotypes(gene))
+            return table.phenotypes(table.scores(left_ids, right_ids, left_copies, right_copies))
+        reference = table.allele_id("*1")
+        called = self._called_rows(gene)
+        if called is None:
+            ids = np.full(n_samples, reference, dtype=np.int32)
+            return table.phenotypes(table.scores(ids, ids))
+        star_ids, star_copies = table.encode(called[0])
+        left_ids, right_ids = self._pairs(called, n_samples, reference, star_ids)
+        left_copies, right_copies = self._pairs(called, n_samples, 1, star_copies)
+        return table.phenotypes(table.scores(left_ids, right_ids, left_copies, right_copies))
+
+    def sample_variants(self) -> list:
+        per_gene = {gene: self.diplotypes(gene) for gene in self.gene_rsids}
+        return [
+            [
+                {"gene": gene, "diplotype": per_gene[gene][j], "rsid": rsid}
+                for gene, rsid in self.gene_rsids.items()
+            ]
+            for j in range(len(self.samples))
+        ]
+
+    def iter_sample_variants(self):
+        yield from zip(self.samples, self.sample_variants())
+
+
+def unique_gts(sample_columns, gt_index: int) -> tuple:
+    # (distinct GT strings, index of every sample's GT among them), so each distinct
+    # GT is decoded once and broadcast back.
+    columns = np.asarray(sample_columns)
+    if gt_index == 0:
+        gts = np.char.partition(columns, ":")[:, 0]
+    else:
+        gts = np.array([c.split(":")[gt_index] if c.count(":") >= gt_index else "" for c in sample_columns])
+    unique, inverse = np.unique(gts, return_inverse=True)
+    return unique.tolist(), inverse.ravel()
+
+def decode_gt_counts(sample_columns, gt_index: int) -> np.ndarray:
+    unique, inverse = unique_gts(sample_columns, gt_index)
+    lookup = np.array([alt_allele_count(gt) for gt in unique], dtype=np.int8)
+    return lookup[inverse]
+
+
+class CohortAccumulator(PgxRecordFilter):
+    # Line-at-a-time cohort parser, so an upload can be fed as it arrives. Records
+    # are picked and read as VcfAccumulator does (prefilter, unsupported genes
+    # skipped), every sample column at once.
+
+    def __init__(self, prefilter: bool | None = None):
+        super().__init__(prefilter)
+        self.samples = None
+        self.record_genes, self.record_stars, self.rows = [], [], []
+        self.gene_rsids = {}
+        # gene -> {"rows": [(variant id, dosage, on first haplotype, on second)], "phased": per-sample bool}
+        self.defined = {}
+
+    def add_line(self, line: str):
+        if line.startswith("##"):
+            return
+        line = line.rstrip("\r\n")
+        if line.startswith("#CHROM"):
+            self.samples = line.split("\t")[9:]
+            return
+        if not line or line.startswith("#"):
+            return
+        self.lines_parsed += 1
+        if not self.passes_prefilter(line):
+            self.lines_skipped += 1
+            return
+        parts = line.split("\t")
+        if len(parts) < 10:
+            self.lines_skipped += 1
+            return
+        samples = self.samples
+        if samples is None:
+            raise HTTPException(status_code=400, detail="Cohort VCF is missing the #CHROM header line")
+
+        record = self.classify(parts)
+        if record is None:
+            self.lines_skipped += 1
+            return
+        gene, star, hits, rsid = record
+
+        if self.gene_rsids.get(gene) is None:
+            self.gene_rsids[gene] = rsid
+
+        format_keys = parts[8].split(":")
+        if "GT" not in format_keys:
+            counts = np.zeros(len(samples), dtype=np.int8)
+        else:
+            columns = parts[9:9 + len(samples)]
+            columns += ["."] * (len(samples) - len(columns))
+            unique, inverse = unique_gts(columns, format_keys.index("GT"))
+            counts = np.array([alt_allele_count(gt) for gt in unique], dtype=np.int8)[inverse]
+            if hits:
+                self._add_defined(gene, hits, unique, inverse, counts > 0)
+
+        self.record_genes.append(gene)
+        self.record_stars.append(star)
+        self.rows.append(counts)
+
+    def _add_defined(self, gene: str, hits, unique, inverse, carriers):
+        # VcfAccumulator._add_defined for every sample: alt dosage per defining variant
+        # and, for phased GTs, which haplotype carries it. Only samples with an alt
+        # allele on the record count, and they clear the gene's phased flag unless
+        # their GT is phased.
+        entry = self.defined.setdefault(gene, {"rows": [], "phased": np.ones(len(self.samples), dtype=bool)})
+        alleles = [gt.replace("|", "/").split("/") for gt in unique]
+        phased = np.array([len(a) == 2 and "/" not in gt for a, gt in zip(alleles, unique)])[inverse]
+        entry["phased"] &= phased | ~carriers
+        for index, vid in hits:
+            allele = str(index)
+            dosage = np.array([a.count(allele) for a in alleles], dtype=np.int8)[inverse] * carriers
+            first = np.array([a[0] == allele for a in alleles])[inverse] & phased & carriers
+            second = np.array([len(a) == 2 and a[1] == allele for a in alleles])[inverse] & phased & carriers
+            entry["rows"].append((vid, dosage, first, second))
+
+    def defined_calls(self, gene: str) -> tuple:
+        # (left, right, called) per sample from the allele definitions; samples are
+        # grouped by their dosage/haplotype pattern and each distinct pattern is
+        # called once.
+        entry = self.defined[gene]
+        vids = [row[0] for row in entry["rows"]]
+        n_rows = len(vids)
+        matrix = np.vstack([row[k] for k in (1, 2, 3) for row in entry["rows"]] + [entry["phased"]]).astype(np.int8)
+        patterns, inverse = np.unique(matrix, axis=1, return_inverse=True)
+        lefts, rights, called = [], [], []
+        for column in patterns.T.tolist():
+            dosages = {}
+            for vid, dosage in zip(vids, column[:n_rows]):
+                if dosage:
+                    dosages[vid] = dosages.get(vid, 0) + dosage
+            if not dosages:
+                stars = []
+            elif column[-1]:
+                haplotypes = [{vid for vid, on in zip(vids, column[start:start + n_rows]) if on} for start in (n_rows, 2 * n_rows)]
+                stars = self.definitions.call_phased(gene, haplotypes)
+            else:
+                stars = self.definitions.call(gene, dosages)
+            left, _, right = call_diplotype(stars).partition("/")
+            lefts.append(left)
+            rights.append(right)
+            called.append(bool(dosages))
+        inverse = inverse.ravel()
+        return np.array(lefts, dtype=object)[inverse], np.array(rights, dtype=object)[inverse], np.array(called)[inverse]
+
+    def genotypes(self) -> CohortGenotypes:
+        samples = self.samples or []
+        matrix = np.vstack(self.rows) if self.rows else np.zeros((0, len(samples)), dtype=np.int8)
+        defined = {gene: self.defined_calls(gene) for gene in self.defined}
+        return CohortGenotypes(samples, self.record_genes, self.record_stars, self.gene_rsids, matrix, defined)
+
+
+def parse_cohort_lines(lines, prefilter: bool | None = None) -> CohortGenotypes:
+    accumulator = CohortAccumulator(prefilter)
+    for line in lines:
+        accumulator.add_line(line)
+    return accumulator.genotypes()
+
+def parse_cohort_stream(chunks, prefilter: bool | None = None) -> CohortGenotypes:
+    return parse_cohort_lines(iter_vcf_lines(chunks), prefilter)
@@ -0,0 +1,242 @@
+"""Cohort-level pharmacogenomic report: phenotype frequencies per gene, risk label
+distribution per drug and actionable (Toxic/Ineffective) patient counts.
+
+    python -m app.services.cohort_report cohort.vcf.gz --drugs codeine,warfarin
+    python -m app.services.cohort_report patients.ndjson --drugs codeine --format ndjson
+    python -m app.services.cohort_report merge part1.json part2.json
+
+Counts live in fixed-shape counter arrays (gene x phenotype, drug x risk label), so
+memory does not grow with the cohort, and two reports over the same drug list merge
+by adding arrays: workers each build a partial report and the parent sums them.
+Results are deterministic (decision table); no LLM explanations are generated.
+"""
+import os
+import numpy as np
+from fastapi import HTTPException
+from pydantic import ValidationError
+from app.schemas.request import AnalysisRequest
+from app.services.activity_score import PHENOTYPE_BINS, UNKNOWN, get_phenotype
+from app.services.cpic_rules import CPIC_RULES, get_cpic_recommendation
+from app.services.decision_table import get_decision_table
+from app.services.drug_gene_map import resolve_drug
+from app.services.parser import parse_variants
+
+GENES = tuple(PHENOTYPE_BINS)
+PHENOTYPES = {gene: (*labels, UNKNOWN) for gene, (_, labels) in PHENOTYPE_BINS.items()}
+RISK_LABELS = tuple(dict.fromkeys(["Safe", *(rule["risk_label"] for rule in CPIC_RULES.values()), UNKNOWN]))
+ACTIONABLE_RISKS = ("Toxic", "Ineffective")
+# Patients per partial report when payloads are spread over workers.
+COHORT_REPORT_CHUNK_SIZE = int(os.getenv("COHORT_REPORT_CHUNK_SIZE", "256"))
+
+
+class CohortReport:
+    def __init__(self, drugs):
+        # Unknown drugs raise here (400), before any patient is counted.
+        self.drugs = list(dict.fromkeys(drugs))
+        if not self.drugs:
+            raise HTTPException(status_code=400, detail="A cohort report needs at least one drug")
+        self._resolved = [resolve_drug(drug) for drug in self.drugs]
+        self._phenotype_index = [{p: j for j, p in enumerate(PHENOTYPES[gene])} for gene in GENES]
+        self._risk_index = {risk: k for k, risk in enumerate(RISK_LABELS)}
+        self._actionable = np.array([risk in ACTIONABLE_RISKS for risk in RISK_LABELS])
+
+        self.patients = 0
+        self.failed = 0
+        self.actionable_patients = 0
+        self.phenotype_counts = np.zeros((len(GENES), max(len(p) for p in PHENOTYPES.values())), dtype=np.int64)
+        self.missing_counts = np.zeros(len(GENES), dtype=np.int64)
+        self.risk_counts = np.zeros((len(self.drugs), len(RISK_LABELS)), dtype=np.int64)
+
+    def add_variants(self, parsed_variants):
+        # One patient's parsed variants; the first record per gene is the call, as in
+        # assess_drug, and absent genes count as *1/*1.
+        calls = {}
+        for variant in parsed_variants:
+            calls.setdefault(variant["gene"], variant["diplotype"])
+
+        for i, gene in enumerate(GENES):
+            diplotype = calls.get(gene)
+            if diplotype is None:
+                self.missing_counts[i] += 1
+                diplotype = "*1/*1"
+            self.phenotype_counts[i, self._phenotype_index[i][get_phenotype(gene, diplotype)]] += 1
+
+        table = get_decision_table()
+        actionable = False
+        for d, (drug, gene) in enumerate(self._resolved):
+            risk = table.lookup(gene, calls.get(gene, "*1/*1"), drug).risk_label
+            self.risk_counts[d, self._risk_index[risk]] += 1
+            actionable = actionable or risk in ACTIONABLE_RISKS
+        self.patients += 1
+        self.actionable_patients += actionable
+
+    def add_payload(self, payload):
+        # An /analyze-style payload (variants, vcf_content or genotype_id); the
+        # report's drug list applies, so `drugs` may be omitted. Items that fail (bad
+        # JSON shape, unknown genotype_id, unsupported gene) are counted, not raised;
+        # anything else is a bug and propagates.
+        try:
+            if not isinstance(payload, dict):
+                raise ValueError("payload is not an object")
+            request = AnalysisRequest.model_validate({**payload, "patient_id": str(payload.get("patient_id", "")), "drugs": self.drugs})
+            parsed_variants = parse_variants(request)
+        except (HTTPException, ValidationError, ValueError):
+            self.failed += 1
+            return
+        self.add_variants(parsed_variants)
+
+    def add_cohort(self, cohort):
+        # A CohortGenotypes (multi-sample VCF): every sample at once, as array ops.
+        n = len(cohort.samples)
+        if n == 0:
+            return
+        phenotypes = {}
+        for i, gene in enumerate(GENES):
+            if gene in cohort.gene_rsids:
+                phenotypes[gene] = cohort.phenotypes(gene)
+            else:
+                self.missing_counts[i] += n
+                phenotypes[gene] = np.full(n, get_phenotype(gene, "*1/*1"), dtype=object)
+            labels, counts = np.unique(phenotypes[gene].astype(str), return_counts=True)
+            for label, count in zip(labels.tolist(), counts.tolist()):
+                self.phenotype_counts[i, self._phenotype_index[i][label]] += count
+
+        actionable = np.zeros(n, dtype=bool)
+        for d, (drug, gene) in enumerate(self._resolved):
+            labels, inverse = np.unique(phenotypes[gene].astype(str), return_inverse=True)
+            risks = np.array([
+                self._risk_index[get_cpic_recommendation(gene, label, drug)["risk_label"]]
+                for label in labels.tolist()
+            ])[inverse]
+            self.risk_counts[d] += np.bincount(risks, minlength=len(RISK_LABELS))
+            actionable |= self._actionable[risks]
+        self.patients += n
+        self.actionable_patients += int(actionable.sum())
+
+    def merge(self, other: "CohortReport") -> "CohortReport":
+        if other.drugs != self.drugs:
+            raise ValueError("Cohort reports over different drug lists cannot be merged")
+        self.patients += other.patients
+        self.failed += other.failed
+        self.actionable_patients += other.actionable_patients
+        self.phenotype_counts += other.phenotype_counts
+        self.missing_counts += other.missing_counts
+        self.risk_counts += other.risk_counts
+        return self
+
+    def to_dict(self) -> dict:
+        genes = {}
+        for i, gene in enumerate(GENES):
+            counts = {p: int(self.phenotype_counts[i, j]) for j, p in enumerate(PHENOTYPES[gene])}
+            genes[gene] = {
+                "phenotypes": counts,
+                "frequencies": {p: round(c / self.patients, 6) if self.patients else 0.0 for p, c in counts.items()},
+                "missing": int(self.missing_counts[i]),
+            }
+        drugs = {}
+        for d, (drug, (canonical, gene)) in enumerate(zip(self.drugs, self._resolved)):
+            risks = {risk: int(self.risk_counts[d, k]) for k, risk in enumerate(RISK_LABELS)}
+            drugs[drug] = {
+                "gene": gene,
+                "risk_labels": risks,
+                "actionable": sum(risks[r] for r in ACTIONABLE_RISKS),
+            }
+        return {
+            "patients": self.patients,
+            "failed": self.failed,
+            "actionable_patients": self.actionable_patients,
+            "genes": genes,
+            "drugs": drugs,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CohortReport":
+        # Inverse of to_dict, for merging partial reports saved as JSON.
+        report = cls(list(data["drugs"]))
+        report.patients = data["patients"]
+        report.failed = data.get("failed", 0)
+        report.actionable_patients = data["actionable_patients"]
+        for i, gene in enumerate(GENES):
+            entry = data["genes"].get(gene, {})
+            for j, phenotype in enumerate(PHENOTYPES[gene]):
+                report.phenotype_counts[i, j] = entry.get("phenotypes", {}).get(phenotype, 0)
+            report.missing_counts[i] = entry.get("missing", 0)
+        for d, drug in enumerate(report.drugs):
+            for k, risk in enumerate(RISK_LABELS):
+                report.risk_counts[d, k] = data["drugs"][drug]["risk_labels"].get(risk, 0)
+        return report
+
+
+def report_payloads(drugs, payloads) -> CohortReport:
+    # Worker-side unit of a parallel report: one partial report per chunk.
+    report = CohortReport(drugs)
+    for payload in payloads:
+        report.add_payload(payload)
+    return report
+
+
+def report_payload_stream(drugs, payloads, chunk_size: int = COHORT_REPORT_CHUNK_SIZE, executor=None) -> CohortReport:
+    # Chunks of patients go to the executor (at most two per worker in flight) and
+    # their partial reports are merged as they finish; memory stays bounded by the
+    # chunks in flight.
+    report = CohortReport(drugs)
+    chunk, pending = [], []
+    limit = 2 * getattr(executor, "_max_workers", 1)
+
+    def drain(keep: int):
+        while len(pending) > keep:
+            report.merge(pending.pop(0).result())
+
+    for payload in payloads:
+        chunk.append(payload)
+        if len(chunk) >= chunk_size:
+            if executor is None:
+                report.merge(report_payloads(report.drugs, chunk))
+            else:
+                pending.append(executor.submit(report_payloads, report.drugs, chunk))
+                drain(limit)
+            chunk = []
+    if chunk:
+        if executor is None:
+            report.merge(report_payloads(report.drugs, chunk))
+        else:
+            pending.append(executor.submit(report_payloads, report.drugs, chunk))
+    drain(0)
+    return report
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    import sys
+    from app.services.cohort import parse_cohort_stream
+    from app.services.vcf_stream import iter_file_chunks
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="+", help="a cohort VCF (.vcf/.vcf.gz), an NDJSON file, or after 'merge' partial report JSON files")
+    parser.add_argument("--drugs", default="", help="comma-separated drug list")
+    parser.add_argument("--format", choices=["vcf", "ndjson"], default="vcf")
+    args = parser.parse_args()
+
+    if args.inputs[0] == "merge":
+        parts = []
+        for path in args.inputs[1:]:
+            with open(path, encoding="utf-8") as f:
+                parts.append(CohortReport.from_dict(json.load(f)))
+        if not parts:
+            sys.exit("merge needs at least one report")
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+        print(json.dumps(merged.to_dict(), indent=2))
+        sys.exit(0)
+
+    report = CohortReport([d.strip() for d in args.drugs.split(",") if d.strip()])
+    for path in args.inputs:
+        if args.format == "ndjson":
+            with open(path, encoding="utf-8") as f:
+                report.merge(report_payload_stream(report.drugs, (json.loads(line) for line in f if line.strip())))
+        else:
+            with open(path, "rb") as f:
+                report.add_cohort(parse_cohort_stream(iter_file_chunks(f)))
+    print(json.dumps(report.to_dict(), indent=2))
@@ -0,0 +1,124 @@
+"""Genotype -> phenotype -> CPIC recommendation, expanded ahead of time.
+
+    python -m app.services.decision_table   # print the validation report
+"""
+import sys
+from functools import lru_cache
+from typing import NamedTuple
+from app.services.activity_score import phenotype_labels
+from app.services.confidence import get_confidence_score
+from app.services.cpic_rules import CPIC_RULES, get_cpic_recommendation
+from app.services.drug_gene_builder import REQUIRED_DRUG_MAP
+from app.services.drug_gene_map import get_drug_gene_map
+from app.services.phenotype_engine import PHENOTYPE_MAP, canonicalize_diplotype, get_phenotype
+
+
+class Recommendation(NamedTuple):
+    phenotype: str
+    risk_label: str
+    severity: str
+    action: str
+    details: str
+    evidence: str
+    confidence_score: float
+
+
+class DecisionTable:
+    def __init__(self, entries: dict):
+        self.entries = entries
+
+    def lookup(self, gene: str, diplotype: str, drug: str) -> Recommendation:
+        drug_id = (drug or "").strip().lower()
+        rec = self.entries.get((gene, diplotype, drug_id))
+        if rec is not None:
+            return rec
+        rec = self.entries.get((gene, canonicalize_diplotype(diplotype), drug_id))
+        if rec is not None:
+            return rec
+        # Diplotypes outside PHENOTYPE_MAP and drug spellings outside the drug map
+        # (aliases, casing) take the uncompiled path.
+        return make_recommendation(gene, get_phenotype(gene, diplotype), drug)
+
+
+def make_recommendation(gene: str, phenotype: str, drug: str) -> Recommendation:
+    cpic = get_cpic_recommendation(gene, phenotype, drug)
+    return Recommendation(
+        phenotype,
+        cpic["risk_label"],
+        cpic["severity"],
+        cpic["action"],
+        cpic["details"],
+        cpic.get("evidence", "C"),
+        get_confidence_score(cpic.get("evidence", "C")),
+    )
+
+def _diplotype_orderings(diplotype: str) -> set:
+    parts = diplotype.split("/")
+    if len(parts) != 2:
+        return {diplotype}
+    return {f"{parts[0]}/{parts[1]}", f"{parts[1]}/{parts[0]}"}
+
+def compile_decision_table(drug_gene_map=None) -> DecisionTable:
+    drug_gene_map = drug_gene_map if drug_gene_map is not None else get_drug_gene_map()
+    shared = {}
+    entries = {}
+
+    def intern(rec: Recommendation) -> Recommendation:
+        return shared.setdefault(rec, rec)
+
+    # Only drugs with a CPIC rule or in the required map are expanded; the thousands of
+    # extended-map drugs all resolve to Safe/Unknown and take the uncompiled path.
+    drugs = dict.fromkeys([*REQUIRED_DRUG_MAP, *(d for _, _, d in CPIC_RULES)])
+    for drug in drugs:
+        gene = drug_gene_map.get(drug)
+        if not gene:
+            continue
+        drug_id = sys.intern(drug)
+        gene = sys.intern(gene)
+        for diplotype in PHENOTYPE_MAP.get(gene, {}):
+            rec = intern(make_recommendation(gene, get_phenotype(gene, diplotype), drug_id))
+            for ordering in _diplotype_orderings(diplotype):
+                entries[(gene, sys.intern(ordering), drug_id)] = rec
+
+    return DecisionTable(entries)
+
+@lru_cache(maxsize=1)
+def get_decision_table() -> DecisionTable:
+    return compile_decision_table()
+
+
+def validation_report(table: DecisionTable | None = None, drug_gene_map=None) -> dict:
+    drug_gene_map = drug_gene_map if drug_gene_map is not None else get_drug_gene_map()
+    table = table or compile_decision_table(drug_gene_map)
+
+    unreachable = []
+    for gene, phenotype, drug in CPIC_RULES:
+        if drug_gene_map.get(drug) != gene:
+            reason = f"{drug} resolves to {drug_gene_map.get(drug)}"
+        elif phenotype not in phenotype_labels(gene):
+            reason = f"no {gene} activity score maps to phenotype {phenotype}"
+        else:
+            continue
+        unreachable.append({"gene": gene, "phenotype": phenotype, "drug": drug, "reason": reason})
+
+    unknown = sorted(
+        {
+            (gene, canonicalize_diplotype(diplotype), drug, rec.phenotype)
+            for (gene, diplotype, drug), rec in table.entries.items()
+            if rec.risk_label == "Unknown"
+        }
+    )
+    return {
+        "entries": len(table.entries),
+        "distinct_recommendations": len({id(r) for r in table.entries.values()}),
+        "unreachable_rules": unreachable,
+        "unknown_diplotypes": [
+            {"gene": g, "diplotype": d, "drug": drug, "phenotype": p} for g, d, drug, p in unknown
+        ],
+    }
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(validation_report(), indent=2))
@@ -1,5 +1,5 @@
 import os
-from app.services.clinpgx_loader import load_relationships
+from app.services.kb_artifact import KnowledgeBase, kb_artifact_path
 
 VALID_RELATIONS = {"associated", "metabolizes", "affects", "influences"}
 
@@ -18,7 +18,18 @@ def build_drug_gene_map():
     if os.getenv("ENABLE_EXTENDED_DRUG_MAP", "false").lower() != "true":
         return mapping
 
+    artifact = kb_artifact_path()
+    if artifact and os.path.exists(artifact):
+        try:
+            # Compiled ahead of time with `python -m app.services.kb_artifact build`;
+            # the artifact is mmapped, so workers share it and pandas is never loaded.
+            return KnowledgeBase(artifact, defaults=mapping)
+        except Exception:
+            pass
+
     try:
+        from app.services.clinpgx_loader import load_relationships
+
         df = load_relationships()
         for _, row in df.iterrows():
             gene = row.get("Entity1_name")
@@ -1,20 +1,61 @@
 from fastapi import HTTPException
 from functools import lru_cache
 from app.services.drug_gene_builder import build_drug_gene_map
+from app.services.drug_index import DrugIndex
 
+# Brand names and spellings -> generic name in the drug map. Salt forms and
+# hyphenation/case variants are handled by the index and need no entry here.
 DRUG_ALIASES = {
     "clopidogrel bisulfate": "clopidogrel",
     "clopidogrel hydrogen sulfate": "clopidogrel",
     "plavix": "clopidogrel",
     "warfarin sodium": "warfarin",
-    "5-fluorouracil": "fluorouracil"
+    "5-fluorouracil": "fluorouracil",
+    "5-fu": "fluorouracil",
+    "adrucil": "fluorouracil",
+    "efudex": "fluorouracil",
+    "carac": "fluorouracil",
+    "coumadin": "warfarin",
+    "jantoven": "warfarin",
+    "zocor": "simvastatin",
+    "flolipid": "simvastatin",
+    "imuran": "azathioprine",
+    "azasan": "azathioprine",
+    "tylenol with codeine": "codeine",
+    "tylenol #3": "codeine",
+    "xeloda": "capecitabine",
+    "purixan": "mercaptopurine",
+    "tabloid": "thioguanine",
+    "celebrex": "celecoxib",
+    "lipitor": "atorvastatin",
+    "crestor": "rosuvastatin",
+    "prilosec": "omeprazole",
+    "nexium": "esomeprazole",
+    "protonix": "pantoprazole",
+    "celexa": "citalopram",
+    "lexapro": "escitalopram",
+    "zoloft": "sertraline",
+    "paxil": "paroxetine",
+    "prozac": "fluoxetine",
+    "ultram": "tramadol",
+    "zofran": "ondansetron",
+    "risperdal": "risperidone",
+    "strattera": "atomoxetine",
+    "dilantin": "phenytoin",
 }
 
 @lru_cache(maxsize=1)
 def get_drug_gene_map():
     return build_drug_gene_map()
 
-def get_primary_gene(drug: str) -> str:
+@lru_cache(maxsize=1)
+def get_drug_index() -> DrugIndex:
+    # Built on the first name that is not an exact key of the map (or on /drugs).
+    return DrugIndex(get_drug_gene_map(), DRUG_ALIASES)
+
+def resolve_drug(drug: str) -> tuple:
+    # (canonical drug name in the map, primary gene). Exact names and aliases skip
+    # the index; misses answer with the closest names.
     if not drug:
         raise HTTPException(status_code=400, detail="Drug name missing")
 
@@ -23,11 +64,18 @@ def get_primary_gene(drug: str) -> str:
 
     drug_gene_map = get_drug_gene_map()
     gene = drug_gene_map.get(drug)
+    if gene:
+        return drug, gene
 
-    if not gene:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported drug: {drug}. Available: {list(drug_gene_map.keys())[:10]}"
-        )
+    index = get_drug_index()
+    canonical = index.resolve(drug)
+    if canonical is None:
+        suggestions = index.suggest(drug)
+        detail = f"Unsupported drug: {drug}."
+        if suggestions:
+            detail += f" Did you mean: {', '.join(suggestions)}?"
+        raise HTTPException(status_code=400, detail=detail)
+    return canonical, drug_gene_map[canonical]
 
-    return gene
+def get_primary_gene(drug: str) -> str:
+    return resolve_drug(drug)[1]
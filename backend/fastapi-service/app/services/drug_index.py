@@ -0,0 +1,149 @@
+"""Drug name index over the drug -> gene map: normalized keys, salt forms, brand
+names, prefix search and edit-distance suggestions.
+
+    python -m app.services.drug_index resolve Plavix "warfarin sodium" 5-FU
+    python -m app.services.drug_index prefix clop
+    python -m app.services.drug_index suggest warfarine
+
+A name's key ignores case, whitespace and punctuation ("5-Fluoro uracil" ->
+"5fluorouracil"), so resolving is one dict lookup over a string the length of the
+name. Trailing salt words are tried second ("clopidogrel bisulfate" ->
+"clopidogrel"). Prefix queries bisect a sorted array of keys. Suggestions are only
+computed on a miss: a bigram index narrows the names to those sharing enough
+bigrams to be within the edit bound, and only those get bounded Levenshtein.
+"""
+from bisect import bisect_left
+
+SALT_WORDS = frozenset({
+    "acetate", "besylate", "bisulfate", "bitartrate", "bromide", "calcium", "carbonate",
+    "chloride", "citrate", "dihydrate", "disodium", "fumarate", "hcl", "hydrobromide",
+    "hydrochloride", "hydrogen", "hyclate", "maleate", "magnesium", "mesylate",
+    "monohydrate", "phosphate", "potassium", "sodium", "succinate", "sulfate",
+    "tartrate", "tosylate",
+})
+
+
+def name_words(name: str) -> list:
+    return "".join(ch if ch.isalnum() else " " for ch in name.lower()).split()
+
+def drug_key(name: str) -> str:
+    return "".join(name_words(name))
+
+def base_key(name: str) -> str:
+    # Key with trailing salt words removed; the first word is always kept.
+    words = name_words(name)
+    while len(words) > 1 and words[-1] in SALT_WORDS:
+        words.pop()
+    return "".join(words)
+
+def bigrams(key: str) -> set:
+    return {key[i:i + 2] for i in range(len(key) - 1)}
+
+def bounded_edit_distance(a: str, b: str, limit: int) -> int:
+    # Levenshtein distance, or limit + 1 as soon as it must exceed `limit`.
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return min(previous[-1], limit + 1)
+
+
+class DrugIndex:
+    def __init__(self, drug_gene_map, aliases: dict | None = None):
+        self.drug_gene_map = drug_gene_map
+        drugs = list(drug_gene_map)
+        aliases = {a: d for a, d in (aliases or {}).items() if d in drug_gene_map}
+
+        # Exact keys win over salt-stripped ones, which win over aliases.
+        self._keys = {}
+        for drug in drugs:
+            self._keys.setdefault(drug_key(drug), drug)
+        for drug in drugs:
+            self._keys.setdefault(base_key(drug), drug)
+        for alias, drug in aliases.items():
+            self._keys.setdefault(drug_key(alias), drug)
+
+        names = sorted({(drug_key(n), n, d) for n, d in [*((d, d) for d in drugs), *aliases.items()]})
+        self._prefix_keys = [key for key, _, _ in names]
+        self._prefix_names = [(name, drug) for _, name, drug in names]
+        self._bigrams = {}
+        for i, key in enumerate(self._prefix_keys):
+            for gram in bigrams(key):
+                self._bigrams.setdefault(gram, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def resolve(self, name: str) -> str | None:
+        # Canonical drug in the map, or None.
+        if not name:
+            return None
+        drug = self._keys.get(drug_key(name))
+        if drug is None:
+            drug = self._keys.get(base_key(name))
+        return drug
+
+    def prefix(self, prefix: str, limit: int = 20) -> list:
+        # Drugs whose name (or an alias) starts with `prefix`, one entry per drug.
+        key = drug_key(prefix)
+        out = {}
+        i = bisect_left(self._prefix_keys, key)
+        while i < len(self._prefix_keys) and self._prefix_keys[i].startswith(key) and len(out) < limit:
+            name, drug = self._prefix_names[i]
+            if drug not in out:
+                out[drug] = {"drug": drug, "gene": self.drug_gene_map[drug], "matched": name}
+            i += 1
+        return list(out.values())
+
+    def suggest(self, name: str, limit: int = 5, max_distance: int = 2) -> list:
+        # Closest drugs by edit distance on the key; short names allow one edit.
+        key = base_key(name)
+        if not key:
+            return []
+        max_distance = min(max_distance, max(1, len(key) // 4))
+        # Each edit removes at most two of the key's distinct bigrams, so a name
+        # within the bound shares at least this many of them.
+        grams = bigrams(key)
+        needed = len(grams) - 2 * max_distance
+        if needed > 0:
+            shared = {}
+            for gram in grams:
+                for i in self._bigrams.get(gram, ()):
+                    shared[i] = shared.get(i, 0) + 1
+            candidates = [i for i, count in shared.items() if count >= needed]
+        else:
+            candidates = range(len(self._prefix_keys))
+
+        scored = {}
+        for i in candidates:
+            candidate = self._prefix_keys[i]
+            drug = self._prefix_names[i][1]
+            distance = bounded_edit_distance(key, candidate, max_distance)
+            if distance <= max_distance and distance < scored.get(drug, max_distance + 1):
+                scored[drug] = distance
+        return sorted(scored, key=lambda d: (scored[d], d))[:limit]
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from app.services.drug_gene_map import get_drug_index
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["resolve", "prefix", "suggest"])
+    parser.add_argument("names", nargs="+")
+    args = parser.parse_args()
+
+    index = get_drug_index()
+    if args.command == "resolve":
+        print(json.dumps({name: index.resolve(name) for name in args.names}, indent=2))
+    elif args.command == "prefix":
+        print(json.dumps({name: index.prefix(name) for name in args.names}, indent=2))
+    else:
+        print(json.dumps({name: index.suggest(name) for name in args.names}, indent=2))
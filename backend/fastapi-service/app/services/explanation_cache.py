@@ -0,0 +1,229 @@
+"""Two-tier cache for LLM explanations: in-process LRU in front of SQLite.
+
+    python -m app.services.explanation_cache warm   # pre-generate every reachable combination
+    python -m app.services.explanation_cache stats
+
+The cache lives in this process only unless EXPLANATION_CACHE_PATH names an SQLite
+file (created 0600), which every worker on the host then shares. `warm` needs the
+file (nothing would outlive a memory-only cache). On the LLM loop only the memory
+tier is read inline; SQLite calls run in a worker thread.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+
+def make_key(version: str, gene: str, phenotype: str, drug: str, risk: str) -> str:
+    return "|".join([
+        version,
+        (gene or "").strip().upper(),
+        (phenotype or "").strip(),
+        (drug or "").strip().lower(),
+        (risk or "").strip(),
+    ])
+
+
+class ExplanationCache:
+    def __init__(self, path: str | None = None, memory_size: int = 1024, ttl_seconds: float = 30 * 86400, max_entries: int = 50000):
+        self.path = path
+        self.memory_size = memory_size
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        # The memory tier and the SQLite connection have separate locks, so a memory
+        # lookup never waits on disk I/O in another thread.
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._db = None
+        # The size cap is enforced every `_trim_every` stores rather than counting
+        # the table on each one.
+        self._trim_every = max(1, max_entries // 100)
+        self._stores_since_trim = 0
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0}
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+            os.chmod(path, 0o600)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS explanations ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS explanations_accessed ON explanations (accessed_at)")
+
+    def get(self, key: str) -> dict | None:
+        cached = self.get_memory(key)
+        if cached is None and self._db is not None:
+            return self.get_disk(key)
+        return cached
+
+    def get_memory(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None and time.time() - entry[1] <= self.ttl_seconds:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return dict(entry[0])
+            if entry is not None:
+                del self._memory[key]
+                self.counters["expired"] += 1
+            if self._db is None:
+                self.counters["misses"] += 1
+            return None
+
+    def get_disk(self, key: str) -> dict | None:
+        # Blocking SQLite read; call it off the event loop.
+        now = time.time()
+        with self._db_lock:
+            row = self._db.execute("SELECT value, created_at FROM explanations WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] <= self.ttl_seconds:
+                self._db.execute("UPDATE explanations SET accessed_at = ? WHERE key = ?", (now, key))
+            elif row:
+                self._db.execute("DELETE FROM explanations WHERE key = ?", (key,))
+        with self._lock:
+            if row and now - row[1] <= self.ttl_seconds:
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self.counters["disk_hits"] += 1
+                return dict(value)
+            if row:
+                self.counters["expired"] += 1
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, key: str, value: dict):
+        self.put_memory(key, value)
+        if self._db is not None:
+            self.put_disk(key, value)
+
+    def put_memory(self, key: str, value: dict):
+        with self._lock:
+            self._remember(key, dict(value), time.time())
+            self.counters["stores"] += 1
+
+    def put_disk(self, key: str, value: dict):
+        # Blocking SQLite write; call it off the event loop.
+        now = time.time()
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO explanations (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now),
+            )
+            self._stores_since_trim += 1
+            if self._stores_since_trim < self._trim_every:
+                return
+            self._stores_since_trim = 0
+            count = self._db.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+            evicted = 0
+            if count > self.max_entries:
+                evicted = self._db.execute(
+                    "DELETE FROM explanations WHERE key IN "
+                    "(SELECT key FROM explanations ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_entries,),
+                ).rowcount
+        if evicted:
+            with self._lock:
+                self.counters["evictions"] += evicted
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self._db is not None:
+            with self._db_lock:
+                self._db.execute("DELETE FROM explanations")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        if self._db is not None:
+            with self._db_lock:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM explanations").fetchone()[0]
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else None
+        return stats
+
+    def _remember(self, key: str, value: dict, created_at: float):
+        if self.memory_size <= 0:
+            return
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            self.counters["evictions"] += 1
+
+
+@lru_cache(maxsize=1)
+def _build_cache() -> ExplanationCache:
+    return ExplanationCache(
+        path=os.getenv("EXPLANATION_CACHE_PATH") or None,
+        memory_size=int(os.getenv("EXPLANATION_CACHE_MEMORY_SIZE", "1024")),
+        ttl_seconds=float(os.getenv("EXPLANATION_CACHE_TTL_SECONDS", str(30 * 86400))),
+        max_entries=int(os.getenv("EXPLANATION_CACHE_MAX_ENTRIES", "50000")),
+    )
+
+def get_explanation_cache() -> ExplanationCache | None:
+    if os.getenv("EXPLANATION_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    return _build_cache()
+
+
+def reachable_combinations() -> list:
+    # Every (gene, phenotype, drug, risk) the rule tables can produce for the drug map.
+    from app.services.cpic_rules import CPIC_RULES, SAFE_PHENOTYPE_BY_GENE, get_cpic_recommendation
+    from app.services.drug_gene_map import get_drug_gene_map
+    from app.services.activity_score import phenotype_labels
+
+    combos = []
+    seen = set()
+    for drug, gene in get_drug_gene_map().items():
+        phenotypes = set(phenotype_labels(gene))
+        phenotypes |= SAFE_PHENOTYPE_BY_GENE.get(gene, set())
+        phenotypes |= {p for (g, p, d) in CPIC_RULES if g == gene and d == drug}
+        phenotypes.add("Unknown")
+        for phenotype in sorted(phenotypes):
+            risk = get_cpic_recommendation(gene, phenotype, drug)["risk_label"]
+            if (gene, phenotype, drug, risk) not in seen:
+                seen.add((gene, phenotype, drug, risk))
+                combos.append((gene, phenotype, drug, risk))
+    return combos
+
+def warm() -> dict:
+    import asyncio
+    from app.services.llm_service import generate_explanation, run_llm
+
+    combos = reachable_combinations()
+
+    async def generate_all():
+        return await asyncio.gather(*(generate_explanation(*combo) for combo in combos))
+
+    run_llm(generate_all())
+    return {"combinations": len(combos), "cache": get_explanation_cache().stats()}
+
+
+if __name__ == "__main__":
+    import argparse
+    # Run against the importable module so the CLI and llm_service share one cache instance.
+    from app.services.explanation_cache import get_explanation_cache, warm
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["warm", "stats", "clear"])
+    args = parser.parse_args()
+
+    cache = get_explanation_cache()
+    if cache is None:
+        raise SystemExit("Explanation cache is disabled (EXPLANATION_CACHE_ENABLED=false)")
+    if args.command == "warm":
+        if cache.path is None:
+            raise SystemExit("EXPLANATION_CACHE_PATH is not set (memory-only cache); set it to a file to warm")
+        print(json.dumps(warm(), indent=2))
+    elif args.command == "stats":
+        print(json.dumps(cache.stats(), indent=2))
+    else:
+        cache.clear()
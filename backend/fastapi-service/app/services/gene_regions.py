@@ -0,0 +1,76 @@
+from bisect import bisect_right
+from functools import lru_cache
+
+# Pharmacogene loci (1-based, inclusive), padded by ~2 kb to keep promoter and
+# flanking star-allele sites such as CYP2C19*17 inside the interval.
+PGX_LOCI = {
+    "GRCh38": {
+        "CYP2D6": ("22", 42125000, 42132000),
+        "CYP2C19": ("10", 94759000, 94858000),
+        "CYP2C9": ("10", 94936000, 94991000),
+        "SLCO1B1": ("12", 21128000, 21242000),
+        "TPMT": ("6", 18126000, 18157000),
+        "DPYD": ("1", 97075000, 97924000),
+    },
+    "GRCh37": {
+        "CYP2D6": ("22", 42520000, 42528000),
+        "CYP2C19": ("10", 96520000, 96615000),
+        "CYP2C9": ("10", 96696000, 96751000),
+        "SLCO1B1": ("12", 21282000, 21395000),
+        "TPMT": ("6", 18126000, 18158000),
+        "DPYD": ("1", 97541000, 98389000),
+    },
+}
+
+# Lab exports regularly declare one build in ##reference while carrying lifted
+# coordinates from the other, so lookups cover both builds by default.
+DEFAULT_ASSEMBLIES = ("GRCh38", "GRCh37")
+
+
+def normalize_chrom(chrom: str) -> str:
+    if chrom[:3].lower() == "chr":
+        return chrom[3:]
+    return chrom
+
+def pgx_regions(assemblies=DEFAULT_ASSEMBLIES) -> list:
+    regions = []
+    for assembly in assemblies:
+        for gene, (chrom, start, end) in PGX_LOCI[assembly].items():
+            regions.append((chrom, start, end, gene))
+    return sorted(regions)
+
+
+class RegionIndex:
+    # Sorted, merged intervals per chromosome for "is this position in any
+    # pharmacogene?" checks on every VCF line. Keys are stored with and without the
+    # "chr" prefix so the raw CHROM column can be looked up as is.
+
+    def __init__(self, regions):
+        by_chrom = {}
+        for chrom, start, end, _ in sorted(regions):
+            intervals = by_chrom.setdefault(normalize_chrom(chrom), [])
+            if intervals and start <= intervals[-1][1] + 1:
+                intervals[-1][1] = max(intervals[-1][1], end)
+            else:
+                intervals.append([start, end])
+        self._index = {}
+        for chrom, intervals in by_chrom.items():
+            entry = ([s for s, _ in intervals], [e for _, e in intervals])
+            self._index[chrom] = self._index[f"chr{chrom}"] = entry
+
+    def contains(self, chrom: str, pos) -> bool:
+        entry = self._index.get(chrom)
+        if entry is None:
+            return False
+        try:
+            pos = int(pos)
+        except ValueError:
+            return False
+        starts, ends = entry
+        i = bisect_right(starts, pos) - 1
+        return i >= 0 and pos <= ends[i]
+
+
+@lru_cache(maxsize=None)
+def pgx_region_index(assemblies=DEFAULT_ASSEMBLIES) -> RegionIndex:
+    return RegionIndex(pgx_regions(assemblies))
@@ -0,0 +1,189 @@
+"""Content-addressed store of parsed genotype profiles (POST /genotypes).
+
+    python -m app.services.genotype_store stats
+    python -m app.services.genotype_store clear
+    python -m app.services.genotype_store delete <genotype_id>
+
+A VCF is parsed once; its normalized variant list is kept under the hash of that list
+and /analyze takes the hash as `genotype_id`. Profiles are patient data: by default
+they live in this process only. With GENOTYPE_STORE_PATH set, an SQLite file (created
+0600) sits behind the in-process LRU so every worker on the host and the batch process
+pool see the same profiles.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+
+# accessed_at is written back at most once per this fraction of the TTL, so reads do
+# not each cost an SQLite write; a profile may expire up to that much early.
+TOUCH_INTERVAL_FRACTION = 0.1
+
+
+def genotype_id(variants: list) -> str:
+    # Order is kept: the first record per gene is the one an analysis uses.
+    payload = json.dumps(variants, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class GenotypeStore:
+    def __init__(self, path: str | None = None, memory_size: int = 1024, ttl_seconds: float = 7 * 86400, max_entries: int = 100000):
+        self.path = path
+        self.memory_size = memory_size
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._touch_interval = ttl_seconds * TOUCH_INTERVAL_FRACTION
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0, "touches": 0}
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+            os.chmod(path, 0o600)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS genotypes ("
+                "id TEXT PRIMARY KEY, variants TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS genotypes_accessed ON genotypes (accessed_at)")
+
+    def get(self, profile_id: str) -> list | None:
+        # Expiry counts from the last use, so profiles in active use are kept.
+        with self._lock:
+            now = time.time()
+            entry = self._memory.get(profile_id)
+            if entry is not None and now - entry[1] <= self.ttl_seconds:
+                touched_at = self._touch(profile_id, entry[2], now)
+                self._memory[profile_id] = (entry[0], now, touched_at)
+                self._memory.move_to_end(profile_id)
+                self.counters["memory_hits"] += 1
+                return [dict(v) for v in entry[0]]
+            if entry is not None:
+                del self._memory[profile_id]
+                self.counters["expired"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT variants, accessed_at FROM genotypes WHERE id = ?", (profile_id,)
+                ).fetchone()
+                if row and now - row[1] <= self.ttl_seconds:
+                    variants = json.loads(row[0])
+                    self._remember(profile_id, variants, now, self._touch(profile_id, row[1], now))
+                    self.counters["disk_hits"] += 1
+                    return [dict(v) for v in variants]
+                if row:
+                    self._db.execute("DELETE FROM genotypes WHERE id = ?", (profile_id,))
+                    self.counters["expired"] += 1
+
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, variants: list) -> tuple:
+        # Returns (genotype_id, created); storing a profile that is already there
+        # only refreshes it.
+        profile_id = genotype_id(variants)
+        variants = [dict(v) for v in variants]
+        with self._lock:
+            now = time.time()
+            created = profile_id not in self._memory
+            self._remember(profile_id, variants, now)
+            if self._db is not None:
+                created = self._db.execute(
+                    "INSERT OR IGNORE INTO genotypes (id, variants, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (profile_id, json.dumps(variants, separators=(",", ":")), now, now),
+                ).rowcount == 1
+                if not created:
+                    self._db.execute("UPDATE genotypes SET accessed_at = ? WHERE id = ?", (now, profile_id))
+                self._evict()
+            if created:
+                self.counters["stores"] += 1
+        return profile_id, created
+
+    def delete(self, profile_id: str) -> bool:
+        with self._lock:
+            deleted = self._memory.pop(profile_id, None) is not None
+            if self._db is not None:
+                deleted = self._db.execute("DELETE FROM genotypes WHERE id = ?", (profile_id,)).rowcount > 0 or deleted
+            return deleted
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM genotypes")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+            if self._db is not None:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM genotypes").fetchone()[0]
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else None
+        return stats
+
+    def _touch(self, profile_id: str, touched_at: float, now: float) -> float:
+        # Returns when the row's accessed_at was last written.
+        if self._db is None or now - touched_at <= self._touch_interval:
+            return touched_at
+        self._db.execute("UPDATE genotypes SET accessed_at = ? WHERE id = ?", (now, profile_id))
+        self.counters["touches"] += 1
+        return now
+
+    def _evict(self):
+        # Least recently used first, once the table is over max_entries.
+        count = self._db.execute("SELECT COUNT(*) FROM genotypes").fetchone()[0]
+        if count > self.max_entries:
+            evicted = [row[0] for row in self._db.execute(
+                "SELECT id FROM genotypes ORDER BY accessed_at LIMIT ?", (count - self.max_entries,)
+            )]
+            self._db.executemany("DELETE FROM genotypes WHERE id = ?", [(i,) for i in evicted])
+            for profile_id in evicted:
+                self._memory.pop(profile_id, None)
+            self.counters["evictions"] += len(evicted)
+
+    def _remember(self, profile_id: str, variants: list, accessed_at: float, touched_at: float | None = None):
+        if self.memory_size <= 0:
+            return
+        self._memory[profile_id] = (variants, accessed_at, accessed_at if touched_at is None else touched_at)
+        self._memory.move_to_end(profile_id)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+            if self._db is None:
+                self.counters["evictions"] += 1
+
+
+@lru_cache(maxsize=1)
+def get_genotype_store() -> GenotypeStore:
+    return GenotypeStore(
+        path=os.getenv("GENOTYPE_STORE_PATH") or None,
+        memory_size=int(os.getenv("GENOTYPE_STORE_MEMORY_SIZE", "1024")),
+        ttl_seconds=float(os.getenv("GENOTYPE_STORE_TTL_SECONDS", str(7 * 86400))),
+        max_entries=int(os.getenv("GENOTYPE_STORE_MAX_ENTRIES", "100000")),
+    )
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["stats", "clear", "delete"])
+    parser.add_argument("genotype_ids", nargs="*")
+    args = parser.parse_args()
+
+    store = get_genotype_store()
+    if store.path is None:
+        raise SystemExit("GENOTYPE_STORE_PATH is not set: profiles only live inside the server processes")
+    if args.command == "stats":
+        print(json.dumps(store.stats(), indent=2))
+    elif args.command == "delete":
+        print(json.dumps({profile_id: store.delete(profile_id) for profile_id in args.genotype_ids}, indent=2))
+    else:
+        store.clear()
@@ -0,0 +1,238 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = {SUCCEEDED, FAILED, CANCELLED}
+
+PUBLIC_FIELDS = ("id", "kind", "status", "progress", "error", "created_at", "started_at", "finished_at", "expires_at")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class InMemoryJobStore:
+    def __init__(self):
+        self._jobs = {}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def create(self, job: dict):
+        with self._lock:
+            self._jobs[job["id"]] = dict(job)
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def set_result(self, job_id: str, result):
+        with self._lock:
+            self._results[job_id] = result
+
+    def get_result(self, job_id: str):
+        with self._lock:
+            return self._results.get(job_id)
+
+    def purge_expired(self, now: float) -> int:
+        with self._lock:
+            expired = [i for i, j in self._jobs.items() if j.get("expires_at") and j["expires_at"] <= now]
+            for job_id in expired:
+                self._jobs.pop(job_id, None)
+                self._results.pop(job_id, None)
+            return len(expired)
+
+
+class SQLiteJobStore:
+    # Shared by every uvicorn worker on the host, so a job submitted to one worker
+    # can be polled, fetched or cancelled through any other.
+
+    def __init__(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, job TEXT NOT NULL, result TEXT, expires_at REAL)")
+        self._lock = threading.Lock()
+
+    def create(self, job: dict):
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (id, job, expires_at) VALUES (?, ?, ?)",
+                (job["id"], json.dumps(job), job.get("expires_at")),
+            )
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._db.execute("SELECT job FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update(self, job_id: str, **fields):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute("SELECT job FROM jobs WHERE id = ?", (job_id,)).fetchone()
+                if row:
+                    job = json.loads(row[0])
+                    job.update(fields)
+                    self._db.execute(
+                        "UPDATE jobs SET job = ?, expires_at = ? WHERE id = ?",
+                        (json.dumps(job), job.get("expires_at"), job_id),
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def set_result(self, job_id: str, result):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET result = ? WHERE id = ?", (json.dumps(result), job_id))
+
+    def get_result(self, job_id: str):
+        with self._lock:
+            row = self._db.execute("SELECT result FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return json.loads(row[0]) if row and row[0] is not None else None
+
+    def purge_expired(self, now: float) -> int:
+        with self._lock:
+            return self._db.execute(
+                "DELETE FROM jobs WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+            ).rowcount
+
+
+class JobContext:
+    # Handed to job functions as their `progress` callback. Checks for cancellation
+    # on every report, so long parses stop within one progress interval.
+
+    def __init__(self, store, job_id: str):
+        self._store = store
+        self._job_id = job_id
+        self._progress = {}
+
+    def __call__(self, **counters):
+        self._progress.update(counters)
+        self._store.update(self._job_id, progress=dict(self._progress))
+        job = self._store.get(self._job_id)
+        if job is None or job.get("cancel_requested"):
+            raise JobCancelled()
+
+
+class JobManager:
+    def __init__(self, store, max_workers: int = 2, result_ttl: float = 3600):
+        self.store = store
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        # Guards _futures/_cleanups, which request threads and job threads both change.
+        # A job is submitted under it, so its _finish cannot run before the future is
+        # registered.
+        self._lock = threading.Lock()
+        self._futures = {}
+        self._cleanups = {}
+
+    def submit(self, kind: str, fn, payload, cleanup=None) -> dict:
+        # `cleanup`, when given, runs once the job is finished, however it finished
+        # (e.g. removing an uploaded file the job was to read).
+        self.store.purge_expired(time.time())
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": QUEUED,
+            "progress": {},
+            "error": None,
+            "cancel_requested": False,
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "expires_at": None,
+        }
+        self.store.create(job)
+        with self._lock:
+            if cleanup is not None:
+                self._cleanups[job["id"]] = cleanup
+            self._futures[job["id"]] = self._executor.submit(self._run, job["id"], fn, payload)
+        return job
+
+    def get(self, job_id: str) -> dict | None:
+        job = self.store.get(job_id)
+        if job and job.get("expires_at") and job["expires_at"] <= time.time():
+            self.store.purge_expired(time.time())
+            return None
+        return job
+
+    def result(self, job_id: str):
+        return self.store.get_result(job_id)
+
+    def cancel(self, job_id: str) -> dict | None:
+        job = self.get(job_id)
+        if job is None or job["status"] in FINISHED:
+            return job
+        self.store.update(job_id, cancel_requested=True)
+        with self._lock:
+            future = self._futures.get(job_id)
+            cancelled = future is not None and future.cancel()
+        if cancelled:
+            self._finish(job_id, CANCELLED)
+        return self.store.get(job_id)
+
+    def _finish(self, job_id: str, status: str, error=None):
+        with self._lock:
+            cleanup = self._cleanups.pop(job_id, None)
+            self._futures.pop(job_id, None)
+        if cleanup is not None:
+            cleanup()
+        now = time.time()
+        self.store.update(job_id, status=status, error=error, finished_at=now, expires_at=now + self.result_ttl)
+
+    def _run(self, job_id: str, fn, payload):
+        job = self.store.get(job_id)
+        if job is None or job.get("cancel_requested"):
+            self._finish(job_id, CANCELLED)
+            return
+        self.store.update(job_id, status=RUNNING, started_at=time.time())
+        try:
+            result = fn(payload, JobContext(self.store, job_id))
+        except JobCancelled:
+            self._finish(job_id, CANCELLED)
+        except HTTPException as exc:
+            self._finish(job_id, FAILED, {"status_code": exc.status_code, "detail": exc.detail})
+        except ValidationError as exc:
+            self._finish(job_id, FAILED, {"status_code": 422, "detail": exc.errors(include_url=False, include_context=False)})
+        except Exception as exc:
+            self._finish(job_id, FAILED, {"status_code": 500, "detail": f"{type(exc).__name__}: {exc}"})
+        else:
+            self.store.set_result(job_id, result)
+            self._finish(job_id, SUCCEEDED)
+
+
+def public_job(job: dict) -> dict:
+    return {field: job.get(field) for field in PUBLIC_FIELDS}
+
+def make_job_store():
+    if os.getenv("JOB_STORE", "memory").lower() == "sqlite":
+        return SQLiteJobStore(os.getenv("JOB_STORE_PATH") or os.path.join(tempfile.gettempdir(), "pharmaguard_jobs.sqlite3"))
+    return InMemoryJobStore()
+
+@lru_cache(maxsize=1)
+def get_job_manager() -> JobManager:
+    return JobManager(
+        make_job_store(),
+        max_workers=int(os.getenv("JOB_MAX_WORKERS", "2")),
+        result_ttl=float(os.getenv("JOB_RESULT_TTL_SECONDS", "3600")),
+    )
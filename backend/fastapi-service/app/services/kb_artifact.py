@@ -0,0 +1,217 @@
+"""Compiled drug-gene knowledge base: relationships.tsv -> memory-mapped binary.
+
+    python -m app.services.kb_artifact build [--tsv app/data/relationships.tsv] [--out app/data/relationships.pgkb]
+    python -m app.services.kb_artifact info [--out ...]
+
+Layout (little-endian u32 throughout, every section 4-byte aligned):
+    header   magic "PGKB", format version, n_drugs, n_genes, n_relations, n_links
+    drugs    offsets[n_drugs + 1] + utf-8 blob, sorted by bytes
+    genes    offsets[n_genes + 1] + utf-8 blob, sorted by bytes
+    relations offsets[n_relations + 1] + utf-8 blob, sorted by bytes
+    links    start[n_drugs + 1], then (gene, relation) index pairs; the primary gene
+             (the one the legacy dict-based loader kept) is first for each drug
+"""
+import csv
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+from functools import lru_cache
+from pathlib import Path
+
+MAGIC = b"PGKB"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sIIIII")
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+DEFAULT_ARTIFACT_PATH = str(DATA_DIR / "relationships.pgkb")
+
+
+def kb_artifact_path() -> str | None:
+    # KB_ARTIFACT_PATH="" disables the artifact (forces the TSV path).
+    path = os.getenv("KB_ARTIFACT_PATH", DEFAULT_ARTIFACT_PATH)
+    return path or None
+
+def read_relationships(tsv_path) -> list:
+    # (drug, gene, relation) rows, normalized and filtered the way load_relationships
+    # and build_drug_gene_map do it, in file order. Uses csv, not pandas.
+    from app.services.clinpgx_loader import TARGET_GENES
+    from app.services.drug_gene_builder import VALID_RELATIONS
+
+    rows = []
+    with open(tsv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f, delimiter="\t"):
+            gene = (row.get("Entity1_name") or "").strip().upper()
+            drug = (row.get("Entity2_name") or "").strip().lower()
+            relation = (row.get("Association") or "").strip().lower()
+            if gene in TARGET_GENES and drug and relation in VALID_RELATIONS:
+                rows.append((drug, gene, relation))
+    return rows
+
+
+def _align(buf: bytearray):
+    buf.extend(b"\0" * (-len(buf) % 4))
+
+def _string_table(buf: bytearray, strings: list):
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = array("I", [0])
+    for e in encoded:
+        offsets.append(offsets[-1] + len(e))
+    buf.extend(offsets.tobytes())
+    buf.extend(b"".join(encoded))
+    _align(buf)
+
+def compile_relationships(rows) -> bytes:
+    links_by_drug = {}
+    for drug, gene, relation in rows:
+        links = links_by_drug.setdefault(drug, [])
+        if (gene, relation) in links:
+            links.remove((gene, relation))
+        # The legacy loader let the last row win, so that gene becomes the primary.
+        links.insert(0, (gene, relation))
+
+    by_bytes = lambda s: s.encode("utf-8")
+    drugs = sorted(links_by_drug, key=by_bytes)
+    genes = sorted({g for links in links_by_drug.values() for g, _ in links}, key=by_bytes)
+    relations = sorted({r for links in links_by_drug.values() for _, r in links}, key=by_bytes)
+    gene_index = {g: i for i, g in enumerate(genes)}
+    relation_index = {r: i for i, r in enumerate(relations)}
+
+    start = array("I", [0])
+    pairs = array("I")
+    for drug in drugs:
+        for gene, relation in links_by_drug[drug]:
+            pairs.extend((gene_index[gene], relation_index[relation]))
+        start.append(len(pairs) // 2)
+
+    buf = bytearray(HEADER.pack(MAGIC, FORMAT_VERSION, len(drugs), len(genes), len(relations), len(pairs) // 2))
+    _align(buf)
+    for table in (drugs, genes, relations):
+        _string_table(buf, table)
+    buf.extend(start.tobytes())
+    buf.extend(pairs.tobytes())
+    return bytes(buf)
+
+def build_artifact(tsv_path, out_path) -> dict:
+    rows = read_relationships(tsv_path)
+    data = compile_relationships(rows)
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    tmp_path = f"{out_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, out_path)
+    return {"rows": len(rows), "bytes": len(data), "path": str(out_path)}
+
+
+class _StringTable:
+    def __init__(self, data: mmap.mmap, buf: memoryview, pos: int, count: int):
+        self.count = count
+        self.offsets = buf[pos:pos + 4 * (count + 1)].cast("I")
+        self.data = data
+        self.blob_start = pos + 4 * (count + 1)
+        self.end = self.blob_start + self.offsets[count] + (-self.offsets[count] % 4)
+
+    def raw(self, i: int) -> bytes:
+        base = self.blob_start
+        return self.data[base + self.offsets[i]:base + self.offsets[i + 1]]
+
+    def __getitem__(self, i: int) -> str:
+        return self.raw(i).decode("utf-8")
+
+    def find(self, value: str) -> int:
+        target = value.encode("utf-8")
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.raw(mid) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self.count and self.raw(lo) == target else -1
+
+
+class KnowledgeBase(Mapping):
+    # Read-only drug -> primary gene mapping over the mmapped artifact. The pages are
+    # shared by every process that maps the same file; nothing is copied at load.
+    # `defaults` (the required drug map) answer for drugs the artifact lacks.
+
+    def __init__(self, path, defaults: dict | None = None):
+        if sys.byteorder != "little":
+            raise ValueError("Knowledge base artifacts are little-endian")
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buf = memoryview(self._mmap)
+        magic, version, n_drugs, n_genes, n_relations, n_links = HEADER.unpack_from(buf, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"Not a version {FORMAT_VERSION} knowledge base artifact: {path}")
+
+        pos = HEADER.size + (-HEADER.size % 4)
+        self._drugs = _StringTable(self._mmap, buf, pos, n_drugs)
+        self._genes = _StringTable(self._mmap, buf, self._drugs.end, n_genes)
+        self._relations = _StringTable(self._mmap, buf, self._genes.end, n_relations)
+        pos = self._relations.end
+        self._start = buf[pos:pos + 4 * (n_drugs + 1)].cast("I")
+        pos += 4 * (n_drugs + 1)
+        self._pairs = buf[pos:pos + 8 * n_links].cast("I")
+
+        self.defaults = dict(defaults or {})
+        # Requests name the same handful of drugs over and over.
+        self._find = lru_cache(maxsize=4096)(self._drugs.find)
+        self._extra = [d for d in self.defaults if self._find(d) < 0]
+
+    def links(self, drug: str) -> list:
+        # Every (gene, relation) for the drug, primary gene first.
+        i = self._find(drug) if isinstance(drug, str) else -1
+        if i < 0:
+            return []
+        return [
+            (self._genes[self._pairs[2 * j]], self._relations[self._pairs[2 * j + 1]])
+            for j in range(self._start[i], self._start[i + 1])
+        ]
+
+    def genes(self, drug: str) -> list:
+        genes = list(dict.fromkeys(gene for gene, _ in self.links(drug)))
+        if not genes and drug in self.defaults:
+            genes = [self.defaults[drug]]
+        return genes
+
+    def __getitem__(self, drug: str) -> str:
+        i = self._find(drug) if isinstance(drug, str) else -1
+        if i < 0:
+            return self.defaults[drug]
+        return self._genes[self._pairs[2 * self._start[i]]]
+
+    def __contains__(self, drug) -> bool:
+        return (isinstance(drug, str) and self._find(drug) >= 0) or drug in self.defaults
+
+    def __iter__(self):
+        # Defaults first (as in the dict the TSV loader builds), then the artifact's drugs.
+        yield from self.defaults
+        for i in range(self._drugs.count):
+            drug = self._drugs[i]
+            if drug not in self.defaults:
+                yield drug
+
+    def __len__(self) -> int:
+        return self._drugs.count + len(self._extra)
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+    from app.services.clinpgx_loader import relationships_path
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "info"])
+    parser.add_argument("--tsv", default=None, help="relationships TSV (default: app/data/relationships.tsv)")
+    parser.add_argument("--out", default=None, help="artifact path (default: KB_ARTIFACT_PATH or app/data/relationships.pgkb)")
+    args = parser.parse_args()
+
+    out = args.out or kb_artifact_path() or DEFAULT_ARTIFACT_PATH
+    if args.command == "build":
+        print(json.dumps(build_artifact(args.tsv or relationships_path(), out), indent=2))
+    else:
+        kb = KnowledgeBase(out)
+        multi = sum(1 for drug in kb if len(kb.genes(drug)) > 1)
+        print(json.dumps({"path": out, "drugs": len(kb), "multi_gene_drugs": multi, "bytes": os.path.getsize(out)}, indent=2))
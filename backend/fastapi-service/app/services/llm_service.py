@@ -1,42 +1,277 @@
+import asyncio
+import json
 import os
-from dotenv import load_dotenv
-from groq import Groq
-
-load_dotenv()
-
-def generate_explanation(gene: str, phenotype: str, drug: str, risk: str) -> dict:
-    prompt = f"""
-    Explain in simple medical language:
-    A patient has {gene} {phenotype} phenotype.
-    They are prescribed {drug}.
-    The predicted risk is {risk}.
-    
-    Provide:
-    1. A short patient-friendly summary.
-    2. A brief mechanism explanation.
-    """
+import threading
+from functools import lru_cache
+from pathlib import Path
+from pydantic import ValidationError
+from app.schemas.response import LLMExplanation
+from app.services import metrics
+from app.services.explanation_cache import get_explanation_cache, make_key
+from app.services.resilience import CircuitBreaker, CircuitOpenError, Deadline, hedged
 
+
+def load_env_file():
+    # Same search as dotenv's load_dotenv() from here, but python-dotenv is only
+    # imported when a .env file actually exists (it never does on serverless).
+    for directory in Path(__file__).resolve().parents:
+        if (directory / ".env").is_file():
+            from dotenv import load_dotenv
+
+            load_dotenv(directory / ".env")
+            return
+
+load_env_file()
+
+LLM_MODEL = "llama3-8b-8192"
+# Bump whenever the prompt wording changes so cached explanations are not reused.
+PROMPT_VERSION = "2"
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "6"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+# Per-call timeout (retries included) and the whole request's budget for explanations;
+# past either the template explanation is used. 0 disables.
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "10"))
+LLM_REQUEST_BUDGET_SECONDS = float(os.getenv("LLM_REQUEST_BUDGET_SECONDS", "15"))
+# Start a second attempt when the first has not answered after this long (0 = never).
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))
+LLM_BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+# per_drug: one completion per explanation. batched: explanations requested within
+# LLM_BATCH_WINDOW_MS of each other (one patient's drugs, or several concurrent
+# requests) share one completion of up to LLM_BATCH_MAX_ITEMS items.
+LLM_EXPLANATION_MODE = os.getenv("LLM_EXPLANATION_MODE", "per_drug").lower()
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "20"))
+LLM_BATCH_MAX_ITEMS = int(os.getenv("LLM_BATCH_MAX_ITEMS", "24"))
+
+_loop = None
+_loop_pid = None
+_loop_lock = threading.Lock()
+_semaphore = None
+_batcher = None
+
+
+def get_llm_loop() -> asyncio.AbstractEventLoop:
+    # A single long-lived event loop per process owns the pooled client, so sync
+    # callers (threadpool routes, workers) all share its keep-alive connections.
+    # After a fork the parent's loop thread is gone: the loop and everything bound
+    # to it (semaphore, batcher, pooled clients) are recreated.
+    global _loop, _loop_pid, _semaphore, _batcher
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            _semaphore, _batcher = None, None
+            get_client.cache_clear()
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="llm-loop", daemon=True).start()
+            _loop, _loop_pid = loop, os.getpid()
+    return _loop
+
+def run_llm(coro):
+    return asyncio.run_coroutine_threadsafe(coro, get_llm_loop()).result()
+
+@lru_cache(maxsize=None)
+def get_client(api_key: str, base_url: str | None = None, max_retries: int = LLM_MAX_RETRIES):
+    # groq (and httpx under it) is the heaviest import in the service; deterministic
+    # requests never need it.
+    from groq import AsyncGroq
+
+    return AsyncGroq(api_key=api_key, base_url=base_url, max_retries=max_retries)
+
+@lru_cache(maxsize=1)
+def get_breaker() -> CircuitBreaker:
+    return CircuitBreaker("llm", LLM_BREAKER_FAILURES, LLM_BREAKER_RESET_SECONDS)
+
+def request_deadline() -> Deadline:
+    return Deadline(LLM_REQUEST_BUDGET_SECONDS)
+
+def _get_semaphore() -> asyncio.Semaphore:
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+    return _semaphore
+
+
+def fallback_explanation(gene: str, phenotype: str, drug: str, risk: str) -> dict:
+    return {
+        "summary": f"{gene} {phenotype} may affect response to {drug}.",
+        "mechanism": f"Genetic variation can lead to {risk.lower()} drug response."
+    }
+
+def explanation_cache_key(gene: str, phenotype: str, drug: str, risk: str) -> str:
+    return make_key(f"{PROMPT_VERSION}:{LLM_MODEL}", gene, phenotype, drug, risk)
+
+PROMPT_SCAFFOLD = """You explain pharmacogenomic test results in simple medical language.
+For each item give a short patient-friendly summary and a brief mechanism explanation.
+"""
+
+def single_prompt(gene: str, phenotype: str, drug: str, risk: str) -> str:
+    return PROMPT_SCAFFOLD + f"""Answer with a JSON object {{"summary": "...", "mechanism": "..."}}.
+Item: {json.dumps({"gene": gene, "phenotype": phenotype, "drug": drug, "risk": risk})}"""
+
+def batch_prompt(items) -> str:
+    listed = [{"id": i, "gene": g, "phenotype": p, "drug": d, "risk": r} for i, (g, p, d, r) in enumerate(items)]
+    return PROMPT_SCAFFOLD + f"""Answer with a JSON object {{"explanations": [{{"id": <item id>, "summary": "...", "mechanism": "..."}}]}}, one entry per item.
+Items:
+{json.dumps(listed)}"""
+
+def parse_explanation(entry) -> dict | None:
+    # A validated LLMExplanation dict, or None when the entry is missing or malformed.
     try:
-        api_key = os.getenv("GROQ_API_KEY")
-        if not api_key:
-            raise ValueError("GROQ_API_KEY is not set")
+        explanation = LLMExplanation.model_validate(entry)
+    except ValidationError:
+        return None
+    summary, mechanism = explanation.summary.strip(), explanation.mechanism.strip()
+    if not summary or not mechanism:
+        return None
+    return {"summary": summary, "mechanism": mechanism}
+
+def parse_single(content: str) -> dict | None:
+    try:
+        return parse_explanation(json.loads(content))
+    except ValueError:
+        return None
+
+def parse_batch(content: str, size: int) -> list:
+    # One entry per item, None where the output has no valid entry for it. Entries
+    # are matched by "id"; without ids, by position.
+    try:
+        data = json.loads(content)
+    except ValueError:
+        return [None] * size
+    entries = data.get("explanations") if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        return [None] * size
+    parsed = [None] * size
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            continue
+        index = entry.get("id", position)
+        if isinstance(index, str) and index.isdigit():
+            index = int(index)
+        if isinstance(index, int) and 0 <= index < size and parsed[index] is None:
+            parsed[index] = parse_explanation(entry)
+    return parsed
+
+async def complete_json(api_key: str, prompt: str) -> str:
+    client = get_client(api_key, os.getenv("GROQ_BASE_URL") or None, LLM_MAX_RETRIES)
+
+    async def attempt():
+        # The timeout starts once a concurrency slot is held, so queueing behind
+        # other calls is not mistaken for a slow upstream.
+        async with _get_semaphore():
+            return await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=[{"role": "user", "content": prompt}],
+                    response_format={"type": "json_object"},
+                    temperature=0.3
+                ),
+                LLM_TIMEOUT_SECONDS or None,
+            )
+
+    # While the breaker is open this fails at once instead of waiting on Groq.
+    response = await get_breaker().call(lambda: hedged(attempt, LLM_HEDGE_AFTER_SECONDS))
+    return response.choices[0].message.content
 
-        client = Groq(api_key=api_key)
-        response = client.chat.completions.create(
-            model="llama3-8b-8192",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3
-        )
 
-        text = response.choices[0].message.content
-        parts = text.split("\n", 1)
-        summary = parts[0]
-        mechanism = parts[1] if len(parts) > 1 else "Mechanism explanation unavailable."
+class ExplanationBatcher:
+    # Collects (gene, phenotype, drug, risk) items on the LLM loop and sends them as
+    # one completion after `window` seconds or once `max_items` are waiting. Equal
+    # items in the same window share one entry. Callers that give up (deadline) do
+    # not cancel the batch for the others.
 
-        return {"summary": summary, "mechanism": mechanism}
+    def __init__(self, window: float, max_items: int):
+        self.window = window
+        self.max_items = max(1, max_items)
+        self._pending = {}
+        self._timer = None
+        self._tasks = set()
 
+    async def explain(self, api_key: str, item: tuple) -> dict | None:
+        future = self._pending.get(item)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._pending[item] = future
+            if len(self._pending) >= self.max_items:
+                self._flush(api_key)
+            elif self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.window, self._flush, api_key)
+        outcome = await asyncio.shield(future)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    def _flush(self, api_key: str):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.ensure_future(self._run(api_key, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, api_key: str, batch: dict):
+        # Futures get a result or the exception itself, so an error nobody is still
+        # waiting for is not logged as unretrieved. If the flush is cancelled the
+        # waiters still get an error (and so the fallback) instead of hanging.
+        items = list(batch)
+        metrics.LLM_BATCH_ITEMS.observe(len(items))
+        outcomes = None
+        try:
+            outcomes = parse_batch(await complete_json(api_key, batch_prompt(items)), len(items))
+        except Exception as exc:
+            outcomes = [exc] * len(items)
+        finally:
+            if outcomes is None:
+                outcomes = [RuntimeError("explanation batch cancelled")] * len(items)
+            for item, outcome in zip(items, outcomes):
+                if not batch[item].done():
+                    batch[item].set_result(outcome)
+
+def _get_batcher() -> ExplanationBatcher:
+    global _batcher
+    if _batcher is None:
+        _batcher = ExplanationBatcher(LLM_BATCH_WINDOW_MS / 1000, LLM_BATCH_MAX_ITEMS)
+    return _batcher
+
+
+async def generate_explanation(gene: str, phenotype: str, drug: str, risk: str) -> dict:
+    cache = get_explanation_cache()
+    cache_key = explanation_cache_key(gene, phenotype, drug, risk)
+    if cache is not None:
+        # The memory tier is read inline; SQLite runs in a worker thread so disk I/O
+        # (or another worker holding the write lock) never stalls the LLM loop.
+        cached = cache.get_memory(cache_key)
+        if cached is None and cache.path is not None:
+            cached = await asyncio.to_thread(cache.get_disk, cache_key)
+        if cached is not None:
+            return cached
+
+    api_key = os.getenv("GROQ_API_KEY")
+    if not api_key:
+        metrics.LLM_FALLBACKS.inc(1, "no_api_key")
+        return fallback_explanation(gene, phenotype, drug, risk)
+
+    try:
+        if LLM_EXPLANATION_MODE == "batched":
+            explanation = await _get_batcher().explain(api_key, (gene, phenotype, drug, risk))
+        else:
+            explanation = parse_single(await complete_json(api_key, single_prompt(gene, phenotype, drug, risk)))
+    except CircuitOpenError:
+        metrics.LLM_FALLBACKS.inc(1, "circuit_open")
+        return fallback_explanation(gene, phenotype, drug, risk)
+    except asyncio.TimeoutError:
+        metrics.LLM_FALLBACKS.inc(1, "timeout")
+        return fallback_explanation(gene, phenotype, drug, risk)
     except Exception:
-        return {
-            "summary": f"{gene} {phenotype} may affect response to {drug}.",
-            "mechanism": f"Genetic variation can lead to {risk.lower()} drug response."
-        }
+        metrics.LLM_FALLBACKS.inc(1, "error")
+        return fallback_explanation(gene, phenotype, drug, risk)
+
+    if explanation is None:
+        metrics.LLM_FALLBACKS.inc(1, "malformed")
+        return fallback_explanation(gene, phenotype, drug, risk)
+    if cache is not None:
+        cache.put_memory(cache_key, explanation)
+        if cache.path is not None:
+            await asyncio.to_thread(cache.put_disk, cache_key, explanation)
+    return explanation
@@ -0,0 +1,219 @@
+import os
+import threading
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+# Checked on every call (tests and benchmarks flip it); every recording helper
+# returns immediately when it is off.
+ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry = []
+# Per-request stage durations for the Server-Timing header. The middleware installs a
+# dict; threadpool routes see the same dict because Starlette copies the context.
+_request_timings = ContextVar("pharmaguard_request_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)] + list(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, *labels):
+        if not ENABLED or not amount:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help_text: str, labelnames=()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def set(self, value: float, *labels):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = value
+
+    def value(self, *labels) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, *labels):
+        if not ENABLED:
+            return
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # [per-bucket counts (last one is +Inf), sum, count]
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels) -> int:
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    bucket_labels = _labels(self.labelnames, labels, [f'le="{le}"'])
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "pharmaguard_stage_duration_seconds",
+    "Time per analysis stage (parse, resolve, rules, llm) per request.",
+    ("stage",),
+)
+REQUEST_SECONDS = Histogram(
+    "pharmaguard_http_request_duration_seconds",
+    "HTTP request latency until the response starts.",
+    ("method", "status"),
+)
+RECORDS_PARSED = Counter("pharmaguard_vcf_records_parsed_total", "VCF data lines read.")
+RECORDS_SKIPPED = Counter("pharmaguard_vcf_records_skipped_total", "VCF data lines without a supported pharmacogene.")
+GENE_FALLBACKS = Counter("pharmaguard_missing_gene_fallbacks_total", "Drugs whose gene was absent and assumed *1/*1.")
+LLM_FALLBACKS = Counter("pharmaguard_llm_fallbacks_total", "Explanations served from the template fallback.", ("reason",))
+LLM_BATCH_ITEMS = Histogram(
+    "pharmaguard_llm_batch_items",
+    "Explanations per batched LLM completion (LLM_EXPLANATION_MODE=batched).",
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+LLM_HEDGES = Counter("pharmaguard_llm_hedged_requests_total", "LLM calls that started a second (hedged) attempt.")
+CIRCUIT_STATE = Gauge("pharmaguard_circuit_breaker_state", "Circuit breaker state (0 closed, 1 open, 2 half-open).", ("name",))
+CIRCUIT_TRANSITIONS = Counter("pharmaguard_circuit_breaker_transitions_total", "Circuit breaker state changes.", ("name", "state"))
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+def observe_stage(name: str, seconds: float):
+    if not ENABLED:
+        return
+    STAGE_SECONDS.observe(seconds, name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+def record_vcf(parsed: int, skipped: int):
+    RECORDS_PARSED.inc(parsed)
+    RECORDS_SKIPPED.inc(skipped)
+
+
+class stage:
+    # `with stage("parse"): ...` — a plain class rather than @contextmanager, which
+    # costs a generator per use even when metrics are off.
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        if ENABLED:
+            self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            observe_stage(self.name, perf_counter() - self.start)
+        return False
+
+
+def server_timing(timings: dict, total: float) -> str:
+    entries = [f"{name};dur={seconds * 1e3:.2f}" for name, seconds in timings.items()]
+    entries.append(f"app;dur={total * 1e3:.2f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    # Pure ASGI (no BaseHTTPMiddleware): records request latency and adds a
+    # Server-Timing header built from the stages the request went through.
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        timings = {}
+        token = _request_timings.set(timings)
+        start = perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing(timings, perf_counter() - start).encode()
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", header)]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            REQUEST_SECONDS.observe(perf_counter() - start, scope.get("method", ""), str(status))
+            _request_timings.reset(token)
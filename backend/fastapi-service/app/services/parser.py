@@ -1,4 +1,10 @@
+import os
+import re
+from functools import lru_cache
 from fastapi import HTTPException
+from app.services import metrics
+from app.services.allele_definitions import get_allele_definitions
+from app.services.gene_regions import normalize_chrom, pgx_region_index, pgx_regions
 
 SUPPORTED_GENES = {"CYP2D6","CYP2C19","CYP2C9","SLCO1B1","TPMT","DPYD"}
 
@@ -46,80 +52,319 @@ def parse_variant(variant):
         "rsid": rsid
     }
 
-def parse_variants(request):
-    if getattr(request, "variants", None):
-        return [parse_variant(v) for v in request.variants]
+def parse_info(info_field: str) -> dict:
+    info = {}
+    for item in info_field.split(";"):
+        if "=" not in item:
+            continue
+        k, v = item.split("=", 1)
+        info[k] = v
+    return info
 
-    if getattr(request, "vcf_content", None):
-        gene_records = {}
-
-        def parse_info(info_field: str) -> dict:
-            info = {}
-            for item in info_field.split(";"):
-                if "=" not in item:
-                    continue
-                k, v = item.split("=", 1)
-                info[k] = v
-            return info
-
-        def alt_allele_count(gt: str | None) -> int:
-            if not gt:
-                return 0
-            alleles = gt.replace("|", "/").split("/")
-            count = 0
-            for allele in alleles:
-                allele = allele.strip()
-                if allele.isdigit() and int(allele) > 0:
-                    count += 1
-            return count
-
-        for line in request.vcf_content.splitlines():
-            if line.startswith("#"):
-                continue
-            parts = line.split("\t")
-            if len(parts) < 10:
-                continue
+def info_value(info_field: str, key: str) -> str | None:
+    # One INFO value without building the whole dict (annotated files carry dozens
+    # of keys per record and only GENE/STAR/RS are used).
+    token = key + "="
+    i = info_field.find(token)
+    while i != -1:
+        if i == 0 or info_field[i - 1] == ";":
+            end = info_field.find(";", i)
+            return info_field[i + len(token):end if end != -1 else len(info_field)]
+        i = info_field.find(token, i + 1)
+    return None
+
+def genotype(format_field: str, sample_field: str) -> str | None:
+    # GT of the first sample; the spec puts GT first whenever it is present.
+    if format_field == "GT" or format_field.startswith("GT:"):
+        return sample_field.split(":", 1)[0]
+    keys = format_field.split(":")
+    if "GT" not in keys:
+        return None
+    values = sample_field.split(":")
+    i = keys.index("GT")
+    return values[i] if i < len(values) else None
+
+def position_prefilter_enabled() -> bool:
+    return os.getenv("VCF_POSITION_PREFILTER", "true").lower() == "true"
+
+def _trie_regex(strings) -> str:
+    trie = {}
+    for string in strings:
+        node = trie
+        for ch in string:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        alternatives = [re.escape(ch) + build(child) if ch else "" for ch, child in sorted(node.items())]
+        if len(alternatives) == 1:
+            return alternatives[0]
+        return "(?:" + "|".join(alternatives) + ")"
+
+    return build(trie)
+
+# Positions are matched on their leading digits, i.e. to the enclosing 10 kb window;
+# add_line then checks the exact interval.
+PREFIX_WINDOW_DIGITS = 4
+
+@lru_cache(maxsize=None)
+def candidate_pattern():
+    # Matches "\n" + CHROM + POS of lines that may fall in a pharmacogene interval, so
+    # a block of text can be scanned in C and only those lines handled in Python.
+    window = 10 ** PREFIX_WINDOW_DIGITS
+    prefixes = set()
+    for chrom, start, end, _ in pgx_regions():
+        for leading in range(start // window, end // window + 1):
+            prefixes.add(f"{normalize_chrom(chrom)}\t{leading}")
+    return re.compile(r"\n(?:chr)?" + _trie_regex(prefixes) + r"\d{%d}\t" % PREFIX_WINDOW_DIGITS)
+
+@lru_cache(maxsize=None)
+def gene_tag_pattern():
+    # A GENE= INFO tag naming a supported gene: such records are read at any position.
+    return re.compile(r"[\t;]GENE=(?i:" + "|".join(sorted(SUPPORTED_GENES)) + r")[;\t]")
+
+@lru_cache(maxsize=None)
+def known_rsids() -> frozenset:
+    # rsIDs that mark a PGx record wherever it sits (other builds, unpadded loci).
+    return frozenset(RSID_GENE_MAP) | frozenset(get_allele_definitions().rsids)
+
+@lru_cache(maxsize=None)
+def rsid_pattern():
+    # A known PGx rsID in the ID column.
+    return re.compile(r"\t" + _trie_regex(known_rsids()) + r"\t")
+
+def alt_allele_count(gt: str | None) -> int:
+    if not gt:
+        return 0
+    alleles = gt.replace("|", "/").split("/")
+    count = 0
+    for allele in alleles:
+        allele = allele.strip()
+        if allele.isdigit() and int(allele) > 0:
+            count += 1
+    return count
+
+def call_diplotype(stars: list) -> str:
+    stars = [s for s in stars if s and s != "*1"]
+    if not stars:
+        return "*1/*1"
+    if len(stars) == 1:
+        return f"*1/{stars[0]}"
+    return f"{stars[0]}/{stars[1]}"
+
+
+class PgxRecordFilter:
+    # Decides which VCF records are PGx records and what they carry; shared by the
+    # single-sample and cohort accumulators so both read a file the same way.
+    # With the prefilter (default: VCF_POSITION_PREFILTER) a line is only
+    # tokenized when its CHROM/POS falls in a pharmacogene interval (either build),
+    # its ID is a known PGx rsID or it carries a GENE= tag; everything else costs one
+    # partial split.
+
+    def __init__(self, prefilter: bool | None = None):
+        self.lines_parsed = 0
+        self.lines_skipped = 0
+        if prefilter is None:
+            prefilter = position_prefilter_enabled()
+        self.regions = pgx_region_index() if prefilter else None
+        self.rsids = known_rsids()
+        self.definitions = get_allele_definitions()
+
+    def passes_prefilter(self, line: str) -> bool:
+        if self.regions is None:
+            return True
+        head = line.split("\t", 3)
+        return len(head) >= 4 and (head[2] in self.rsids or self.regions.contains(head[0], head[1]) or "GENE=" in line)
+
+    def classify(self, parts) -> tuple | None:
+        # (gene, star, definition hits, rsid) of a tokenized record, or None when it
+        # is not a record of a supported gene.
+        rsid = parts[2]
+        info = parts[7]
 
-            rsid = parts[2]
-            info = parse_info(parts[7])
+        gene = info_value(info, "GENE")
+        gene = normalize_gene(gene) if gene else None
+        if not gene and rsid in RSID_GENE_MAP:
+            gene = RSID_GENE_MAP[rsid][0]
+        # Without a STAR tag the record is matched against the allele definitions.
+        star = normalize_star(info_value(info, "STAR"))
+        hits = () if star else self._defined_variants(parts, gene)
+        if not gene and hits:
+            gene = self.definitions.gene_of(hits[0][1])
+        # Non-PGx genes (annotated files tag every record) are skipped, not rejected.
+        if not gene or gene not in SUPPORTED_GENES:
+            return None
 
-            gene = normalize_gene(info.get("GENE", "")) if info.get("GENE") else None
-            if not gene and rsid in RSID_GENE_MAP:
-                gene = RSID_GENE_MAP[rsid][0]
-            if not gene:
+        if not rsid.startswith("rs"):
+            rsid = info_value(info, "RS") or rsid
+        return gene, star, hits, rsid if rsid.startswith("rs") else None
+
+    def _defined_variants(self, parts, gene) -> list:
+        # [(alt index, variant id)] by CHROM/POS/REF/ALT, else by rsID (ID column or
+        # INFO RS) for coordinates from another build.
+        alts = parts[4].split(",")
+        hits = self.definitions.lookup(parts[0], parts[1], parts[3], alts)
+        if not hits:
+            rsid = parts[2] if parts[2].startswith("rs") else info_value(parts[7], "RS")
+            if rsid:
+                hits = self.definitions.lookup_rsid(rsid, alts)
+        if gene:
+            hits = [hit for hit in hits if self.definitions.gene_of(hit[1]) == gene]
+        return hits
+
+
+class VcfAccumulator(PgxRecordFilter):
+    # Folds VCF data lines into per-gene star/rsID records one line at a time,
+    # so callers can feed it from any line source without materializing the file.
+
+    def __init__(self, prefilter: bool | None = None):
+        super().__init__(prefilter)
+        self.gene_records = {}
+
+    def add_line(self, line: str):
+        if line.startswith("#"):
+            return
+        self.lines_parsed += 1
+        if not self.passes_prefilter(line):
+            self.lines_skipped += 1
+            return
+
+        # Only the first sample is read, so the remaining sample columns stay unsplit.
+        parts = line.rstrip("\r\n").split("\t", 10)
+        record = self.classify(parts) if len(parts) >= 10 else None
+        if record is None:
+            self.lines_skipped += 1
+            return
+        gene, star, hits, rsid = record
+
+        gt = genotype(parts[8], parts[9])
+        alt_count = alt_allele_count(gt)
+
+        rec = self.gene_records.setdefault(gene, {"stars": [], "detected_rsids": []})
+        if rsid:
+            rec["detected_rsids"].append(rsid)
+
+        if star and alt_count > 0:
+            rec["stars"].extend([star] * alt_count)
+        elif hits and alt_count > 0:
+            self._add_defined(rec, hits, gt)
+
+    def _add_defined(self, rec: dict, hits, gt: str):
+        # Alt dosage per defining variant, plus per-haplotype sets while every
+        # matched record of the gene is phased.
+        alleles = gt.replace("|", "/").split("/")
+        phased = len(alleles) == 2 and "/" not in gt
+        dosages = rec.setdefault("defined", {})
+        haplotypes = rec.setdefault("haplotypes", (set(), set()))
+        rec["phased"] = rec.get("phased", True) and phased
+        for index, vid in hits:
+            dosage = alleles.count(str(index))
+            if not dosage:
                 continue
+            dosages[vid] = dosages.get(vid, 0) + dosage
+            if phased:
+                for haplotype, allele in zip(haplotypes, alleles):
+                    if allele == str(index):
+                        haplotype.add(vid)
 
-            validate_gene(gene)
-            star = normalize_star(info.get("STAR"))
+    def add_text(self, text: str, start: int = 0, end: int | None = None):
+        # Same as add_line for each line of text[start:end], which holds whole lines
+        # separated by "\n" (no trailing terminator). With the prefilter only the lines
+        # candidate_pattern, a known rsID or a supported GENE= tag points at are looked
+        # at individually; the rest are just counted.
+        end = len(text) if end is None else end
+        if self.regions is None:
+            for line in text[start:end].split("\n"):
+                self.add_line(line)
+            return
 
-            format_keys = parts[8].split(":")
-            sample_values = parts[9].split(":")
-            sample = {k: sample_values[i] for i, k in enumerate(format_keys) if i < len(sample_values)}
-            gt = sample.get("GT")
-            alt_count = alt_allele_count(gt)
+        # "#" lines are only expected at the top of the file.
+        data_start = start
+        while text.startswith("#", data_start):
+            newline = text.find("\n", data_start, end)
+            if newline == -1:
+                return
+            data_start = newline + 1
 
-            rec = gene_records.setdefault(gene, {"stars": [], "detected_rsids": []})
-            if rsid.startswith("rs"):
-                rec["detected_rsids"].append(rsid)
+        candidates = {data_start}
+        for match in candidate_pattern().finditer(text, data_start, end):
+            candidates.add(match.start() + 1)
+        for pattern in (rsid_pattern(), gene_tag_pattern()):
+            for match in pattern.finditer(text, data_start, end):
+                candidates.add(text.rfind("\n", data_start, match.start()) + 1 or data_start)
 
-            if star and alt_count > 0:
-                rec["stars"].extend([star] * alt_count)
+        before = self.lines_parsed
+        for line_start in sorted(candidates):
+            line_end = text.find("\n", line_start, end)
+            self.add_line(text[line_start:line_end if line_end != -1 else end])
 
-        variants = []
-        for gene, rec in gene_records.items():
-            stars = [s for s in rec["stars"] if s and s != "*1"]
-            if not stars:
-                diplotype = "*1/*1"
-            elif len(stars) == 1:
-                diplotype = f"*1/{stars[0]}"
-            else:
-                a1 = stars[0]
-                a2 = stars[1]
-                diplotype = f"{a1}/{a2}"
+        unexamined = text.count("\n", data_start, end) + 1 - (self.lines_parsed - before)
+        self.lines_parsed += unexamined
+        self.lines_skipped += unexamined
 
+    def variants(self) -> list:
+        # Called once, when the input is exhausted.
+        metrics.record_vcf(self.lines_parsed, self.lines_skipped)
+        variants = []
+        for gene, rec in self.gene_records.items():
             rsid = rec["detected_rsids"][0] if rec["detected_rsids"] else None
-            variants.append({"gene": gene, "diplotype": diplotype, "rsid": rsid})
+            stars = rec["stars"]
+            # STAR-tagged records win; definitions only call genes that had none.
+            if not stars and rec.get("defined"):
+                if rec["phased"]:
+                    stars = self.definitions.call_phased(gene, rec["haplotypes"])
+                else:
+                    stars = self.definitions.call(gene, rec["defined"])
+            variants.append({"gene": gene, "diplotype": call_diplotype(stars), "rsid": rsid})
+        return variants
+
+
+PROGRESS_EVERY_LINES = 10000
+SCAN_BLOCK_CHARS = 1 << 20
+
+def parse_vcf_lines(lines, progress=None, prefilter: bool | None = None) -> list:
+    accumulator = VcfAccumulator(prefilter)
+    for line in lines:
+        accumulator.add_line(line)
+        if progress and accumulator.lines_parsed % PROGRESS_EVERY_LINES == 0:
+            progress(lines_parsed=accumulator.lines_parsed)
+    if progress:
+        progress(lines_parsed=accumulator.lines_parsed)
+    return accumulator.variants()
+
+def parse_vcf_text(text: str, progress=None, prefilter: bool | None = None) -> list:
+    # Whole VCF in memory: scanned in ~1 MB blocks of whole lines, reporting progress
+    # after each block.
+    accumulator = VcfAccumulator(prefilter)
+    length = len(text)
+    if text.endswith("\n"):
+        length -= 1
+    start = 0
+    while start < length:
+        end = text.find("\n", min(start + SCAN_BLOCK_CHARS, length), length)
+        if end == -1:
+            end = length
+        accumulator.add_text(text, start, end)
+        if progress:
+            progress(lines_parsed=accumulator.lines_parsed)
+        start = end + 1
+    return accumulator.variants()
+
+def parse_variants(request, progress=None):
+    genotype_id = getattr(request, "genotype_id", None)
+    if genotype_id:
+        # A profile stored by POST /genotypes: a key lookup instead of a parse.
+        from app.services.genotype_store import get_genotype_store
 
+        variants = get_genotype_store().get(genotype_id)
+        if variants is None:
+            raise HTTPException(status_code=404, detail=f"Genotype not found or expired: {genotype_id}")
         return variants
 
+    if getattr(request, "variants", None):
+        return [parse_variant(v) for v in request.variants]
+
+    if getattr(request, "vcf_content", None):
+        return parse_vcf_text(request.vcf_content, progress)
+
     return []
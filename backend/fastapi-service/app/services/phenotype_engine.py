@@ -1,3 +1,8 @@
+from app.services import activity_score
+
+# Common diplotypes, precompiled into the decision table and part of the rules
+# digest. Phenotypes themselves come from the activity-score engine, which must
+# agree with every entry here (tests/test_activity_score.py).
 PHENOTYPE_MAP = {
     "CYP2C19": {
         "*1/*1": "NM",
@@ -52,14 +57,4 @@ def canonicalize_diplotype(diplotype: str) -> str:
     return f"{ordered[0]}/{ordered[1]}"
 
 def get_phenotype(gene: str, diplotype: str) -> str:
-    gene_map = PHENOTYPE_MAP.get(gene, {})
-    canonical = canonicalize_diplotype(diplotype)
-    phenotype = gene_map.get(canonical)
-    if phenotype:
-        return phenotype
-    # fallback for unphased diplotypes in opposite order
-    parts = canonical.split("/")
-    if len(parts) == 2:
-        reverse = f"{parts[1]}/{parts[0]}"
-        return gene_map.get(reverse, "Unknown")
-    return "Unknown"
+    return activity_score.get_phenotype(gene, diplotype)
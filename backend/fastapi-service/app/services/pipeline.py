@@ -1,70 +1,130 @@
+import asyncio
 from datetime import datetime, timezone
+from time import perf_counter
+from app.services import metrics
 from app.services.parser import parse_variants
-from app.services.drug_gene_map import get_primary_gene
-from app.services.phenotype_engine import get_phenotype
-from app.services.cpic_rules import get_cpic_recommendation
-from app.services.confidence import get_confidence_score
-from app.services.llm_service import generate_explanation
+from app.services.drug_gene_map import resolve_drug
+from app.services.decision_table import get_decision_table
+from app.services.llm_service import fallback_explanation, generate_explanation, get_llm_loop, request_deadline, run_llm
+from app.services.result_cache import cache_version, fingerprint, get_result_cache, restamp
 
 
-def run_analysis(request):
-    parsed_variants = parse_variants(request)
+def run_analysis(request, progress=None):
+    # `progress`, when given, is called with counters (lines_parsed, drugs_evaluated)
+    # as the analysis advances; the job runner uses it for status and cancellation.
+    # The latency budget starts here, so parsing time counts against it.
+    deadline = request_deadline()
+    with metrics.stage("parse"):
+        parsed_variants = parse_variants(request, progress)
+    return analyze_variants(request.patient_id, request.drugs, parsed_variants, progress, deadline)
+
+
+def assess_drug(drug: str, parsed_variants, timings: dict | None = None) -> tuple:
+    # Deterministic CPIC part of a drug result; returns (result, missing_gene or None).
+    # `timings`, when given, accumulates seconds spent in the "resolve" and "rules" stages.
+    if timings is not None:
+        start = perf_counter()
+    # Rules are keyed on the canonical name (brands, salts, spellings resolved);
+    # the result echoes the drug as requested.
+    canonical, primary_gene = resolve_drug(drug)
+    if timings is not None:
+        resolved = perf_counter()
+        timings["resolve"] += resolved - start
+
+    target_variant = next(
+        (v for v in parsed_variants if v["gene"] == primary_gene),
+        None
+    )
+
+    missing_gene = None
+    if not target_variant:
+        missing_gene = primary_gene
+        target_variant = {
+            "gene": primary_gene,
+            "diplotype": "*1/*1",
+            "rsid": None,
+        }
+
+    diplotype = target_variant["diplotype"]
+
+    # ✅ Step 11: phenotype, CPIC rule and confidence come from the precompiled table
+    rec = get_decision_table().lookup(primary_gene, diplotype, canonical)
+    if timings is not None:
+        timings["rules"] += perf_counter() - resolved
+
+    result = {
+        "drug": drug,
+        "risk_assessment": {
+            "risk_label": rec.risk_label,
+            "confidence_score": rec.confidence_score,
+            "severity": rec.severity
+        },
+        "pharmacogenomic_profile": {
+            "primary_gene": primary_gene,
+            "diplotype": diplotype,
+            "phenotype": rec.phenotype,
+            "detected_variants": (
+                [{"rsid": target_variant["rsid"]}] if target_variant.get("rsid") else []
+            ),
+        },
+        "clinical_recommendation": {
+            "action": rec.action,
+            "details": rec.details
+        },
+    }
+    return result, missing_gene
+
+def assess_drugs(drugs, parsed_variants, progress=None) -> tuple:
     results = []
     missing_genes = []
+    timings = {"resolve": 0.0, "rules": 0.0} if metrics.ENABLED else None
+    for drug in drugs:
+        result, missing_gene = assess_drug(drug, parsed_variants, timings)
+        results.append(result)
+        if missing_gene:
+            missing_genes.append(missing_gene)
+        if progress:
+            progress(drugs_evaluated=len(results))
+    if timings is not None:
+        for name, seconds in timings.items():
+            metrics.observe_stage(name, seconds)
+        metrics.GENE_FALLBACKS.inc(len(missing_genes))
+    return results, missing_genes
 
-    for drug in request.drugs:
-        primary_gene = get_primary_gene(drug)
-
-        target_variant = next(
-            (v for v in parsed_variants if v["gene"] == primary_gene),
-            None
-        )
-
-        if not target_variant:
-            missing_genes.append(primary_gene)
-            target_variant = {
-                "gene": primary_gene,
-                "diplotype": "*1/*1",
-                "rsid": None,
-            }
-
-        diplotype = target_variant["diplotype"]
-        phenotype = get_phenotype(primary_gene, diplotype)
-
-        # ✅ Step 11: always assign cpic inside loop
-        cpic = get_cpic_recommendation(primary_gene, phenotype, drug)
-
-        # ✅ Safe confidence scoring
-        confidence = get_confidence_score(cpic.get("evidence", "C"))
-
-        explanation = generate_explanation(
-            primary_gene, phenotype, drug, cpic["risk_label"]
-        )
-
-        results.append({
-            "drug": drug,
-            "risk_assessment": {
-                "risk_label": cpic["risk_label"],
-                "confidence_score": confidence,
-                "severity": cpic["severity"]
-            },
-            "pharmacogenomic_profile": {
-                "primary_gene": primary_gene,
-                "diplotype": diplotype,
-                "phenotype": phenotype,
-                "detected_variants": (
-                    [{"rsid": target_variant["rsid"]}] if target_variant.get("rsid") else []
-                ),
-            },
-            "clinical_recommendation": {
-                "action": cpic["action"],
-                "details": cpic["details"]
-            },
-            "llm_generated_explanation": explanation
-        })
+def explanation_args(result: dict) -> tuple:
+    # Keyed on the canonical drug, so brand and salt spellings share one explanation
+    # (and the entries `explanation_cache warm` fills); the result keeps the drug as
+    # requested.
+    return (
+        result["pharmacogenomic_profile"]["primary_gene"],
+        result["pharmacogenomic_profile"]["phenotype"],
+        resolve_drug(result["drug"])[0],
+        result["risk_assessment"]["risk_label"],
+    )
 
+def is_fallback(result: dict, explanation: dict) -> bool:
+    return explanation == fallback_explanation(*explanation_args(result))
+
+async def explain_result(result: dict, deadline=None) -> dict:
+    # The template explanation replaces any call still running at the request deadline.
+    args = explanation_args(result)
+    remaining = deadline.remaining() if deadline is not None else None
+    if remaining is None:
+        return await generate_explanation(*args)
+    try:
+        return await asyncio.wait_for(generate_explanation(*args), remaining)
+    except asyncio.TimeoutError:
+        metrics.LLM_FALLBACKS.inc(1, "deadline")
+        return fallback_explanation(*args)
+
+async def explain_results(results, deadline=None) -> list:
+    # All drugs of a request are explained concurrently; llm_service bounds how many
+    # calls are in flight per process.
+    return await asyncio.gather(*(explain_result(r, deadline) for r in results))
+
+def build_response(patient_id: str, results, parsed_variants, missing_genes) -> dict:
     return {
-        "patient_id": request.patient_id,
+        "patient_id": patient_id,
         "timestamp": datetime.now(timezone.utc).isoformat(),
         "results": results,
         "quality_metrics": {
@@ -73,3 +133,88 @@ def run_analysis(request):
             "missing_gene_fallback_count": len(missing_genes),
         },
     }
+
+
+def compute_response(patient_id: str, drugs, parsed_variants, progress=None, deadline=None) -> tuple:
+    # Returns (response, cacheable). Responses carrying a fallback explanation are
+    # not cached so a transient LLM failure is not pinned.
+    if deadline is None:
+        deadline = request_deadline()
+    results, missing_genes = assess_drugs(drugs, parsed_variants, progress)
+
+    with metrics.stage("llm"):
+        explanations = run_llm(explain_results(results, deadline))
+    cacheable = True
+    for result, explanation in zip(results, explanations):
+        result["llm_generated_explanation"] = explanation
+        if is_fallback(result, explanation):
+            cacheable = False
+
+    return build_response(patient_id, results, parsed_variants, missing_genes), cacheable
+
+def analyze_variants(patient_id: str, drugs, parsed_variants, progress=None, deadline=None) -> dict:
+    cache = get_result_cache()
+    if cache is None:
+        return compute_response(patient_id, drugs, parsed_variants, progress, deadline)[0]
+
+    computed = []
+
+    def compute():
+        computed.append(True)
+        return compute_response(patient_id, drugs, parsed_variants, progress, deadline)
+
+    key = fingerprint(parsed_variants, drugs, cache_version())
+    response = cache.get_or_compute(key, compute)
+    if not computed and progress:
+        progress(drugs_evaluated=len(drugs))
+    return restamp(response, patient_id)
+
+
+def evaluate_request(request) -> tuple:
+    # Parse + deterministic CPIC stage only: (parsed_variants, results, missing_genes).
+    with metrics.stage("parse"):
+        parsed_variants = parse_variants(request)
+    results, missing_genes = assess_drugs(request.drugs, parsed_variants)
+    return parsed_variants, results, missing_genes
+
+async def stream_analysis(patient_id: str, drugs, parsed_variants, results, missing_genes, deadline=None):
+    # Yields (event, data): "header" with quality metrics, one "result" per drug with
+    # the deterministic fields, one "explanation" per drug as each LLM call finishes
+    # (completion order), then "done". Runs on the server loop; the LLM calls run on
+    # the shared LLM loop and are cancelled if the client goes away.
+    response = build_response(patient_id, results, parsed_variants, missing_genes)
+    yield "header", {k: response[k] for k in ("patient_id", "timestamp", "quality_metrics")}
+    for index, result in enumerate(results):
+        yield "result", {"index": index, **result}
+
+    cache = get_result_cache()
+    key = fingerprint(parsed_variants, drugs, cache_version()) if cache is not None else None
+    cached = cache.get(key) if cache is not None else None
+    if cached is not None:
+        for index, result in enumerate(cached["results"]):
+            yield "explanation", {"index": index, "drug": result["drug"], "llm_generated_explanation": result["llm_generated_explanation"]}
+        yield "done", {"patient_id": patient_id, "results": len(results)}
+        return
+
+    if deadline is None:
+        deadline = request_deadline()
+    loop = get_llm_loop()
+    futures = [asyncio.run_coroutine_threadsafe(explain_result(r, deadline), loop) for r in results]
+
+    async def explained(index: int):
+        return index, await asyncio.wrap_future(futures[index])
+
+    start = perf_counter()
+    try:
+        for next_done in asyncio.as_completed([explained(i) for i in range(len(results))]):
+            index, explanation = await next_done
+            results[index]["llm_generated_explanation"] = explanation
+            yield "explanation", {"index": index, "drug": results[index]["drug"], "llm_generated_explanation": explanation}
+    finally:
+        for future in futures:
+            future.cancel()
+    metrics.observe_stage("llm", perf_counter() - start)
+
+    if cache is not None and not any(is_fallback(r, r["llm_generated_explanation"]) for r in results):
+        cache.put(key, response)
+    yield "done", {"patient_id": patient_id, "results": len(results)}
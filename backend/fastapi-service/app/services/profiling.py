@@ -0,0 +1,329 @@
+"""On-demand profiling of a single /analyze call, for payloads that are slow in
+production and cannot be reproduced elsewhere.
+
+    python -m app.services.profiling list
+    python -m app.services.profiling show <profile_id> --format collapsed > out.folded
+    python -m app.services.profiling show <profile_id> --format speedscope > out.speedscope.json
+
+Off unless PROFILE_TOKEN is set. A request carrying X-Profile-Token: <token> runs
+parse_variants through run_analysis under a profiler ("sample", the default, or
+"trace" via X-Profile-Mode) with tracemalloc on, and the response names the stored
+profile in X-Profile-Id. Requests without the header take the normal path; with no
+token configured nothing here is ever called.
+
+"sample" reads the request thread's stack from a side thread every
+PROFILE_SAMPLE_INTERVAL_MS, weighting each stack by the wall time since the previous
+sample (on CPU-bound code the sampler only gets the GIL every sys.getswitchinterval(),
+5 ms by default, so samples are sparser but the weights still add up). "trace" is deterministic (sys.setprofile on the request thread, self time
+per stack, every Python and C call): exact, but several times slower. Either way only
+the request thread is profiled; LLM calls show as time waiting in run_llm.
+Allocation stats come from tracemalloc, which is process-wide, so concurrent
+requests add to them. One profile runs at a time per worker.
+
+Profiles are JSON files under PROFILE_DIR (shared by the workers on a host), newest
+PROFILE_MAX_STORED kept, served as collapsed stacks (flamegraph.pl, speedscope,
+inferno) or speedscope JSON at GET /admin/profiles/{id}.
+"""
+import hmac
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from fastapi import HTTPException
+
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_HEADER = "x-profile-token"
+PROFILE_MODE_HEADER = "x-profile-mode"
+PROFILE_MODES = ("sample", "trace")
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+PROFILE_TRACEMALLOC_TOP = int(os.getenv("PROFILE_TRACEMALLOC_TOP", "25"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "50"))
+DEFAULT_PROFILE_DIR = os.path.join(tempfile.gettempdir(), "pharmaguard_profiles")
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+_active = threading.Lock()
+
+
+def profile_requested(request) -> bool:
+    # The zero-cost check on the hot path: a constant and a header lookup.
+    return bool(PROFILE_TOKEN) and PROFILE_HEADER in request.headers
+
+def authorize(request):
+    # 404 while profiling is off so the admin surface is invisible; 403 on a bad token.
+    if not PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not hmac.compare_digest(request.headers.get(PROFILE_HEADER, "").encode(), PROFILE_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid profile token")
+
+def requested_mode(request) -> str:
+    mode = request.headers.get(PROFILE_MODE_HEADER, "sample").strip().lower()
+    if mode not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"{PROFILE_MODE_HEADER} must be one of {', '.join(PROFILE_MODES)}")
+    return mode
+
+
+class _Frames:
+    # Interns (name, file, line) frames to indexes shared by every stack.
+    def __init__(self):
+        self.frames = []
+        self._ids = {}
+
+    def code_id(self, code) -> int:
+        key = self._ids.get(code)
+        if key is None:
+            key = self._ids[code] = self._add(getattr(code, "co_qualname", code.co_name), code.co_filename, code.co_firstlineno)
+        return key
+
+    def builtin_id(self, function) -> int:
+        # Bound builtins (list.append of each list) are new objects per call, so C
+        # functions are keyed by name.
+        name = f"{getattr(function, '__module__', None) or 'builtins'}.{getattr(function, '__qualname__', type(function).__name__)}"
+        key = self._ids.get(name)
+        if key is None:
+            key = self._ids[name] = self._add(name, "~", 0)
+        return key
+
+    def _add(self, name: str, filename: str, line: int) -> int:
+        self.frames.append((name, filename, line))
+        return len(self.frames) - 1
+
+
+class SamplingProfiler:
+    # Stacks of one thread, sampled from a daemon thread; weights are microseconds.
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.frames = _Frames()
+        self.weights = {}
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self.frames.code_id(frame.f_code))
+                frame = frame.f_back
+            key = tuple(reversed(stack))
+            self.weights[key] = self.weights.get(key, 0) + (now - last) * 1e6
+            self.samples += 1
+            last = now
+
+
+class TracingProfiler:
+    # Every call and return on the calling thread; self time per stack in microseconds.
+    def __init__(self):
+        self.frames = _Frames()
+        self.weights = {}
+        self.samples = 0
+        self._stack = []
+
+    def start(self):
+        sys.setprofile(self._event)
+
+    def stop(self):
+        sys.setprofile(None)
+
+    def _event(self, frame, event, arg):
+        now = time.perf_counter_ns()
+        if event == "call":
+            self._stack.append([self.frames.code_id(frame.f_code), now, 0])
+        elif event == "c_call":
+            self._stack.append([self.frames.builtin_id(arg), now, 0])
+        elif self._stack and event in ("return", "c_return", "c_exception"):
+            frame_id, start, children = self._stack.pop()
+            elapsed = now - start
+            key = (*(entry[0] for entry in self._stack), frame_id)
+            self.weights[key] = self.weights.get(key, 0) + (elapsed - children) / 1e3
+            self.samples += 1
+            if self._stack:
+                self._stack[-1][2] += elapsed
+
+
+def _allocation_stats(snapshot, top: int) -> list:
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        tracemalloc.Filter(False, __file__),
+    ])
+    return [
+        {
+            "file": stat.traceback[0].filename,
+            "line": stat.traceback[0].lineno,
+            "size_kb": round(stat.size / 1024, 1),
+            "count": stat.count,
+        }
+        for stat in snapshot.statistics("lineno")[:top]
+    ]
+
+
+@contextmanager
+def profile_session(mode: str = "sample", label: str = ""):
+    # Yields a dict that holds the stored profile's id on exit (even when the profiled
+    # code raises, so failing payloads can be looked at too).
+    if not _active.acquire(blocking=False):
+        raise HTTPException(status_code=409, detail="A profile is already running in this worker")
+    session = {"id": uuid.uuid4().hex}
+    started_tracemalloc = not tracemalloc.is_tracing()
+    try:
+        if started_tracemalloc:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        if mode == "trace":
+            profiler = TracingProfiler()
+        else:
+            profiler = SamplingProfiler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            yield session
+        finally:
+            profiler.stop()
+            wall = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory()
+            allocations = _allocation_stats(tracemalloc.take_snapshot(), PROFILE_TRACEMALLOC_TOP)
+            save_profile({
+                "id": session["id"],
+                "label": label,
+                "mode": mode,
+                "created_at": time.time(),
+                "wall_ms": round(wall * 1e3, 3),
+                "samples": profiler.samples,
+                "unit": "microseconds",
+                "frames": profiler.frames.frames,
+                "stacks": [[list(stack), round(weight, 3)] for stack, weight in profiler.weights.items()],
+                "memory": {
+                    "peak_kb": round((peak - baseline) / 1024, 1),
+                    "retained_kb": round((current - baseline) / 1024, 1),
+                    "top_allocations": allocations,
+                },
+            })
+    finally:
+        if started_tracemalloc:
+            tracemalloc.stop()
+        _active.release()
+
+
+def profile_dir() -> str:
+    return os.getenv("PROFILE_DIR") or DEFAULT_PROFILE_DIR
+
+def _profile_path(profile_id: str) -> str:
+    if not _PROFILE_ID.match(profile_id or ""):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return os.path.join(profile_dir(), f"{profile_id}.json")
+
+def save_profile(profile: dict):
+    directory = profile_dir()
+    os.makedirs(directory, exist_ok=True)
+    path = _profile_path(profile["id"])
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(profile, f, separators=(",", ":"))
+    os.replace(path + ".tmp", path)
+
+    stored = sorted(
+        (e for e in os.scandir(directory) if e.name.endswith(".json")),
+        key=lambda e: e.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in stored[PROFILE_MAX_STORED:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def load_profile(profile_id: str) -> dict:
+    try:
+        with open(_profile_path(profile_id), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+def list_profiles() -> list:
+    directory = profile_dir()
+    if not os.path.isdir(directory):
+        return []
+    summaries = []
+    for entry in os.scandir(directory):
+        if not entry.name.endswith(".json"):
+            continue
+        try:
+            with open(entry.path, encoding="utf-8") as f:
+                profile = json.load(f)
+        except (OSError, ValueError):
+            continue
+        summaries.append({k: profile.get(k) for k in ("id", "label", "mode", "created_at", "wall_ms", "samples")})
+    return sorted(summaries, key=lambda p: p["created_at"] or 0, reverse=True)
+
+
+def _frame_name(frame) -> str:
+    name, filename, line = frame
+    return f"{name} ({os.path.basename(filename)}:{line})" if line else name
+
+def to_collapsed(profile: dict) -> str:
+    # One "root;caller;callee weight" line per stack (weights in whole microseconds).
+    names = [_frame_name(f).replace(";", ",") for f in profile["frames"]]
+    lines = []
+    for stack, weight in profile["stacks"]:
+        if round(weight) > 0:
+            lines.append(f"{';'.join(names[i] for i in stack)} {round(weight)}")
+    return "\n".join(sorted(lines)) + "\n"
+
+def to_speedscope(profile: dict) -> dict:
+    total = sum(weight for _, weight in profile["stacks"])
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "exporter": "pharmaguard",
+        "name": profile.get("label") or profile["id"],
+        "activeProfileIndex": 0,
+        "shared": {"frames": [{"name": n, "file": f, "line": l} for n, f, l in profile["frames"]]},
+        "profiles": [{
+            "type": "sampled",
+            "name": f"{profile.get('label') or 'analyze'} ({profile['mode']})",
+            "unit": profile.get("unit", "microseconds"),
+            "startValue": 0,
+            "endValue": total,
+            "samples": [stack for stack, _ in profile["stacks"]],
+            "weights": [weight for _, weight in profile["stacks"]],
+        }],
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["list", "show"])
+    parser.add_argument("profile_id", nargs="?")
+    parser.add_argument("--format", choices=["json", "collapsed", "speedscope"], default="json")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        print(json.dumps(list_profiles(), indent=2))
+    else:
+        stored = load_profile(args.profile_id or "")
+        if args.format == "collapsed":
+            sys.stdout.write(to_collapsed(stored))
+        elif args.format == "speedscope":
+            print(json.dumps(to_speedscope(stored)))
+        else:
+            print(json.dumps(stored, indent=2))
@@ -0,0 +1,158 @@
+import asyncio
+import threading
+from time import monotonic
+from app.services import metrics
+
+
+class CircuitOpenError(Exception):
+    pass
+
+
+class Deadline:
+    # Absolute point in time (monotonic clock) by which a request must be done.
+    # Created once per request and handed down, so every stage spends from the same
+    # budget instead of each getting its own timeout. None seconds = no deadline.
+    __slots__ = ("expires_at",)
+
+    def __init__(self, seconds: float | None):
+        self.expires_at = monotonic() + seconds if seconds else None
+
+    def remaining(self) -> float | None:
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.expires_at is not None and monotonic() >= self.expires_at
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+class CircuitBreaker:
+    # closed: calls go through; `failure_threshold` consecutive failures open it.
+    # open: calls are refused until `reset_timeout` has passed, then it goes half-open.
+    # half_open: up to `half_open_probes` calls go through; one success closes the
+    # breaker, one failure opens it again for another `reset_timeout`.
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_probes: int = 1, clock=monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self.counters = {"calls": 0, "successes": 0, "failures": 0, "rejected": 0}
+        metrics.CIRCUIT_STATE.set(STATE_VALUES[CLOSED], name)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _transition(self, state: str):
+        # Caller holds the lock.
+        self._state = state
+        if state == OPEN:
+            self._opened_at = self.clock()
+        self._probes = 0
+        metrics.CIRCUIT_STATE.set(STATE_VALUES[state], self.name)
+        metrics.CIRCUIT_TRANSITIONS.inc(1, self.name, state)
+
+    def _maybe_half_open(self):
+        if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self._transition(HALF_OPEN)
+
+    def allow(self) -> bool:
+        # True if a call may go out now; in half-open state it also takes a probe slot,
+        # which the caller must give back with record_success/record_failure/release.
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                allowed = True
+            elif self._state == HALF_OPEN and self._probes < self.half_open_probes:
+                self._probes += 1
+                allowed = True
+            else:
+                allowed = False
+            self.counters["calls" if allowed else "rejected"] += 1
+            return allowed
+
+    def record_success(self):
+        with self._lock:
+            self.counters["successes"] += 1
+            self._failures = 0
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.counters["failures"] += 1
+            self._failures += 1
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._transition(OPEN)
+
+    def release(self):
+        # The call was abandoned (cancelled) without an outcome.
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes:
+                self._probes -= 1
+
+    async def call(self, attempt):
+        # Runs `attempt()` (a coroutine factory) under the breaker. Raises
+        # CircuitOpenError without calling it when the breaker refuses.
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        try:
+            result = await attempt()
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        except Exception:
+            self.record_failure()
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._maybe_half_open()
+            return {"state": self._state, "consecutive_failures": self._failures, **self.counters}
+
+
+async def hedged(attempt, hedge_after: float | None):
+    # Runs `attempt()`; if it has not finished after `hedge_after` seconds, starts a
+    # second one and returns whichever succeeds first (the other is cancelled).
+    # Fails only if every started attempt fails. hedge_after None/0 = no hedging.
+    first = asyncio.ensure_future(attempt())
+    if not hedge_after:
+        return await first
+
+    tasks = {first}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if done:
+            return first.result()
+        metrics.LLM_HEDGES.inc()
+        tasks.add(asyncio.ensure_future(attempt()))
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timezone
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def rules_version() -> str:
+    # Digest of every table that shapes a deterministic result. The tables are static
+    # for the life of a process, so this is computed once.
+    from app.services.cpic_rules import CPIC_RULES, SAFE_PHENOTYPE_BY_GENE
+    from app.services.drug_gene_map import DRUG_ALIASES, get_drug_gene_map
+    from app.services.drug_index import SALT_WORDS
+    from app.services.activity_score import ALLELE_FUNCTIONS, PHENOTYPE_BINS
+    from app.services.phenotype_engine import PHENOTYPE_MAP
+
+    tables = {
+        "phenotypes": PHENOTYPE_MAP,
+        "allele_functions": ALLELE_FUNCTIONS,
+        "phenotype_bins": PHENOTYPE_BINS,
+        "cpic": sorted(["|".join(key), rule] for key, rule in CPIC_RULES.items()),
+        "safe": {gene: sorted(p) for gene, p in SAFE_PHENOTYPE_BY_GENE.items()},
+        "drugs": sorted(get_drug_gene_map().items()),
+        "aliases": DRUG_ALIASES,
+        "salts": sorted(SALT_WORDS),
+    }
+    payload = json.dumps(tables, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def cache_version() -> str:
+    from app.services.llm_service import LLM_MODEL, PROMPT_VERSION
+
+    return f"{rules_version()}:{PROMPT_VERSION}:{LLM_MODEL}"
+
+def fingerprint(parsed_variants, drugs, version: str) -> str:
+    # A response depends only on the first record per gene (what assess_drug picks),
+    # the parsed variant count and the drug list. Drug names are echoed back verbatim,
+    # so they are keyed as given, in order.
+    profile = {}
+    for v in parsed_variants:
+        profile.setdefault(v["gene"], (v["diplotype"], v.get("rsid")))
+    payload = json.dumps(
+        [version, sorted(profile.items()), len(parsed_variants), list(drugs)],
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def restamp(response: dict, patient_id: str) -> dict:
+    return {**response, "patient_id": patient_id, "timestamp": datetime.now(timezone.utc).isoformat()}
+
+
+class ResultCache:
+    # Bounded LRU of whole analysis responses with single-flight: concurrent misses on
+    # one key wait for the first caller's computation instead of repeating it.
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = None
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0, "coalesced": 0, "stores": 0, "uncacheable": 0, "evictions": 0, "invalidations": 0}
+
+    def sync_version(self, version: str):
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.counters["invalidations"] += len(self._entries)
+                self._entries.clear()
+                self._bytes = 0
+                self.version = version
+
+    def get_or_compute(self, key: str, compute):
+        # `compute` returns (response, cacheable). Responses are shared between callers
+        # and must be treated as read-only.
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    self.counters["hits"] += 1
+                    return entry[0]
+                flight = self._inflight.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._inflight[key] = Future()
+                    self.counters["misses"] += 1
+                else:
+                    self.counters["coalesced"] += 1
+
+            if not leader:
+                try:
+                    return flight.result()
+                except Exception:
+                    # The first caller failed or was cancelled; its error is not ours.
+                    continue
+
+            try:
+                response, cacheable = compute()
+            except BaseException as exc:
+                with self._lock:
+                    self._inflight.pop(key, None)
+                flight.set_exception(exc)
+                raise
+
+            with self._lock:
+                self._inflight.pop(key, None)
+                if cacheable:
+                    self._store(key, response)
+                else:
+                    self.counters["uncacheable"] += 1
+            flight.set_result(response)
+            return response
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+            return entry[0]
+
+    def put(self, key: str, response: dict):
+        with self._lock:
+            self._store(key, response)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+            stats["version"] = self.version
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["coalesced"]) / lookups, 4) if lookups else None
+        return stats
+
+    def _store(self, key: str, response: dict):
+        size = len(json.dumps(response, separators=(",", ":")))
+        if size > self.max_bytes:
+            self.counters["uncacheable"] += 1
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (response, size)
+        self._bytes += size
+        self.counters["stores"] += 1
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted
+            self.counters["evictions"] += 1
+
+
+@lru_cache(maxsize=1)
+def _build_cache() -> ResultCache:
+    return ResultCache(
+        max_entries=int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "4096")),
+        max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    )
+
+def get_result_cache() -> ResultCache | None:
+    if os.getenv("RESULT_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    cache = _build_cache()
+    cache.sync_version(cache_version())
+    return cache
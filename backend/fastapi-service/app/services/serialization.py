@@ -0,0 +1,106 @@
+import gzip
+import json
+import os
+from fastapi.responses import Response
+
+# Optional speedups; each one is used only when installed.
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Checked on every call (tests and benchmarks flip it). When off, endpoints return
+# their dicts and FastAPI validates them against response_model and encodes them.
+ENABLED = os.getenv("FAST_RESPONSES", "false").lower() == "true"
+COMPRESS_MIN_BYTES = int(os.getenv("RESPONSE_COMPRESS_MIN_BYTES", "4096"))
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack", "application/vnd.msgpack")
+
+
+def _builtin(value):
+    # numpy scalars/arrays (cohort calls) for json and msgpack.
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Type is not serializable: {type(value).__name__}")
+
+def dumps_json(payload) -> bytes:
+    # Same bytes as FastAPI's JSONResponse (compact, UTF-8, no NaN).
+    if orjson is not None:
+        return orjson.dumps(payload, default=_builtin, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_builtin).encode("utf-8")
+
+def _accepted(header: str) -> dict:
+    # {token: q} from an Accept or Accept-Encoding header.
+    accepted = {}
+    for part in header.lower().split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[token.strip()] = q
+    return accepted
+
+def negotiate_media_type(accept: str) -> str:
+    # msgpack only when asked for (and installed), everything else gets JSON.
+    if msgpack is None or not accept:
+        return JSON_TYPE
+    accepted = _accepted(accept)
+    best = max((accepted.get(t, 0.0) for t in MSGPACK_TYPES), default=0.0)
+    if best > 0 and best >= max(accepted.get(JSON_TYPE, 0.0), accepted.get("*/*", 0.0), accepted.get("application/*", 0.0)):
+        return MSGPACK_TYPES[0]
+    return JSON_TYPE
+
+def negotiate_encoding(accept_encoding: str) -> str | None:
+    accepted = _accepted(accept_encoding or "")
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+def encode(payload, media_type: str = JSON_TYPE) -> bytes:
+    if media_type in MSGPACK_TYPES:
+        return msgpack.packb(payload, default=_builtin, use_bin_type=True)
+    return dumps_json(payload)
+
+def compress(body: bytes, encoding: str) -> bytes:
+    # Fast levels: responses are compressed per request, not once and cached.
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=5, mtime=0)
+
+def fast_response(request, payload, status_code: int = 200) -> Response:
+    # The payload is trusted to already match the endpoint's response_model: it is
+    # encoded once, without pydantic validation, then compressed when large enough.
+    media_type = negotiate_media_type(request.headers.get("accept", ""))
+    body = encode(payload, media_type)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if len(body) >= COMPRESS_MIN_BYTES:
+        encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+        if encoding is not None:
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+    return Response(body, status_code=status_code, headers=headers, media_type=media_type)
+
+def respond(request, payload, status_code: int = 200):
+    # What an endpoint returns: the plain payload (FastAPI's validated path) unless
+    # FAST_RESPONSES is on.
+    if not ENABLED:
+        return payload
+    return fast_response(request, payload, status_code)
@@ -0,0 +1,236 @@
+import gzip
+import io
+import struct
+from app.services.bgzf import BgzfReader, BgzfWriter
+from app.services.gene_regions import normalize_chrom, pgx_regions
+
+TBI_MAGIC = b"TBI\x01"
+CSI_MAGIC = b"CSI\x01"
+TBI_MIN_SHIFT = 14
+TBI_DEPTH = 5
+TBI_FORMAT_VCF = 2
+
+
+def reg2bins(beg: int, end: int, min_shift: int, depth: int) -> list:
+    # All bins that may hold records overlapping the 0-based half-open [beg, end).
+    bins = []
+    end -= 1
+    shift = min_shift + depth * 3
+    first = 0
+    for level in range(depth + 1):
+        bins.extend(range(first + (beg >> shift), first + (end >> shift) + 1))
+        shift -= 3
+        first += 1 << (level * 3)
+    return bins
+
+def reg2bin(beg: int, end: int, min_shift: int = TBI_MIN_SHIFT, depth: int = TBI_DEPTH) -> int:
+    end -= 1
+    shift = min_shift
+    first = ((1 << (depth * 3)) - 1) // 7
+    level = depth
+    while level > 0:
+        if beg >> shift == end >> shift:
+            return first + (beg >> shift)
+        level -= 1
+        shift += 3
+        first -= 1 << (level * 3)
+    return 0
+
+
+class TabixIndex:
+    def __init__(self, names, bins, linear, min_shift, depth, meta_char):
+        self.names = names
+        self.bins = bins
+        self.linear = linear
+        self.min_shift = min_shift
+        self.depth = depth
+        self.meta_char = meta_char
+        self._by_chrom = {normalize_chrom(name): i for i, name in enumerate(names)}
+
+    def chunks(self, chrom: str, start: int, end: int) -> list:
+        # start/end are 1-based inclusive, as in the region table.
+        tid = self._by_chrom.get(normalize_chrom(chrom))
+        if tid is None:
+            return []
+        beg = start - 1
+        min_offset = 0
+        linear = self.linear[tid]
+        if linear:
+            window = beg >> self.min_shift
+            min_offset = linear[min(window, len(linear) - 1)]
+
+        bins = self.bins[tid]
+        found = []
+        for bin_id in reg2bins(beg, end, self.min_shift, self.depth):
+            for chunk_beg, chunk_end in bins.get(bin_id, ()):
+                if chunk_end > min_offset:
+                    found.append((chunk_beg, chunk_end))
+        return found
+
+
+def _read_int(buf, offset, fmt="<i"):
+    return struct.unpack_from(fmt, buf, offset)[0], offset + struct.calcsize(fmt)
+
+def _read_names(buf, offset):
+    l_nm, offset = _read_int(buf, offset)
+    names = [n.decode() for n in buf[offset:offset + l_nm].split(b"\x00") if n]
+    return names, offset + l_nm
+
+def _read_chunks(buf, offset):
+    n_chunk, offset = _read_int(buf, offset)
+    chunks = list(struct.iter_unpack("<QQ", buf[offset:offset + 16 * n_chunk]))
+    return chunks, offset + 16 * n_chunk
+
+def parse_index(data: bytes) -> TabixIndex:
+    buf = gzip.decompress(data) if data[:2] == b"\x1f\x8b" else data
+    magic = buf[:4]
+
+    if magic == TBI_MAGIC:
+        n_ref, offset = _read_int(buf, 4)
+        _fmt, _seq, _beg, _end, meta, _skip = struct.unpack_from("<6i", buf, offset)
+        names, offset = _read_names(buf, offset + 24)
+        min_shift, depth = TBI_MIN_SHIFT, TBI_DEPTH
+        all_bins, all_linear = [], []
+        for _ in range(n_ref):
+            n_bin, offset = _read_int(buf, offset)
+            bins = {}
+            for _ in range(n_bin):
+                bin_id, offset = _read_int(buf, offset, "<I")
+                bins[bin_id], offset = _read_chunks(buf, offset)
+            n_intv, offset = _read_int(buf, offset)
+            all_linear.append(list(struct.unpack_from(f"<{n_intv}Q", buf, offset)))
+            offset += 8 * n_intv
+            all_bins.append(bins)
+        return TabixIndex(names, all_bins, all_linear, min_shift, depth, chr(meta))
+
+    if magic == CSI_MAGIC:
+        min_shift, depth, l_aux = struct.unpack_from("<3i", buf, 4)
+        aux = buf[16:16 + l_aux]
+        offset = 16 + l_aux
+        names, meta = [], ord("#")
+        if len(aux) >= 28:
+            meta = struct.unpack_from("<6i", aux, 0)[4]
+            names, _ = _read_names(aux, 24)
+        n_ref, offset = _read_int(buf, offset)
+        all_bins = []
+        for _ in range(n_ref):
+            n_bin, offset = _read_int(buf, offset)
+            bins = {}
+            for _ in range(n_bin):
+                bin_id, _loffset = struct.unpack_from("<IQ", buf, offset)
+                bins[bin_id], offset = _read_chunks(buf, offset + 12)
+            all_bins.append(bins)
+        # CSI has no linear index; per-bin loffsets are only an optimisation.
+        return TabixIndex(names, all_bins, [[] for _ in all_bins], min_shift, depth, chr(meta))
+
+    raise ValueError("Unrecognized index format (expected .tbi or .csi)")
+
+
+def _merge_chunks(chunks) -> list:
+    merged = []
+    for beg, end in sorted(chunks):
+        if merged and beg <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([beg, end])
+    return merged
+
+def _in_regions(line: str, regions_by_chrom) -> bool:
+    parts = line.split("\t", 2)
+    if len(parts) < 2 or not parts[1].isdigit():
+        return False
+    pos = int(parts[1])
+    for start, end in regions_by_chrom.get(normalize_chrom(parts[0]), ()):
+        if start <= pos <= end:
+            return True
+    return False
+
+def iter_header_lines(reader: BgzfReader, meta_char: str = "#"):
+    pending = b""
+    coffset = 0
+    while True:
+        data, next_offset = reader.read_block(coffset)
+        if not data and next_offset == coffset:
+            break
+        lines = (pending + data).split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            text = line.decode("utf-8", errors="replace")
+            if not text.startswith(meta_char):
+                return
+            yield text
+        coffset = next_offset
+
+def iter_region_lines(fileobj, index: TabixIndex, regions=None):
+    # Yields the header, then only the data lines that fall inside `regions`,
+    # decoding just the BGZF blocks the index points at.
+    regions = regions if regions is not None else pgx_regions()
+    reader = BgzfReader(fileobj)
+    yield from iter_header_lines(reader, index.meta_char)
+
+    regions_by_chrom = {}
+    chunks = []
+    for chrom, start, end, *_ in regions:
+        regions_by_chrom.setdefault(normalize_chrom(chrom), []).append((start, end))
+        chunks.extend(index.chunks(chrom, start, end))
+
+    for beg, end in _merge_chunks(chunks):
+        data = b"".join(reader.read_range(beg, end))
+        for line in data.decode("utf-8", errors="replace").split("\n"):
+            if line and not line.startswith(index.meta_char) and _in_regions(line, regions_by_chrom):
+                yield line
+
+
+def write_bgzf_with_index(lines, fileobj) -> bytes:
+    # Writes VCF lines as BGZF and returns a matching .tbi index. Pure Python, meant
+    # for fixtures and benchmarks rather than production-sized files.
+    writer = BgzfWriter(fileobj)
+    names, refs = [], {}
+    for line in lines:
+        if not line.endswith("\n"):
+            line += "\n"
+        start = writer.tell()
+        writer.write(line.encode("utf-8"))
+        if line.startswith("#"):
+            continue
+        end = writer.tell()
+        chrom, pos, _id, ref = line.split("\t", 4)[:4]
+        beg = int(pos) - 1
+        stop = beg + max(len(ref), 1)
+        if chrom not in refs:
+            names.append(chrom)
+            refs[chrom] = ({}, {})
+        bins, linear = refs[chrom]
+        chunk_list = bins.setdefault(reg2bin(beg, stop), [])
+        if chunk_list and chunk_list[-1][1] == start:
+            chunk_list[-1][1] = end
+        else:
+            chunk_list.append([start, end])
+        for window in range(beg >> TBI_MIN_SHIFT, ((stop - 1) >> TBI_MIN_SHIFT) + 1):
+            linear.setdefault(window, start)
+    writer.close()
+
+    name_blob = b"".join(n.encode() + b"\x00" for n in names)
+    out = io.BytesIO()
+    out.write(TBI_MAGIC)
+    out.write(struct.pack("<8i", len(names), TBI_FORMAT_VCF, 1, 2, 0, ord("#"), 0, len(name_blob)))
+    out.write(name_blob)
+    for name in names:
+        bins, linear = refs[name]
+        out.write(struct.pack("<i", len(bins)))
+        for bin_id, chunk_list in sorted(bins.items()):
+            out.write(struct.pack("<Ii", bin_id, len(chunk_list)))
+            for beg, end in chunk_list:
+                out.write(struct.pack("<QQ", beg, end))
+        n_intv = max(linear) + 1 if linear else 0
+        offsets, last = [], 0
+        for window in range(n_intv):
+            last = linear.get(window, last)
+            offsets.append(last)
+        out.write(struct.pack(f"<i{n_intv}Q", n_intv, *offsets))
+
+    index = io.BytesIO()
+    index_writer = BgzfWriter(index)
+    index_writer.write(out.getvalue())
+    index_writer.close()
+    return index.getvalue()
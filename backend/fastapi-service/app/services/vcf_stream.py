@@ -0,0 +1,134 @@
+import os
+import struct
+import zlib
+from fastapi import HTTPException
+from app.services.bgzf import is_bgzf
+from app.services.parser import VcfAccumulator, parse_vcf_lines
+from app.services.tabix import iter_region_lines, parse_index
+
+GZIP_MAGIC = b"\x1f\x8b"
+CHUNK_SIZE = 1 << 20
+MAX_LINE_BYTES = 64 << 20
+
+
+class VcfStreamDecoder:
+    # Turns arbitrary byte chunks of a plain, gzip or BGZF VCF into text lines.
+    # BGZF is a series of concatenated gzip members, so every member is inflated
+    # in turn; output is capped per step so memory stays bounded for any input.
+
+    def __init__(self):
+        self._compressed = None
+        self._inflater = None
+        self._pending = b""
+        self._head = b""
+
+    def feed(self, chunk: bytes):
+        for block in self.feed_blocks(chunk):
+            yield from block.split("\n")
+
+    def close(self):
+        for block in self.close_blocks():
+            yield from block.split("\n")
+
+    def feed_blocks(self, chunk: bytes):
+        # Decoded text in blocks of whole lines joined by "\n" (no trailing newline),
+        # for VcfAccumulator.add_text.
+        if self._compressed is None:
+            self._head += chunk
+            if len(self._head) < len(GZIP_MAGIC):
+                return
+            chunk, self._head = self._head, b""
+            self._compressed = chunk.startswith(GZIP_MAGIC)
+
+        if not self._compressed:
+            yield from self._split(chunk)
+            return
+
+        data = chunk
+        while data:
+            if self._inflater is None:
+                self._inflater = zlib.decompressobj(zlib.MAX_WBITS | 16)
+            try:
+                out = self._inflater.decompress(data, CHUNK_SIZE)
+            except zlib.error as exc:
+                raise HTTPException(status_code=400, detail=f"Invalid gzip/BGZF stream: {exc}")
+            yield from self._split(out)
+
+            if self._inflater.eof:
+                data = self._inflater.unused_data
+                self._inflater = None
+            else:
+                data = self._inflater.unconsumed_tail
+
+    def close_blocks(self):
+        if self._head:
+            head, self._head = self._head, b""
+            self._compressed = False
+            yield from self._split(head)
+        if self._inflater is not None:
+            # A member still open at the end means the upload was cut off; reading
+            # what arrived would silently drop the records after the cut.
+            self._inflater = None
+            raise HTTPException(status_code=400, detail="Invalid gzip/BGZF stream: truncated gzip stream")
+        if self._pending:
+            line, self._pending = self._pending, b""
+            yield line.decode("utf-8", errors="replace")
+
+    def _split(self, data: bytes):
+        if not data:
+            return
+        data = self._pending + data
+        cut = data.rfind(b"\n")
+        if cut < 0:
+            if len(data) > MAX_LINE_BYTES:
+                raise HTTPException(status_code=400, detail="VCF line exceeds maximum supported length")
+            self._pending = data
+            return
+        self._pending = data[cut + 1:]
+        yield data[:cut].decode("utf-8", errors="replace")
+
+
+def iter_file_chunks(fileobj, chunk_size: int = CHUNK_SIZE):
+    while True:
+        chunk = fileobj.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+def iter_vcf_lines(chunks):
+    decoder = VcfStreamDecoder()
+    for chunk in chunks:
+        yield from decoder.feed(chunk)
+    yield from decoder.close()
+
+def parse_vcf_stream(chunks) -> list:
+    accumulator = VcfAccumulator()
+    decoder = VcfStreamDecoder()
+    for chunk in chunks:
+        for block in decoder.feed_blocks(chunk):
+            accumulator.add_text(block)
+    for block in decoder.close_blocks():
+        accumulator.add_text(block)
+    return accumulator.variants()
+
+def parse_indexed_vcf(fileobj, index_data: bytes, regions=None) -> list:
+    # Seeks straight to the pharmacogene loci of a BGZF file using its .tbi/.csi index.
+    try:
+        return parse_vcf_lines(iter_region_lines(fileobj, parse_index(index_data), regions))
+    except (ValueError, OSError, EOFError, struct.error, zlib.error) as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid indexed VCF: {exc}")
+
+def find_index_path(path: str) -> str | None:
+    for suffix in (".tbi", ".csi"):
+        if os.path.exists(path + suffix):
+            return path + suffix
+    return None
+
+def parse_vcf_file(path: str) -> list:
+    index_path = find_index_path(path)
+    with open(path, "rb") as handle:
+        if index_path and is_bgzf(handle.read(18)):
+            with open(index_path, "rb") as index_file:
+                return parse_indexed_vcf(handle, index_file.read())
+        handle.seek(0)
+        return parse_vcf_stream(iter_file_chunks(handle))
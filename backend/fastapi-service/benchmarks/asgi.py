@@ -0,0 +1,54 @@
+import asyncio
+
+
+def _headers(extra) -> list:
+    headers = {"content-type": "application/json", "host": "bench"}
+    headers.update({k.lower(): v for k, v in (extra or {}).items()})
+    return [(k.encode(), v.encode()) for k, v in headers.items()]
+
+
+async def call_asgi(app, method: str, path: str, body: bytes = b"", headers: dict | None = None, on_message=None) -> dict:
+    # One request straight into the ASGI app, as a serverless adapter would send it;
+    # no server, no sockets, no lifespan. `on_message` sees every sent message as it
+    # happens (for timing streamed bodies).
+    messages = []
+    finished = asyncio.Event()
+    pending = [{"type": "http.request", "body": body, "more_body": False}]
+
+    async def receive():
+        # The body once, then block until the response is over: streaming responses
+        # listen for a disconnect for as long as they run.
+        if pending:
+            return pending.pop()
+        await finished.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body", False):
+            finished.set()
+        if on_message is not None:
+            on_message(message)
+
+    route, _, query = path.partition("?")
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": route,
+        "raw_path": route.encode(),
+        "root_path": "",
+        "query_string": query.encode(),
+        "headers": _headers(headers),
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    start = next(m for m in messages if m["type"] == "http.response.start")
+    return {
+        "status": start["status"],
+        "headers": {k.decode(): v.decode() for k, v in start.get("headers", [])},
+        "body": b"".join(m.get("body", b"") for m in messages if m["type"] == "http.response.body"),
+    }
@@ -0,0 +1,69 @@
+"""Cohort phenotype assignment: one get_phenotype call per patient versus the
+array path over interned allele ids.
+
+"genes" scores random haplotype pairs per gene (call_phenotypes). "cohort" is a
+CohortGenotypes with CYP2D6 *4/*10/*41 records: per-sample diplotype strings fed
+to get_phenotype versus CohortGenotypes.phenotypes.
+
+    python -m benchmarks.bench_activity_score --samples 100000
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+
+from app.services.activity_score import ALLELE_FUNCTIONS, call_phenotypes
+from app.services.cohort import CohortGenotypes
+from app.services.phenotype_engine import get_phenotype
+
+
+def best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    report = {"samples": args.samples, "genes": {}}
+    for gene, functions in ALLELE_FUNCTIONS.items():
+        alleles = [*functions, "*1xN"]
+        left = np.array([rng.choice(alleles) for _ in range(args.samples)], dtype=object)
+        right = np.array([rng.choice(alleles) for _ in range(args.samples)], dtype=object)
+        diplotypes = (left + "/" + right).tolist()
+
+        scalar = best_of(lambda: [get_phenotype(gene, d) for d in diplotypes], args.repeat)
+        vectorized = best_of(lambda: call_phenotypes(gene, left, right), args.repeat)
+        assert call_phenotypes(gene, left, right).tolist() == [get_phenotype(gene, d) for d in diplotypes]
+        report["genes"][gene] = {
+            "per_patient_ns": round(scalar * 1e9 / args.samples, 1),
+            "array_ns": round(vectorized * 1e9 / args.samples, 1),
+            "speedup": round(scalar / vectorized, 1),
+        }
+
+    stars = ["*4", "*10", "*41"]
+    counts = np.array([[rng.choice((0, 0, 0, 1, 2)) for _ in range(args.samples)] for _ in stars], dtype=np.int8)
+    cohort = CohortGenotypes([f"S{i}" for i in range(args.samples)], ["CYP2D6"] * len(stars), stars,
+                             {"CYP2D6": "rs3892097"}, counts)
+    per_sample = best_of(lambda: [get_phenotype("CYP2D6", d) for d in cohort.diplotypes("CYP2D6").tolist()], args.repeat)
+    array = best_of(lambda: cohort.phenotypes("CYP2D6"), args.repeat)
+    assert cohort.phenotypes("CYP2D6").tolist() == [get_phenotype("CYP2D6", d) for d in cohort.diplotypes("CYP2D6").tolist()]
+    report["cohort"] = {
+        "per_patient_ms": round(per_sample * 1e3, 2),
+        "array_ms": round(array * 1e3, 2),
+        "speedup": round(per_sample / array, 1),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Allele definition lookups at table sizes well past the built-in one, and what
+position-based calling costs an untagged VCF parse.
+
+    python -m benchmarks.bench_allele_definitions [--variants 20000] [--records 200000]
+
+"index" is AlleleDefinitions (sorted chrom << 32 | pos array, bisect) against a
+linear scan of the same definitions and a dict keyed by (chrom, pos, ref, alt),
+for hits and for misses inside the pharmacogene intervals. "parse" runs a
+synthetic VCF with its STAR tags stripped, so every PGx record goes through the
+definitions, against the same file tagged.
+"""
+import argparse
+import json
+import random
+import re
+import sys
+import time
+import timeit
+
+from app.services.allele_definitions import ALLELE_DEFINITIONS, AlleleDefinitions
+from app.services.gene_regions import PGX_LOCI
+from app.services.parser import parse_vcf_text
+from benchmarks.synthetic import iter_synthetic_lines
+
+
+def synthetic_definitions(n: int, seed: int = 0) -> list:
+    # The built-in alleles plus single- and multi-variant alleles spread over the
+    # GRCh38 pharmacogene loci.
+    rng = random.Random(seed)
+    loci = list(PGX_LOCI["GRCh38"].items())
+    definitions = list(ALLELE_DEFINITIONS)
+    total = sum(len(variants) for _, _, variants in definitions)
+    number = 100
+    while total < n:
+        gene, (chrom, start, end) = rng.choice(loci)
+        size = rng.choice((1, 1, 1, 2, 3))
+        variants = []
+        for _ in range(size):
+            ref, alt = rng.sample("ACGT", 2)
+            variants.append((f"rs{rng.randrange(10**9)}", chrom, rng.randint(start, end), ref, alt))
+        definitions.append((gene, f"*{number}", variants))
+        number += 1
+        total += size
+    return definitions
+
+def per_call_ns(fn, queries, rounds: int) -> float:
+    loop = lambda: [fn(*q) for q in queries]
+    return min(timeit.repeat(loop, number=max(1, rounds // len(queries)), repeat=3)) / (max(1, rounds // len(queries)) * len(queries)) * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", type=int, default=20000)
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    definitions = synthetic_definitions(args.variants)
+    start = time.perf_counter()
+    index = AlleleDefinitions(definitions)
+    build_ms = (time.perf_counter() - start) * 1e3
+
+    rng = random.Random(1)
+    hits = [(chrom, pos, ref, [alt]) for _, _, chrom, pos, ref, alt in rng.sample(index.variants, 500)]
+    misses = []
+    for _ in range(500):
+        _, (chrom, start_pos, end) = rng.choice(list(PGX_LOCI["GRCh38"].items()))
+        misses.append((chrom, rng.randint(start_pos, end), "A", ["C"]))
+    as_dict = {}
+    for vid, (_, _, chrom, pos, ref, alt) in enumerate(index.variants):
+        as_dict.setdefault((chrom, pos, ref, alt), []).append(vid)
+
+    def linear(chrom, pos, ref, alts):
+        return [vid for vid, v in enumerate(index.variants) if v[2] == chrom and v[3] == int(pos) and v[4] == ref and v[5] in alts]
+
+    def keyed(chrom, pos, ref, alts):
+        return [vid for alt in alts for vid in as_dict.get((chrom, int(pos), ref, alt), ())]
+
+    for query in hits[:50] + misses[:50]:
+        assert sorted(vid for _, vid in index.lookup(*query)) == sorted(linear(*query)) == sorted(keyed(*query))
+
+    index_bytes = index._keys.itemsize * len(index._keys) + index._ids.itemsize * len(index._ids)
+    dict_bytes = sys.getsizeof(as_dict) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in as_dict.items())
+    report = {
+        "variants": len(index),
+        "alleles": sum(len(a) for a in index.alleles.values()),
+        "build_ms": round(build_ms, 1),
+        "index_kb": round(index_bytes / 1024, 1),
+        "tuple_dict_kb": round(dict_bytes / 1024, 1),
+        "lookup_hit_ns": round(per_call_ns(index.lookup, hits, args.rounds)),
+        "lookup_miss_ns": round(per_call_ns(index.lookup, misses, args.rounds)),
+        "dict_hit_ns": round(per_call_ns(keyed, hits, args.rounds)),
+        "linear_hit_ns": round(per_call_ns(linear, hits[:20], 200)),
+    }
+
+    tagged = "".join(iter_synthetic_lines(records=args.records, pgx_fraction=0.01))
+    untagged = re.sub(r";STAR=[^;\t]*", "", tagged)
+    timings = {}
+    for name, text in (("tagged", tagged), ("untagged", untagged)):
+        timings[name] = min(timeit.repeat(lambda: parse_vcf_text(text), number=1, repeat=3))
+    report["parse"] = {
+        "records": args.records,
+        "tagged_ms": round(timings["tagged"] * 1e3, 1),
+        "untagged_ms": round(timings["untagged"] * 1e3, 1),
+        "untagged_calls": {v["gene"]: v["diplotype"] for v in parse_vcf_text(untagged)},
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
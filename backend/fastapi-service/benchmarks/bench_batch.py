@@ -0,0 +1,74 @@
+"""Batch throughput versus process-pool size (deterministic stage only, no LLM).
+
+    python -m benchmarks.bench_batch --patients 2000 --vcf-kb 100
+"""
+import argparse
+import json
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.services.batch import available_cpus, evaluate_batch, evaluate_payload
+from benchmarks.synthetic import iter_synthetic_lines
+
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+
+
+def make_payloads(patients: int, vcf_bytes: int) -> list:
+    return [
+        {
+            "patient_id": f"PATIENT_{i:06d}",
+            "drugs": DRUGS,
+            "vcf_content": "".join(iter_synthetic_lines(vcf_bytes, pgx_fraction=0.01, seed=i)),
+        }
+        for i in range(patients)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--vcf-kb", type=int, default=100, help="synthetic VCF size per patient")
+    parser.add_argument("--workers", default=None, help="comma-separated pool sizes (default: 1,2,4,... up to cores)")
+    args = parser.parse_args()
+
+    cpus = available_cpus()
+    if args.workers:
+        sizes = [int(w) for w in args.workers.split(",")]
+    else:
+        sizes, n = [], 1
+        while n < cpus:
+            sizes.append(n)
+            n *= 2
+        sizes.append(cpus)
+
+    payloads = make_payloads(args.patients, args.vcf_kb * 1024)
+
+    sample = payloads[: max(1, args.patients // 10)]
+    start = time.perf_counter()
+    for payload in sample:
+        evaluate_payload(payload)
+    inline_rate = len(sample) / (time.perf_counter() - start)
+
+    baseline = None
+    for workers in sizes:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            evaluate_batch(payloads[:workers], executor=executor)  # start workers before timing
+            start = time.perf_counter()
+            items = evaluate_batch(payloads, executor=executor)
+            elapsed = time.perf_counter() - start
+        rate = len(payloads) / elapsed
+        baseline = baseline or rate
+        print(json.dumps({
+            "workers": workers,
+            "patients": len(payloads),
+            "failed": sum(1 for item in items if not item["ok"]),
+            "seconds": round(elapsed, 3),
+            "patients_per_s": round(rate, 1),
+            "speedup": round(rate / baseline, 2),
+            "inline_patients_per_s": round(inline_rate, 1),
+            "available_cpus": cpus,
+        }))
+
+
+if __name__ == "__main__":
+    main()
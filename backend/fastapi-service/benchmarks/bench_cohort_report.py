@@ -0,0 +1,111 @@
+"""Cohort report: collecting one response per patient and tallying afterwards
+versus the counter-array report over the genotype matrix.
+
+"per_patient" runs assess_drugs for every sample and keeps the results, as a
+client of /analyze/batch would before aggregating. "report" is CohortReport.add_cohort.
+"merge" sums partial reports, as the parent does for worker chunks.
+
+    python -m benchmarks.bench_cohort_report --samples 100000
+"""
+import argparse
+import json
+import random
+import time
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+
+from app.services.cohort import CohortGenotypes
+from app.services.cohort_report import CohortReport
+from app.services.pipeline import assess_drugs
+
+DRUGS = ["codeine", "clopidogrel", "warfarin", "simvastatin", "azathioprine", "fluorouracil"]
+RECORDS = [
+    ("CYP2C19", "*2", "rs4244285"), ("CYP2C19", "*17", "rs12248560"),
+    ("CYP2D6", "*4", "rs3892097"), ("CYP2D6", "*10", "rs1065852"), ("CYP2D6", "*41", "rs28371725"),
+    ("CYP2C9", "*2", "rs1799853"), ("CYP2C9", "*3", "rs1057910"),
+    ("SLCO1B1", "*5", "rs4149056"), ("TPMT", "*3A", "rs1142345"), ("DPYD", "*2A", "rs3918290"),
+]
+
+
+def synthetic_cohort(samples: int, seed: int = 0) -> CohortGenotypes:
+    rng = np.random.default_rng(seed)
+    counts = rng.choice([0, 0, 0, 0, 1, 1, 2], size=(len(RECORDS), samples)).astype(np.int8)
+    gene_rsids = {}
+    for gene, _, rsid in RECORDS:
+        gene_rsids.setdefault(gene, rsid)
+    return CohortGenotypes(
+        [f"S{i}" for i in range(samples)],
+        [gene for gene, _, _ in RECORDS],
+        [star for _, star, _ in RECORDS],
+        gene_rsids,
+        counts,
+    )
+
+def measure(fn) -> tuple:
+    # Timed untraced; peak memory comes from a second, traced run.
+    start = time.perf_counter()
+    value = fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return value, elapsed, peak
+
+def per_patient(cohort: CohortGenotypes) -> dict:
+    responses = [assess_drugs(DRUGS, variants)[0] for variants in cohort.sample_variants()]
+    risks = Counter()
+    for results in responses:
+        for result in results:
+            risks[(result["drug"], result["risk_assessment"]["risk_label"])] += 1
+    return risks
+
+def vectorized(cohort: CohortGenotypes) -> CohortReport:
+    report = CohortReport(DRUGS)
+    report.add_cohort(cohort)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", type=int, default=100000)
+    parser.add_argument("--parts", type=int, default=1000, help="partial reports to merge")
+    args = parser.parse_args()
+
+    cohort = synthetic_cohort(args.samples)
+    risks, scalar_s, scalar_peak = measure(lambda: per_patient(cohort))
+    report, array_s, array_peak = measure(lambda: vectorized(cohort))
+    data = report.to_dict()
+    for (drug, risk), count in risks.items():
+        assert data["drugs"][drug]["risk_labels"][risk] == count, (drug, risk)
+
+    rng = random.Random(0)
+    parts = []
+    for _ in range(args.parts):
+        part = CohortReport(DRUGS)
+        part.risk_counts += np.array([[rng.randrange(100) for _ in range(part.risk_counts.shape[1])] for _ in DRUGS])
+        parts.append(part)
+    start = time.perf_counter()
+    merged = CohortReport(DRUGS)
+    for part in parts:
+        merged.merge(part)
+    merge_s = time.perf_counter() - start
+    start = time.perf_counter()
+    CohortReport.from_dict(json.loads(json.dumps(data)))
+    roundtrip_s = time.perf_counter() - start
+
+    print(json.dumps({
+        "samples": args.samples,
+        "drugs": len(DRUGS),
+        "per_patient": {"ms": round(scalar_s * 1e3, 1), "peak_mb": round(scalar_peak / 1e6, 1)},
+        "report": {"ms": round(array_s * 1e3, 1), "peak_mb": round(array_peak / 1e6, 1)},
+        "speedup": round(scalar_s / array_s, 1),
+        "merge_us_per_part": round(merge_s * 1e6 / args.parts, 2),
+        "json_roundtrip_ms": round(roundtrip_s * 1e3, 2),
+        "actionable_patients": data["actionable_patients"],
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Cold start of the serverless entry point: import profile and time to first response.
+
+    python -m benchmarks.bench_cold_start --runs 5 [--top 15]
+
+Every run is a fresh interpreter that imports api/index.py and sends one deterministic
+POST /analyze (explicit variants, no GROQ_API_KEY, default drug map) straight through
+ASGI, the way a serverless adapter does, without running lifespan. The import
+breakdown comes from `python -X importtime` in a separate process.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.asgi import call_asgi
+
+HEAVY = ("groq", "httpx", "dotenv", "pandas", "numpy", "multiprocessing")
+PAYLOAD = {
+    "patient_id": "COLD_START",
+    "drugs": ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"],
+    "variants": [
+        {"gene": "CYP2D6", "diplotype": "*4/*4", "rsid": "rs3892097"},
+        {"gene": "CYP2C19", "diplotype": "*1/*2", "rsid": "rs4244285"},
+    ],
+}
+
+
+def run_child():
+    start = time.perf_counter()
+    sys.path.insert(0, os.path.join(os.getcwd(), "api"))
+    from index import app
+
+    imported = time.perf_counter()
+    response = asyncio.run(call_asgi(app, "POST", "/analyze", json.dumps(PAYLOAD).encode()))
+    done = time.perf_counter()
+    assert response["status"] == 200, response
+    print(json.dumps({
+        "import_ms": round((imported - start) * 1e3, 1),
+        "first_request_ms": round((done - imported) * 1e3, 1),
+        "heavy_modules_loaded": [m for m in HEAVY if m in sys.modules],
+    }))
+
+def import_profile(env: dict, top: int) -> list:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import sys; sys.path.insert(0, 'api'); import index"],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        # Top-level imports, their direct children (fastapi, ...) and this service's
+        # own modules; deeper rows are already inside those cumulative times.
+        if depth <= 2 or name.strip().startswith("app."):
+            rows.append({"module": name.strip(), "cumulative_ms": round(int(cumulative) / 1e3, 1)})
+    return sorted(rows, key=lambda r: -r["cumulative_ms"])[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="import profile rows to show")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+        return
+
+    env = dict(os.environ, GROQ_API_KEY="", ENABLE_EXTENDED_DRUG_MAP="false")
+    runs = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_cold_start", "--child"],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(out.stdout)
+        result["process_ms"] = round((time.perf_counter() - start) * 1e3, 1)
+        runs.append(result)
+
+    summary = {
+        key: statistics.median(r[key] for r in runs)
+        for key in ("import_ms", "first_request_ms", "process_ms")
+    }
+    summary["time_to_first_response_ms"] = round(summary["import_ms"] + summary["first_request_ms"], 1)
+    summary["heavy_modules_loaded"] = runs[-1]["heavy_modules_loaded"]
+    summary["runs"] = args.runs
+    print(json.dumps(summary, indent=2))
+    print(json.dumps({"import_profile": import_profile(env, args.top)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
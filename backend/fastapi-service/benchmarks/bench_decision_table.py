@@ -0,0 +1,55 @@
+"""Per-drug evaluation cost: runtime rule resolution versus the precompiled table.
+
+    python -m benchmarks.bench_decision_table --rounds 200000
+"""
+import argparse
+import json
+import timeit
+
+from app.services.confidence import get_confidence_score
+from app.services.cpic_rules import get_cpic_recommendation
+from app.services.decision_table import compile_decision_table
+from app.services.drug_gene_map import get_drug_gene_map
+from app.services.phenotype_engine import PHENOTYPE_MAP, get_phenotype
+
+
+def uncompiled(gene: str, diplotype: str, drug: str):
+    phenotype = get_phenotype(gene, diplotype)
+    cpic = get_cpic_recommendation(gene, phenotype, drug)
+    return phenotype, cpic, get_confidence_score(cpic.get("evidence", "C"))
+
+def make_cases() -> list:
+    # Every (drug, diplotype) pair in both orderings, as the parser may emit either.
+    cases = []
+    for drug, gene in get_drug_gene_map().items():
+        for diplotype in PHENOTYPE_MAP.get(gene, {}):
+            left, right = diplotype.split("/")
+            cases += [(gene, diplotype, drug), (gene, f"{right}/{left}", drug)]
+    return cases
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=200000, help="drug evaluations per variant")
+    args = parser.parse_args()
+
+    cases = make_cases()
+    table = compile_decision_table()
+    compile_s = timeit.timeit(compile_decision_table, number=10) / 10
+    reps = max(1, args.rounds // len(cases))
+
+    def run(fn):
+        return timeit.timeit(lambda: [fn(*c) for c in cases], number=reps) / (reps * len(cases))
+
+    before = run(uncompiled)
+    after = run(table.lookup)
+    print(json.dumps({
+        "cases": len(cases),
+        "compile_ms": round(compile_s * 1e3, 3),
+        "uncompiled_ns_per_drug": round(before * 1e9, 1),
+        "table_ns_per_drug": round(after * 1e9, 1),
+        "speedup": round(before / after, 2),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
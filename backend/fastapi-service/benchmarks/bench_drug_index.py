@@ -0,0 +1,75 @@
+"""Drug name resolution over an extended-size map: exact names, brand/salt/spelling
+variants, /drugs prefix queries and misses (which now carry suggestions).
+
+    python -m benchmarks.bench_drug_index [--drugs 5000] [--rounds 20000]
+
+"legacy_*" is the previous get_primary_gene: lower/strip, the five-entry alias
+dict, an exact map lookup, and on a miss list(map.keys())[:10] for the error.
+"""
+import argparse
+import json
+import random
+import string
+import timeit
+
+from app.services.drug_gene_builder import REQUIRED_DRUG_MAP
+from app.services.drug_gene_map import DRUG_ALIASES
+from app.services.drug_index import DrugIndex
+
+LEGACY_ALIASES = dict(list(DRUG_ALIASES.items())[:5])
+
+
+def synthetic_map(n: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    mapping = dict(REQUIRED_DRUG_MAP)
+    genes = sorted(set(REQUIRED_DRUG_MAP.values()))
+    while len(mapping) < n:
+        name = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(6, 14)))
+        mapping[name] = rng.choice(genes)
+    return mapping
+
+def legacy(drug_gene_map, drug: str):
+    drug = drug.strip().lower()
+    drug = LEGACY_ALIASES.get(drug, drug)
+    gene = drug_gene_map.get(drug)
+    if not gene:
+        return f"Unsupported drug: {drug}. Available: {list(drug_gene_map.keys())[:10]}"
+    return gene
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--drugs", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=20000)
+    args = parser.parse_args()
+
+    drug_gene_map = synthetic_map(args.drugs)
+    build_s = timeit.timeit(lambda: DrugIndex(drug_gene_map, DRUG_ALIASES), number=3) / 3
+    index = DrugIndex(drug_gene_map, DRUG_ALIASES)
+
+    def per_call_us(fn, names, rounds=args.rounds):
+        reps = max(1, rounds // len(names))
+        return round(timeit.timeit(lambda: [fn(n) for n in names], number=reps) / (reps * len(names)) * 1e6, 2)
+
+    exact = ["warfarin", "clopidogrel", "codeine"]
+    variants = ["Warfarin Sodium", "PLAVIX", "5-FU", "clopidogrel hydrogen sulfate", "Coumadin"]
+    misses = ["warfarine", "clopidogrl", "aspirin"]
+    report = {
+        "drugs": len(drug_gene_map),
+        "index_keys": len(index),
+        "build_ms": round(build_s * 1e3, 2),
+        "us_per_lookup": {
+            "legacy_exact": per_call_us(lambda n: legacy(drug_gene_map, n), exact),
+            "index_exact": per_call_us(index.resolve, exact),
+            "index_variant": per_call_us(index.resolve, variants),
+            "legacy_variant_resolved": sum(legacy(drug_gene_map, n) in drug_gene_map.values() for n in variants),
+            "index_variant_resolved": sum(index.resolve(n) is not None for n in variants),
+            "prefix_query": per_call_us(lambda p: index.prefix(p), ["cl", "war", "5-f", "a"], args.rounds // 10),
+            "legacy_miss": per_call_us(lambda n: legacy(drug_gene_map, n), misses, args.rounds // 10),
+            "index_miss_with_suggestions": per_call_us(lambda n: (index.resolve(n), index.suggest(n)), misses, args.rounds // 100),
+        },
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
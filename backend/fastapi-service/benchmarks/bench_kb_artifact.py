@@ -0,0 +1,119 @@
+"""Extended drug-gene map startup: pandas TSV path versus the mmapped artifact.
+
+    python -m benchmarks.bench_kb_artifact --rows 200000 --workers 4
+
+Each mode starts --workers fresh interpreters at once (like uvicorn workers) that
+build the map and do a few thousand lookups, then report startup time, RSS and
+private (unshared) memory from /proc/self/smaps_rollup.
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.services.clinpgx_loader import TARGET_GENES
+from app.services.drug_gene_builder import VALID_RELATIONS
+
+RELATIONS = sorted(VALID_RELATIONS) + ["ambiguous"]
+
+
+def write_relationships(path: str, rows: int, seed: int = 7):
+    rng = random.Random(seed)
+    # Roughly half the rows name one of the six target genes, the rest are filtered out.
+    genes = sorted(TARGET_GENES) * 34 + [f"GENE{i}" for i in range(200)]
+    drugs = [f"drug{i:06d}" for i in range(rows // 3 or 1)]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("Entity1_id\tEntity1_name\tEntity1_type\tEntity2_id\tEntity2_name\tEntity2_type\tEvidence\tAssociation\tPK\tPD\tPMIDs\n")
+        for i in range(rows):
+            f.write(
+                f"PA{i}\t{rng.choice(genes)}\tGene\tPA{i + rows}\t{rng.choice(drugs)}\tChemical\t"
+                f"VariantAnnotation\t{rng.choice(RELATIONS)}\tPK\t\t{rng.randrange(10**7)}\n"
+            )
+
+def memory_kb() -> dict:
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[1].isdigit():
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return {
+        "rss_mb": round(fields.get("Rss", 0) / 1024, 1),
+        "private_mb": round((fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)) / 1024, 1),
+    }
+
+def run_child():
+    start = time.perf_counter()
+    from app.services.drug_gene_builder import build_drug_gene_map
+
+    mapping = build_drug_gene_map()
+    startup = time.perf_counter() - start
+
+    drugs = [f"drug{i:06d}" for i in range(0, 5000)]
+    lookup_start = time.perf_counter()
+    found = sum(1 for d in drugs if mapping.get(d))
+    lookup = (time.perf_counter() - lookup_start) / len(drugs)
+    print(json.dumps({
+        "startup_s": round(startup, 4),
+        "lookup_us": round(lookup * 1e6, 2),
+        "found": found,
+        "pandas_loaded": "pandas" in sys.modules,
+        **memory_kb(),
+    }))
+    sys.stdout.flush()
+    # Stay alive until the parent has started every worker, so memory is measured
+    # while all of them map the artifact at once.
+    sys.stdin.read()
+
+def run_mode(env: dict, workers: int) -> list:
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.bench_kb_artifact", "--child"],
+            env=env, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True,
+        )
+        for _ in range(workers)
+    ]
+    results = [json.loads(p.stdout.readline()) for p in procs]
+    for p in procs:
+        p.communicate("")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child()
+        return
+
+    from app.services.kb_artifact import build_artifact
+
+    with tempfile.TemporaryDirectory() as workdir:
+        tsv = os.path.join(workdir, "relationships.tsv")
+        artifact = os.path.join(workdir, "relationships.pgkb")
+        write_relationships(tsv, args.rows)
+        start = time.perf_counter()
+        built = build_artifact(tsv, artifact)
+        built["build_s"] = round(time.perf_counter() - start, 3)
+        print(json.dumps({"tsv_bytes": os.path.getsize(tsv), "artifact": built}))
+
+        base = dict(os.environ, ENABLE_EXTENDED_DRUG_MAP="true", RELATIONSHIPS_PATH=tsv)
+        for mode, env in (("pandas", dict(base, KB_ARTIFACT_PATH="")), ("artifact", dict(base, KB_ARTIFACT_PATH=artifact))):
+            results = run_mode(env, args.workers)
+            summary = {
+                key: round(sum(r[key] for r in results) / len(results), 4)
+                for key in ("startup_s", "lookup_us", "rss_mb", "private_mb")
+            }
+            summary.update({"mode": mode, "workers": args.workers, "pandas_loaded": results[0]["pandas_loaded"]})
+            print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""LLM explanation modes against the mock Groq server: one completion per drug
+versus batched JSON prompts (per patient, or per micro-batch of concurrent
+patients).
+
+    python -m benchmarks.bench_llm_batching [--patients 24] [--concurrency 8] [--delay 0.1]
+
+Each patient gets a random genotype over the six required genes and all six drugs;
+patients are analyzed from `concurrency` threads at once, like concurrent requests.
+Reports completions sent, prompt characters (a token proxy), explanations that fell
+back to the template and wall time.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from benchmarks.mock_llm import MockLLMServer
+
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+
+
+def make_profiles(patients: int, seed: int = 0) -> list:
+    from app.services.phenotype_engine import PHENOTYPE_MAP
+
+    rng = random.Random(seed)
+    return [
+        [{"gene": gene, "diplotype": rng.choice(list(diplotypes)), "rsid": None} for gene, diplotypes in PHENOTYPE_MAP.items()]
+        for _ in range(patients)
+    ]
+
+def run_mode(mode: str, profiles: list, concurrency: int, delay: float, window_ms: float) -> dict:
+    from app.services import llm_service
+    from app.services.pipeline import analyze_variants, is_fallback
+
+    server = MockLLMServer(delay=delay).start()
+    env = {
+        "GROQ_API_KEY": "bench-key",
+        "GROQ_BASE_URL": server.base_url,
+        "EXPLANATION_CACHE_ENABLED": "false",
+        "RESULT_CACHE_ENABLED": "false",
+    }
+    try:
+        with patch.dict(os.environ, env), \
+                patch.object(llm_service, "LLM_EXPLANATION_MODE", mode), \
+                patch.object(llm_service, "LLM_BATCH_WINDOW_MS", window_ms), \
+                patch.object(llm_service, "_batcher", None):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as pool:
+                responses = list(pool.map(lambda p: analyze_variants(f"P{p[0]}", DRUGS, p[1]), enumerate(profiles)))
+            elapsed = time.perf_counter() - start
+    finally:
+        server.stop()
+
+    results = [r for response in responses for r in response["results"]]
+    return {
+        "explanations": len(results),
+        "completions": server.requests,
+        "prompt_chars": sum(len(p) for p in server.prompts),
+        "fallbacks": sum(is_fallback(r, r["llm_generated_explanation"]) for r in results),
+        "wall_s": round(elapsed, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--patients", type=int, default=24)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=0.1, help="mock seconds per completion")
+    parser.add_argument("--window-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    profiles = make_profiles(args.patients)
+    report = {"patients": args.patients, "concurrency": args.concurrency, "delay_s": args.delay}
+    for mode in ("per_drug", "batched"):
+        report[mode] = run_mode(mode, profiles, args.concurrency, args.delay, args.window_ms)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Cost of the stage timers and counters, with metrics enabled and disabled.
+
+    python -m benchmarks.bench_metrics [--requests 20000]
+
+"instrumentation" replays exactly the metric calls one six-drug /analyze makes
+(stage timers, per-drug clock reads, counters) with no work in between, so the
+number is the per-request overhead itself. "run_analysis" is the real pipeline
+(stubbed LLM, result cache off) for scale.
+"""
+import argparse
+import json
+import os
+import time
+from time import perf_counter
+from unittest.mock import patch
+
+from app.services import metrics
+
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+
+
+def instrumented_request():
+    with metrics.stage("parse"):
+        pass
+    metrics.record_vcf(7, 1)
+    timings = {"resolve": 0.0, "rules": 0.0} if metrics.ENABLED else None
+    for _ in DRUGS:
+        if timings is not None:
+            start = perf_counter()
+            resolved = perf_counter()
+            timings["resolve"] += resolved - start
+            timings["rules"] += perf_counter() - resolved
+    if timings is not None:
+        for name, seconds in timings.items():
+            metrics.observe_stage(name, seconds)
+        metrics.GENE_FALLBACKS.inc(0)
+    with metrics.stage("llm"):
+        pass
+
+def per_call_us(fn, n: int) -> float:
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    os.environ["RESULT_CACHE_ENABLED"] = "false"
+    from app.schemas.request import AnalysisRequest
+    from app.services.pipeline import run_analysis
+
+    async def stub(*_):
+        return {"summary": "s", "mechanism": "m"}
+
+    request = AnalysisRequest(
+        patient_id="BENCH",
+        drugs=DRUGS,
+        variants=[{"gene": "CYP2D6", "diplotype": "*4/*4", "rsid": "rs3892097"}],
+    )
+    report = {}
+    with patch("app.services.pipeline.generate_explanation", side_effect=stub):
+        for enabled in (False, True):
+            with patch.object(metrics, "ENABLED", enabled):
+                label = "enabled" if enabled else "disabled"
+                report[f"instrumentation_us_{label}"] = round(per_call_us(instrumented_request, args.requests), 3)
+                report[f"run_analysis_us_{label}"] = round(per_call_us(lambda: run_analysis(request), max(1, args.requests // 20)), 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
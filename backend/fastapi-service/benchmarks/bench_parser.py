@@ -0,0 +1,194 @@
+"""Parser and pipeline benchmark suite with machine-readable output.
+
+    python -m benchmarks.bench_parser --records 100000 --samples 1,10 --info-fields 0,16 \\
+        [--phased] [--gzip] [--pgx-fraction 0.001] [--output bench.json] [--compare old.json]
+
+For every (samples, info_fields) combination it measures:
+  parse_variants   records/s and MB/s over in-memory VCF text
+  parse_vcf_stream records/s and MB/s over the file bytes (gzip when --gzip)
+  run_analysis     latency with generate_explanation stubbed out
+  /analyze         end-to-end latency through the ASGI app (stubbed LLM)
+The result cache is disabled so every iteration does the work. The JSON records
+the git commit so runs can be compared across commits with --compare. Set
+VCF_POSITION_PREFILTER=false to measure the parser without the position prefilter.
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+from app.services.parser import position_prefilter_enabled
+from benchmarks.asgi import call_asgi
+from benchmarks.synthetic import iter_synthetic_lines
+
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+STUB_EXPLANATION = {"summary": "Benchmark summary.", "mechanism": "Benchmark mechanism."}
+
+
+async def stub_explanation(gene, phenotype, drug, risk):
+    return dict(STUB_EXPLANATION)
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def latency_stats(samples: list) -> dict:
+    ordered = sorted(samples)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1e3, 3),
+        "p50_ms": round(pick(0.50) * 1e3, 3),
+        "p95_ms": round(pick(0.95) * 1e3, 3),
+        "max_ms": round(ordered[-1] * 1e3, 3),
+    }
+
+def throughput(seconds: float, records: int, size: int) -> dict:
+    return {
+        "seconds": round(seconds, 4),
+        "records_per_s": round(records / seconds),
+        "mb_per_s": round(size / (1 << 20) / seconds, 2),
+    }
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def run_case(args, samples: int, info_fields: int) -> dict:
+    from app.main import app
+    from app.schemas.request import AnalysisRequest
+    from app.services.parser import parse_variants
+    from app.services.pipeline import run_analysis
+    from app.services.vcf_stream import parse_vcf_stream
+
+    text = "".join(iter_synthetic_lines(
+        records=args.records, samples=samples, info_fields=info_fields,
+        phased=args.phased, pgx_fraction=args.pgx_fraction, seed=args.seed,
+    ))
+    raw = text.encode("utf-8")
+    payload = gzip.compress(raw, compresslevel=6) if args.gzip else raw
+    request = AnalysisRequest(patient_id="BENCH", drugs=DRUGS, vcf_content=text)
+    chunk = 1 << 16
+
+    case = {
+        "samples": samples,
+        "info_fields": info_fields,
+        "records": args.records,
+        "phased": args.phased,
+        "gzip": args.gzip,
+        "vcf_bytes": len(raw),
+        "payload_bytes": len(payload),
+    }
+    case["parse_variants"] = throughput(best_of(args.repeat, lambda: parse_variants(request)), args.records, len(raw))
+    case["parse_vcf_stream"] = throughput(
+        best_of(args.repeat, lambda: parse_vcf_stream(payload[i:i + chunk] for i in range(0, len(payload), chunk))),
+        args.records, len(raw),
+    )
+
+    with patch("app.services.pipeline.generate_explanation", side_effect=stub_explanation):
+        timings = []
+        for _ in range(args.iterations):
+            start = time.perf_counter()
+            run_analysis(request)
+            timings.append(time.perf_counter() - start)
+        case["run_analysis"] = latency_stats(timings)
+
+        body = json.dumps({"patient_id": "BENCH", "drugs": DRUGS, "vcf_content": text}).encode()
+
+        async def end_to_end():
+            timings = []
+            for _ in range(args.iterations):
+                start = time.perf_counter()
+                response = await call_asgi(app, "POST", "/analyze", body)
+                timings.append(time.perf_counter() - start)
+                assert response["status"] == 200, response["body"][:200]
+            return timings
+
+        case["analyze_asgi"] = latency_stats(asyncio.run(end_to_end()))
+    return case
+
+def compare(current: dict, baseline: dict) -> list:
+    # Ratio current/baseline per case and metric: >1 is slower for latencies,
+    # faster for throughput.
+    key = lambda c: (c["samples"], c["info_fields"], c["records"], c["phased"], c["gzip"])
+    old = {key(c): c for c in baseline["cases"]}
+    rows = []
+    for case in current["cases"]:
+        before = old.get(key(case))
+        if before is None:
+            continue
+        rows.append({
+            "samples": case["samples"],
+            "info_fields": case["info_fields"],
+            "parse_variants_records_per_s": round(case["parse_variants"]["records_per_s"] / before["parse_variants"]["records_per_s"], 3),
+            "parse_vcf_stream_records_per_s": round(case["parse_vcf_stream"]["records_per_s"] / before["parse_vcf_stream"]["records_per_s"], 3),
+            "run_analysis_p50": round(case["run_analysis"]["p50_ms"] / before["run_analysis"]["p50_ms"], 3),
+            "analyze_asgi_p50": round(case["analyze_asgi"]["p50_ms"] / before["analyze_asgi"]["p50_ms"], 3),
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=100000)
+    parser.add_argument("--samples", default="1", help="comma-separated sample counts")
+    parser.add_argument("--info-fields", default="0", help="comma-separated extra INFO key counts")
+    parser.add_argument("--pgx-fraction", type=float, default=0.001)
+    parser.add_argument("--phased", action="store_true")
+    parser.add_argument("--gzip", action="store_true", help="gzip the bytes fed to parse_vcf_stream")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="throughput runs (best is kept)")
+    parser.add_argument("--iterations", type=int, default=10, help="latency samples per case")
+    parser.add_argument("--output", default=None, help="write the JSON report here")
+    parser.add_argument("--compare", default=None, help="baseline JSON report to compare against")
+    args = parser.parse_args()
+
+    os.environ["RESULT_CACHE_ENABLED"] = "false"
+    os.environ["EXPLANATION_CACHE_ENABLED"] = "false"
+
+    report = {
+        "benchmark": "parser",
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "config": {
+            **{k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "position_prefilter": position_prefilter_enabled(),
+        },
+        "cases": [],
+    }
+    for samples in (int(s) for s in args.samples.split(",")):
+        for info_fields in (int(f) for f in args.info_fields.split(",")):
+            case = run_case(args, samples, info_fields)
+            report["cases"].append(case)
+            print(json.dumps(case), file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        report["comparison"] = {"baseline_commit": baseline.get("commit"), "ratios": compare(report, baseline)}
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Response serialization cost per 1,000 drug results: FastAPI's validated path
+versus the FAST_RESPONSES path (orjson / msgpack, optional gzip or brotli).
+
+    python -m benchmarks.bench_serialization [--results 1000] [--repeat 20]
+
+The payload is a /analyze/batch response of six-drug analyses. "fastapi" is what
+FastAPI does with a returned dict and response_model: validate it into the model,
+dump it back in JSON mode and encode it with json.dumps. The other rows are
+app.services.serialization. "batch_endpoint" is /analyze/batch end to end through
+ASGI (stubbed LLM) with FAST_RESPONSES off and on.
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from unittest.mock import patch
+
+from pydantic import TypeAdapter
+
+from benchmarks.asgi import call_asgi
+
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+
+
+async def stub_explanation(gene, phenotype, drug, risk):
+    return {"summary": f"{gene} {phenotype} summary for {drug}.", "mechanism": f"{risk} mechanism."}
+
+def batch_payloads(results: int) -> list:
+    return [
+        {
+            "patient_id": f"P{i:05d}",
+            "drugs": DRUGS,
+            "variants": [{"gene": "CYP2D6", "diplotype": "*4/*4", "rsid": "rs3892097"},
+                         {"gene": "CYP2C19", "diplotype": "*1/*2", "rsid": "rs4244285"}],
+        }
+        for i in range(max(1, results // len(DRUGS)))
+    ]
+
+def per_1000_ms(fn, results: int, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1e3 * 1000 / results, 3)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--results", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["RESULT_CACHE_ENABLED"] = "false"
+    from app.main import app
+    from app.schemas.response import BatchResponse
+    from app.services import serialization
+    from app.services.batch import run_batch
+
+    payloads = batch_payloads(args.results)
+    with patch("app.services.pipeline.generate_explanation", side_effect=stub_explanation):
+        response = run_batch(payloads)
+    results = sum(len(item["response"]["results"]) for item in response["results"])
+    adapter = TypeAdapter(BatchResponse)
+
+    def fastapi_path():
+        model = adapter.validate_python(response)
+        return json.dumps(adapter.dump_python(model, mode="json"), ensure_ascii=False, separators=(",", ":")).encode()
+
+    body = serialization.encode(response)
+    report = {
+        "results": results,
+        "orjson": serialization.orjson is not None,
+        "msgpack": serialization.msgpack is not None,
+        "brotli": serialization.brotli is not None,
+        "ms_per_1000_results": {
+            "fastapi": per_1000_ms(fastapi_path, results, args.repeat),
+            "fast_json": per_1000_ms(lambda: serialization.encode(response), results, args.repeat),
+            "fast_json_gzip": per_1000_ms(lambda: serialization.compress(serialization.encode(response), "gzip"), results, args.repeat),
+        },
+        "bytes_per_1000_results": {
+            "json": round(len(body) * 1000 / results),
+            "gzip": round(len(serialization.compress(body, "gzip")) * 1000 / results),
+        },
+    }
+    timings, sizes = report["ms_per_1000_results"], report["bytes_per_1000_results"]
+    if serialization.msgpack is not None:
+        packed = serialization.encode(response, serialization.MSGPACK_TYPES[0])
+        timings["fast_msgpack"] = per_1000_ms(lambda: serialization.encode(response, serialization.MSGPACK_TYPES[0]), results, args.repeat)
+        sizes["msgpack"] = round(len(packed) * 1000 / results)
+    if serialization.brotli is not None:
+        timings["fast_json_br"] = per_1000_ms(lambda: serialization.compress(serialization.encode(response), "br"), results, args.repeat)
+        sizes["br"] = round(len(serialization.compress(body, "br")) * 1000 / results)
+
+    request_body = json.dumps(payloads).encode()
+
+    async def endpoint_ms() -> float:
+        best = float("inf")
+        for _ in range(max(3, args.repeat // 4)):
+            start = time.perf_counter()
+            out = await call_asgi(app, "POST", "/analyze/batch", request_body)
+            best = min(best, time.perf_counter() - start)
+            assert out["status"] == 200, out["body"][:200]
+        return round(best * 1e3, 2)
+
+    report["batch_endpoint_ms"] = {}
+    with patch("app.services.pipeline.generate_explanation", side_effect=stub_explanation), \
+            patch("app.services.batch.BATCH_PROCESS_THRESHOLD", len(payloads) + 1):
+        for enabled in (False, True):
+            with patch.object(serialization, "ENABLED", enabled):
+                report["batch_endpoint_ms"]["fast" if enabled else "fastapi"] = asyncio.run(endpoint_ms())
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Time to first drug result: /analyze versus /analyze/stream against a slow mock LLM.
+
+    python -m benchmarks.bench_stream --delay 1.5 --runs 5
+
+Both endpoints get the same six-drug request through ASGI. The mock Groq server
+answers every explanation after --delay seconds; caches are disabled.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from benchmarks.asgi import call_asgi
+from benchmarks.mock_llm import MockLLMServer
+
+PAYLOAD = {
+    "patient_id": "STREAM_BENCH",
+    "drugs": ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"],
+    "variants": [
+        {"gene": "CYP2D6", "diplotype": "*4/*4", "rsid": "rs3892097"},
+        {"gene": "CYP2C19", "diplotype": "*1/*2", "rsid": "rs4244285"},
+    ],
+}
+
+
+async def measure(app, path: str) -> dict:
+    start = time.perf_counter()
+    first_result = None
+
+    def on_message(message):
+        nonlocal first_result
+        body = message.get("body", b"")
+        if first_result is None and message["type"] == "http.response.body" and (b'"result"' in body or path == "/analyze"):
+            first_result = time.perf_counter() - start
+
+    response = await call_asgi(app, "POST", path, json.dumps(PAYLOAD).encode(), on_message=on_message)
+    assert response["status"] == 200, response["body"][:200]
+    return {"first_result_ms": first_result * 1e3, "complete_ms": (time.perf_counter() - start) * 1e3}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--delay", type=float, default=1.5, help="mock LLM latency per call (s)")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    server = MockLLMServer(delay=args.delay).start()
+    os.environ.update({
+        "GROQ_API_KEY": "bench-key",
+        "GROQ_BASE_URL": server.base_url,
+        "RESULT_CACHE_ENABLED": "false",
+        "EXPLANATION_CACHE_ENABLED": "false",
+    })
+    from app.main import app
+
+    try:
+        report = {"delay_s": args.delay, "runs": args.runs}
+        for path in ("/analyze", "/analyze/stream"):
+            runs = [asyncio.run(measure(app, path)) for _ in range(args.runs)]
+            report[path] = {key: round(statistics.median(r[key] for r in runs), 1) for key in runs[0]}
+        print(json.dumps(report, indent=2))
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Peak RSS and throughput of the streaming VCF parser.
+
+    python -m benchmarks.bench_stream_upload --sizes 100M,1G,5G [--gzip]
+
+Each size is parsed in a fresh subprocess so ru_maxrss reflects that run alone.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.synthetic import write_synthetic_vcf
+
+UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().upper()
+    if value[-1] in UNITS:
+        return int(float(value[:-1]) * UNITS[value[-1]])
+    return int(value)
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes.
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024
+
+def run_child(path: str):
+    from app.services.vcf_stream import iter_file_chunks, parse_vcf_stream
+
+    size = os.path.getsize(path)
+    start = time.perf_counter()
+    with open(path, "rb") as handle:
+        variants = parse_vcf_stream(iter_file_chunks(handle))
+    elapsed = time.perf_counter() - start
+    print(json.dumps({
+        "file_bytes": size,
+        "seconds": round(elapsed, 3),
+        "mb_per_s": round(size / (1 << 20) / elapsed, 2),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "genes": len(variants),
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="100M,1G,5G")
+    parser.add_argument("--gzip", action="store_true", help="compress the synthetic input")
+    parser.add_argument("--workdir", default=None, help="where to write synthetic files (default: temp dir)")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child)
+        return
+
+    with tempfile.TemporaryDirectory(dir=args.workdir) as workdir:
+        for label in args.sizes.split(","):
+            target = parse_size(label)
+            path = os.path.join(workdir, f"synthetic_{label}.vcf" + (".gz" if args.gzip else ""))
+            write_synthetic_vcf(path, target, compress=args.gzip)
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_stream_upload", "--child", path],
+                check=True, capture_output=True, text=True,
+            )
+            result = json.loads(out.stdout)
+            result.update({
+                "size": label,
+                "gzip": args.gzip,
+                "uncompressed_mb_per_s": round(target / (1 << 20) / result["seconds"], 2),
+            })
+            print(json.dumps(result))
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
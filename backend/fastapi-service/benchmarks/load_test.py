@@ -0,0 +1,249 @@
+"""Open-loop load test of POST /analyze: latency percentiles, throughput and error
+rate per request rate and per uvicorn worker/thread configuration.
+
+    python -m benchmarks.load_test --rps 2,5,10,20 --duration 20
+    python -m benchmarks.load_test --workers 1,2 --threads 8,40 --llm-delay 0.8 --llm-error-rate 0.02
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --rps 5,10   # a service already running
+
+Without --url, every (workers, threads) configuration gets its own uvicorn with
+THREADPOOL_SIZE=threads, pointed at an in-process mock Groq server (see
+benchmarks/mock_llm.py for the latency/error options); nothing leaves the machine.
+Explanation and result caches are off unless turned on with --env, e.g.
+--env RESULT_CACHE_ENABLED=true.
+
+Requests go out on schedule (constant spacing, or Poisson arrivals) whether or not
+earlier ones have finished, and latency counts from the scheduled send time: a
+saturated server shows as growing latency and errors, not as a quietly lower rate.
+Payloads cycle through --payloads patients: the two test fixture VCFs, then
+synthetic VCFs of --records lines with random pharmacogene genotypes.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+from benchmarks.mock_llm import LATENCY_DISTRIBUTIONS, MockLLMServer
+from benchmarks.synthetic import iter_synthetic_lines
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+FIXTURES = ["TC_P1_PATIENT_001_Normal.vcf", "TC_P2_PATIENT_002_HighRisk.vcf"]
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+
+
+def make_payloads(count: int, records: int = 2000, drugs=DRUGS, seed: int = 0) -> list:
+    payloads = []
+    for i in range(count):
+        if i < len(FIXTURES):
+            vcf = (SERVICE_DIR / "tests" / FIXTURES[i]).read_text(encoding="utf-8")
+        else:
+            vcf = "".join(iter_synthetic_lines(records=records, pgx_fraction=0.01, seed=seed + i))
+        payloads.append({"patient_id": f"LOAD_{i:04d}", "drugs": list(drugs), "vcf_content": vcf})
+    return payloads
+
+def percentile(values, q: float) -> float:
+    # Nearest rank on the sorted values; q in [0, 100].
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+async def run_level(
+    client: httpx.AsyncClient,
+    payloads: list,
+    rps: float,
+    duration: float,
+    arrival: str = "constant",
+    timeout: float = 30.0,
+    max_in_flight: int = 0,
+    seed: int = 0,
+) -> dict:
+    # Sends for `duration` seconds at `rps`, then waits for the stragglers.
+    # Arrivals over max_in_flight (when set) are dropped and counted, not queued.
+    loop = asyncio.get_running_loop()
+    rng = random.Random(seed)
+    latencies, outcomes = [], Counter()
+    in_flight = peak = dropped = 0
+    tasks = []
+
+    async def send(payload: dict, scheduled: float):
+        nonlocal in_flight
+        try:
+            response = await client.post("/analyze", json=payload, timeout=timeout)
+            outcome = response.status_code
+        except httpx.TimeoutException:
+            outcome = "timeout"
+        except httpx.HTTPError as exc:
+            outcome = type(exc).__name__
+        finally:
+            in_flight -= 1
+        outcomes[outcome] += 1
+        if outcome == 200:
+            latencies.append(loop.time() - scheduled)
+
+    start = next_at = loop.time()
+    for i in itertools.count():
+        if arrival != "poisson":
+            next_at = start + i / rps
+        if next_at >= start + duration:
+            break
+        wait = next_at - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if max_in_flight and in_flight >= max_in_flight:
+            dropped += 1
+        else:
+            in_flight += 1
+            peak = max(peak, in_flight)
+            tasks.append(asyncio.create_task(send(payloads[i % len(payloads)], next_at)))
+        if arrival == "poisson":
+            next_at += rng.expovariate(rps)
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+
+    sent = len(tasks)
+    errors = sent - outcomes[200]
+    return {
+        "offered_rps": rps,
+        "sent": sent,
+        "ok": outcomes[200],
+        "errors": {str(k): v for k, v in sorted(outcomes.items(), key=str) if k != 200},
+        "error_rate": round(errors / sent, 4) if sent else 0.0,
+        "dropped": dropped,
+        "throughput_rps": round(outcomes[200] / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1e3, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1e3, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1e3, 1),
+        "max_ms": round(max(latencies, default=0.0) * 1e3, 1),
+        "peak_in_flight": peak,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_service(port: int, workers: int, threads: int, env: dict) -> subprocess.Popen:
+    command = [
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning",
+    ]
+    return subprocess.Popen(command, cwd=SERVICE_DIR, env={**os.environ, **env, "THREADPOOL_SIZE": str(threads)})
+
+async def wait_healthy(client: httpx.AsyncClient, process: subprocess.Popen | None, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"service exited with code {process.returncode}")
+        try:
+            if (await client.get("/health", timeout=2)).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    raise RuntimeError("service did not become healthy")
+
+async def run_configuration(base_url: str, payloads: list, args, process=None) -> list:
+    limits = httpx.Limits(max_connections=args.max_in_flight or 1000, max_keepalive_connections=100)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits) as client:
+        await wait_healthy(client, process)
+        for payload in payloads[:args.warmup]:
+            await client.post("/analyze", json=payload, timeout=args.timeout)
+        levels = []
+        for rps in args.rps:
+            levels.append(await run_level(
+                client, payloads, rps, args.duration, args.arrival, args.timeout, args.max_in_flight, args.seed,
+            ))
+            await asyncio.sleep(args.pause)
+        return levels
+
+
+def parse_list(kind):
+    return lambda value: [kind(v) for v in value.split(",") if v.strip()]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="load an already-running service instead of starting one")
+    parser.add_argument("--rps", type=parse_list(float), default=[2, 5, 10, 20], help="comma-separated request rates")
+    parser.add_argument("--duration", type=float, default=15, help="seconds of sending per rate")
+    parser.add_argument("--arrival", choices=["constant", "poisson"], default="poisson")
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--max-in-flight", type=int, default=0, help="drop arrivals beyond this many open requests (0 = never)")
+    parser.add_argument("--warmup", type=int, default=2, help="sequential requests before the first rate")
+    parser.add_argument("--pause", type=float, default=1, help="seconds between rates")
+    parser.add_argument("--payloads", type=int, default=16)
+    parser.add_argument("--records", type=int, default=2000, help="lines per synthetic VCF")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=parse_list(int), default=[1], help="comma-separated uvicorn worker counts")
+    parser.add_argument("--threads", type=parse_list(int), default=[40], help="comma-separated THREADPOOL_SIZE values")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE", help="extra service environment")
+    parser.add_argument("--llm-delay", type=float, default=0.3, help="mock LLM median seconds per completion")
+    parser.add_argument("--llm-latency", choices=LATENCY_DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--llm-sigma", type=float, default=0.5)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.payloads, args.records, seed=args.seed)
+    report = {
+        "rps": args.rps,
+        "duration_s": args.duration,
+        "arrival": args.arrival,
+        "payloads": len(payloads),
+        "drugs": len(DRUGS),
+        "configurations": [],
+    }
+    if args.url:
+        report["configurations"].append({"url": args.url, "levels": asyncio.run(run_configuration(args.url, payloads, args))})
+        print(json.dumps(report, indent=2))
+        return
+
+    report["mock_llm"] = {
+        "delay_s": args.llm_delay, "latency": args.llm_latency, "sigma": args.llm_sigma,
+        "error_rate": args.llm_error_rate, "error_status": args.llm_error_status,
+    }
+    for workers, threads in itertools.product(args.workers, args.threads):
+        server = MockLLMServer(
+            delay=args.llm_delay, latency=args.llm_latency, sigma=args.llm_sigma,
+            error_rate=args.llm_error_rate, error_status=args.llm_error_status, seed=args.seed,
+        ).start()
+        env = {
+            "GROQ_API_KEY": "load-test",
+            "GROQ_BASE_URL": server.base_url,
+            "EXPLANATION_CACHE_ENABLED": "false",
+            "RESULT_CACHE_ENABLED": "false",
+            **dict(item.split("=", 1) for item in args.env),
+        }
+        port = free_port()
+        process = start_service(port, workers, threads, env)
+        try:
+            levels = asyncio.run(run_configuration(f"http://127.0.0.1:{port}", payloads, args, process))
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+            server.stop()
+        report["configurations"].append({
+            "workers": workers,
+            "threads": threads,
+            "llm_completions": server.requests,
+            "llm_errors": server.errors,
+            "levels": levels,
+        })
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
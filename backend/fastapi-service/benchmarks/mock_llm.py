@@ -0,0 +1,195 @@
+"""Local stand-in for the Groq chat completions API.
+
+    python -m benchmarks.mock_llm --port 8765 --delay 0.2 [--status 503]
+    python -m benchmarks.mock_llm --delay 0.8 --latency lognormal --sigma 0.6 --error-rate 0.02
+
+Point the service at it with GROQ_BASE_URL=http://127.0.0.1:8765 and any GROQ_API_KEY.
+Faults: --delay makes every completion slow (a large value is a hung upstream) and
+--status answers every completion with that HTTP error instead.
+
+--latency draws each completion's delay around --delay: "fixed" (the default),
+"uniform" (0 to 2x), "exponential" (mean --delay) or "lognormal" (median --delay,
+spread --sigma; a long tail like real LLM APIs). --error-rate answers that fraction
+of completions with --error-status (429 for rate limiting, 5xx for outages).
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 0),
+        delay: float = 0.0,
+        status: int = 200,
+        latency: str = "fixed",
+        sigma: float = 0.5,
+        error_rate: float = 0.0,
+        error_status: int = 503,
+        seed: int | None = None,
+    ):
+        if latency not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"latency must be one of {', '.join(LATENCY_DISTRIBUTIONS)}")
+        super().__init__(address, _Handler)
+        self.delay = delay
+        self.status = status
+        self.latency = latency
+        self.sigma = sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.prompts = []
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        threading.Thread(target=self.serve_forever, name="mock-llm", daemon=True).start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def completion_text(self, prompt: str) -> str:
+        # JSON shaped like llm_service asks for: one object, or {"explanations": [...]}
+        # with an entry per item listed after "Items:".
+        explanation = {"summary": "Mock summary.", "mechanism": "Mock mechanism."}
+        if "Items:" not in prompt:
+            return json.dumps(explanation)
+        items = json.loads(prompt.split("Items:", 1)[1])
+        return json.dumps({"explanations": [{"id": item["id"], **explanation} for item in items]})
+
+    def delay_for(self, request_number: int) -> float:
+        # Seconds to wait before answering the request_number-th completion (1-based).
+        if self.latency == "fixed" or self.delay <= 0:
+            return self.delay
+        with self.lock:
+            if self.latency == "uniform":
+                return self.rng.uniform(0, 2 * self.delay)
+            if self.latency == "exponential":
+                return self.rng.expovariate(1 / self.delay)
+            return self.rng.lognormvariate(math.log(self.delay), self.sigma)
+
+    def status_for(self, request_number: int) -> int:
+        if self.status != 200:
+            return self.status
+        if self.error_rate > 0:
+            with self.lock:
+                if self.rng.random() < self.error_rate:
+                    return self.error_status
+        return 200
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get("content-length") or 0))
+        if self.path != COMPLETIONS_PATH:
+            self._send(404, {"error": {"message": "not found"}})
+            return
+
+        with server.lock:
+            server.requests += 1
+            request_number = server.requests
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        try:
+            delay = server.delay_for(request_number)
+            if delay:
+                time.sleep(delay)
+            status = server.status_for(request_number)
+            if status != 200:
+                with server.lock:
+                    server.errors += 1
+                self._send(status, {"error": {"message": "injected fault", "type": "server_error"}})
+                return
+            payload = json.loads(body or b"{}")
+            prompt = payload.get("messages", [{}])[-1].get("content", "")
+            with server.lock:
+                server.prompts.append(prompt)
+            self._send(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": server.completion_text(prompt)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            })
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def _send(self, status: int, payload: dict):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds to sleep per completion")
+    parser.add_argument("--status", type=int, default=200, help="HTTP status for every completion (fault injection)")
+    parser.add_argument("--latency", choices=LATENCY_DISTRIBUTIONS, default="fixed", help="distribution of the per-completion delay")
+    parser.add_argument("--sigma", type=float, default=0.5, help="lognormal spread (log-space standard deviation)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of completions answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    server = MockLLMServer(
+        (args.host, args.port),
+        delay=args.delay,
+        status=args.status,
+        latency=args.latency,
+        sigma=args.sigma,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    print(f"mock LLM listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
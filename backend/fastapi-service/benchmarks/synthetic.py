@@ -0,0 +1,109 @@
+import gzip
+import random
+
+HEADER_LINES = (
+    "##fileformat=VCFv4.2\n"
+    "##source=PharmaGuard_SyntheticBenchmark\n"
+    "##reference=GRCh38\n"
+    '##INFO=<ID=GENE,Number=1,Type=String,Description="Gene symbol">\n'
+    '##INFO=<ID=STAR,Number=1,Type=String,Description="Star allele designation">\n'
+    '##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">\n'
+    '##FORMAT=<ID=DP,Number=1,Type=Integer,Description="Read depth">\n'
+)
+
+def make_header(samples: int = 1) -> str:
+    names = "\t".join(f"SAMPLE_{i + 1:03d}" for i in range(samples))
+    return f"{HEADER_LINES}#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\t{names}\n"
+
+HEADER = make_header()
+
+# Real pharmacogene records at their GRCh38 positions (as in allele_definitions),
+# matching the ##reference=GRCh38 header.
+PGX_RECORDS = [
+    ("chr10", 94781859, "rs4244285", "G", "A", "CYP2C19", "*2"),
+    ("chr10", 94981296, "rs1057910", "A", "C", "CYP2C9", "*3"),
+    ("chr12", 21178615, "rs4149056", "T", "C", "SLCO1B1", "*5"),
+    ("chr6", 18138997, "rs1800460", "G", "A", "TPMT", "*3A"),
+    ("chr1", 97450058, "rs3918290", "C", "T", "DPYD", "*2A"),
+    ("chr22", 42128945, "rs3892097", "C", "T", "CYP2D6", "*4"),
+]
+
+CHROMS = [f"chr{i}" for i in range(1, 23)]
+BASES = "ACGT"
+GENOTYPES = ["0/0", "0/1", "1/1"]
+PHASED_GENOTYPES = ["0|0", "0|1", "1|0", "1|1"]
+CONSEQUENCES = ["intron_variant", "missense_variant", "synonymous_variant", "upstream_gene_variant", "3_prime_UTR_variant"]
+
+
+def _samples(rng: random.Random, samples: int, phased: bool) -> str:
+    genotypes = PHASED_GENOTYPES if phased else GENOTYPES
+    return "\t".join(f"{rng.choice(genotypes)}:{rng.randint(10, 90)}" for _ in range(samples))
+
+def _extra_info(rng: random.Random, info_fields: int) -> str:
+    # Annotation-heavy INFO columns (VEP/SnpEff style) are what dominate real files.
+    extra = []
+    for i in range(info_fields):
+        if i % 4 == 3:
+            extra.append(f"CSQ{i}=" + "|".join([rng.choice(CONSEQUENCES), "MODIFIER", f"ENSG{rng.randrange(10**11):011d}", "protein_coding"]))
+        else:
+            extra.append(f"X{i}={rng.random():.5f}")
+    return ";" + ";".join(extra) if extra else ""
+
+def _background_record(rng: random.Random, chrom: str, pos: int, samples: int = 1, phased: bool = False, info_fields: int = 0) -> str:
+    ref = rng.choice(BASES)
+    alt = rng.choice(BASES.replace(ref, ""))
+    info = f"AF={rng.random():.4f};DP={rng.randint(10, 90)};MQ=60" + _extra_info(rng, info_fields)
+    return f"{chrom}\t{pos}\t.\t{ref}\t{alt}\t99\tPASS\t{info}\tGT:DP\t{_samples(rng, samples, phased)}\n"
+
+def _pgx_record(rng: random.Random, record, samples: int = 1, phased: bool = False, info_fields: int = 0) -> str:
+    chrom, pos, rsid, ref, alt, gene, star = record
+    info = f"RS={rsid};GENE={gene};STAR={star};AF={rng.random():.4f}" + _extra_info(rng, info_fields)
+    return f"{chrom}\t{pos}\t{rsid}\t{ref}\t{alt}\t99\tPASS\t{info}\tGT:DP\t{_samples(rng, samples, phased)}\n"
+
+def iter_synthetic_lines(
+    target_bytes: int | None = None,
+    pgx_fraction: float = 0.001,
+    seed: int = 0,
+    records: int | None = None,
+    samples: int = 1,
+    info_fields: int = 0,
+    phased: bool = False,
+):
+    # Stops at `records` data lines or `target_bytes` of text, whichever is given.
+    if target_bytes is None and records is None:
+        raise ValueError("Give target_bytes or records")
+    rng = random.Random(seed)
+    header = make_header(samples)
+    yield header
+    written = len(header)
+    count = 0
+    chrom_index = 0
+    pos = 10_000
+    while (records is None or count < records) and (target_bytes is None or written < target_bytes):
+        if rng.random() < pgx_fraction:
+            line = _pgx_record(rng, rng.choice(PGX_RECORDS), samples, phased, info_fields)
+        else:
+            pos += rng.randint(50, 400)
+            if pos > 240_000_000:
+                chrom_index = (chrom_index + 1) % len(CHROMS)
+                pos = 10_000
+            line = _background_record(rng, CHROMS[chrom_index], pos, samples, phased, info_fields)
+        written += len(line)
+        count += 1
+        yield line
+
+def write_synthetic_vcf(path, target_bytes: int | None = None, compress: bool = False, pgx_fraction: float = 0.001, seed: int = 0, **options) -> int:
+    # `options` are the remaining iter_synthetic_lines knobs (records, samples, ...).
+    # Returns the uncompressed size in bytes.
+    opener = gzip.open if compress else open
+    size = 0
+    with opener(path, "wt", encoding="utf-8") as handle:
+        buffer = []
+        for line in iter_synthetic_lines(target_bytes, pgx_fraction=pgx_fraction, seed=seed, **options):
+            buffer.append(line)
+            size += len(line)
+            if len(buffer) >= 10_000:
+                handle.write("".join(buffer))
+                buffer.clear()
+        handle.write("".join(buffer))
+    return size
@@ -0,0 +1,66 @@
+import random
+import unittest
+
+import numpy as np
+
+from app.services.activity_score import (
+    ALLELE_FUNCTIONS,
+    activity_score,
+    call_phenotypes,
+    get_phenotype,
+    split_haplotype,
+)
+from app.services.phenotype_engine import PHENOTYPE_MAP
+
+
+class ActivityScoreTest(unittest.TestCase):
+    def test_agrees_with_phenotype_map(self):
+        for gene, diplotypes in PHENOTYPE_MAP.items():
+            for diplotype, phenotype in diplotypes.items():
+                left, right = diplotype.split("/")
+                self.assertEqual(get_phenotype(gene, diplotype), phenotype, (gene, diplotype))
+                self.assertEqual(get_phenotype(gene, f"{right} / {left}"), phenotype, (gene, diplotype))
+
+    def test_diplotypes_outside_the_map(self):
+        cases = [
+            ("CYP2D6", "*2/*4", "IM"),
+            ("CYP2D6", "*1/*4xN", "IM"),
+            ("CYP2D6", "*1x2/*4", "NM"),
+            ("CYP2D6", "*1/*1xN", "UM"),
+            ("CYP2D6", "*10/*10", "IM"),
+            ("CYP2D6", "*4/*41", "IM"),
+            ("CYP2C19", "*2/*17", "IM"),
+            ("CYP2C19", "*3/*3", "PM"),
+            ("TPMT", "*3B/*3C", "Low"),
+            ("DPYD", "*13/c.2846A>T", "Deficient"),
+            ("DPYD", "*1/c.2846A>T", "Intermediate"),
+        ]
+        for gene, diplotype, phenotype in cases:
+            self.assertEqual(get_phenotype(gene, diplotype), phenotype, (gene, diplotype))
+        self.assertEqual(activity_score("CYP2D6", "*1/*41"), 1.5)
+
+    def test_unknown_inputs(self):
+        self.assertEqual(get_phenotype("CYP2D6", "*99/*1"), "Unknown")
+        self.assertEqual(get_phenotype("CYP2D6", "garbage"), "Unknown")
+        self.assertEqual(get_phenotype("BRCA1", "*1/*1"), "Unknown")
+        self.assertIsNone(activity_score("CYP2D6", "*1/*1/*1"))
+
+    def test_split_haplotype(self):
+        self.assertEqual(split_haplotype("*4xN"), ("*4", 2))
+        self.assertEqual(split_haplotype(" *1X3 "), ("*1", 3))
+        self.assertEqual(split_haplotype("*2a"), ("*2A", 1))
+
+    def test_vectorized_matches_scalar(self):
+        rng = random.Random(0)
+        for gene, functions in ALLELE_FUNCTIONS.items():
+            alleles = [*functions, "*99", "*1xN", "*1x3"]
+            left = [rng.choice(alleles) for _ in range(500)]
+            right = [rng.choice(alleles) for _ in range(500)]
+            called = call_phenotypes(gene, np.array(left, dtype=object), np.array(right, dtype=object))
+            self.assertEqual(called.tolist(), [get_phenotype(gene, f"{a}/{b}") for a, b in zip(left, right)])
+        self.assertEqual(call_phenotypes("BRCA1", ["*1"], ["*1"]).tolist(), ["Unknown"])
+        self.assertEqual(call_phenotypes("CYP2D6", [], []).tolist(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.services import parser
+from app.services.allele_definitions import (
+    ALLELE_DEFINITIONS,
+    AlleleDefinitions,
+    export_definitions_tsv,
+    get_allele_definitions,
+    load_definitions_tsv,
+)
+from app.services.parser import parse_vcf_text
+
+HEADER = "##fileformat=VCFv4.2\n##reference=GRCh38\n#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tS1\n"
+
+
+def vcf(*records) -> str:
+    # records: (chrom, pos, id, ref, alt, gt[, info])
+    lines = []
+    for chrom, pos, rsid, ref, alt, gt, *info in records:
+        lines.append(f"{chrom}\t{pos}\t{rsid}\t{ref}\t{alt}\t99\tPASS\t{info[0] if info else 'DP=30'}\tGT:DP\t{gt}:30")
+    return HEADER + "\n".join(lines) + "\n"
+
+def diplotypes(text: str, prefilter: bool = True) -> dict:
+    return {v["gene"]: v["diplotype"] for v in parse_vcf_text(text, prefilter=prefilter)}
+
+
+class AlleleDefinitionIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.definitions = get_allele_definitions()
+
+    def rsid_dosages(self, **counts) -> dict:
+        return {self.definitions.rsids[rsid][0]: count for rsid, count in counts.items()}
+
+    def test_position_lookup(self):
+        hits = self.definitions.lookup("chr10", "94781859", "G", ["T", "A"])
+        self.assertEqual([(index, self.definitions.variants[vid][1]) for index, vid in hits], [(2, "rs4244285")])
+        self.assertEqual(self.definitions.lookup("10", 94781859, "G", ["A"]), self.definitions.lookup("chr10", 94781859, "g", ["a"]))
+        self.assertEqual(self.definitions.lookup("10", 94781859, "C", ["A"]), [])
+        self.assertEqual(self.definitions.lookup("10", 94781860, "G", ["A"]), [])
+        self.assertEqual(self.definitions.lookup("chrUn_gl000220", 1, "G", ["A"]), [])
+
+    def test_subsumption_partial_and_ambiguous_calls(self):
+        call = self.definitions.call
+        self.assertEqual(call("CYP2D6", self.rsid_dosages(rs3892097=1, rs1065852=2, rs1135840=2)), ["*4", "*10"])
+        self.assertEqual(call("CYP2D6", self.rsid_dosages(rs28371725=1, rs16947=2, rs1135840=2)), ["*41", "*2"])
+        self.assertEqual(call("TPMT", self.rsid_dosages(rs1800460=1, rs1142345=1)), ["*3A"])
+        self.assertEqual(call("TPMT", self.rsid_dosages(rs1800460=2, rs1142345=2)), ["*3A", "*3A"])
+        # Only the key variant listed: a partial *4.
+        self.assertEqual(call("CYP2D6", self.rsid_dosages(rs3892097=1)), ["*4"])
+        # 4180G>C alone is shared by *2 and *10 in equal measure: no call.
+        self.assertEqual(call("CYP2D6", self.rsid_dosages(rs1135840=1)), [])
+
+    def test_tsv_round_trip_and_errors(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "definitions.tsv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(export_definitions_tsv())
+            loaded = AlleleDefinitions(load_definitions_tsv(path))
+            self.assertEqual(loaded.variants, AlleleDefinitions(ALLELE_DEFINITIONS).variants)
+            self.assertEqual(loaded.alleles, AlleleDefinitions(ALLELE_DEFINITIONS).alleles)
+
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("CYP2C9\t*8\trs7900194\t10\n")
+            with self.assertRaises(ValueError):
+                load_definitions_tsv(path)
+
+
+class PositionCallingTest(unittest.TestCase):
+    def test_untagged_grch38_vcf(self):
+        text = vcf(
+            ("chr22", 42128945, ".", "C", "T", "0/1"),
+            ("chr22", 42130692, ".", "G", "A", "1/1"),
+            ("chr22", 42126611, ".", "C", "G", "1/1"),
+            ("chr10", 94781859, ".", "G", "A", "0/1"),
+            ("chr10", 94761900, ".", "C", "T", "0/1"),
+            ("chr6", 18138997, ".", "C", "T", "0/1"),
+            ("chr6", 18130687, ".", "T", "C", "0/1"),
+            ("chr1", 97082391, ".", "T", "A", "0/1"),
+            ("chr12", 21178615, ".", "T", "C", "0/0"),
+            ("chr1", 1000000, ".", "A", "G", "1/1"),
+        )
+        expected = {
+            "CYP2D6": "*4/*10",
+            "CYP2C19": "*2/*17",
+            "TPMT": "*1/*3A",
+            "DPYD": "*1/c.2846A>T",
+            "SLCO1B1": "*1/*1",
+        }
+        self.assertEqual(diplotypes(text), expected)
+        self.assertEqual(diplotypes(text, prefilter=False), expected)
+
+    def test_phased_genotypes_are_called_per_haplotype(self):
+        cis = vcf(("6", 18138997, ".", "C", "T", "1|0"), ("6", 18130687, ".", "T", "C", "1|0"))
+        trans = vcf(("6", 18138997, ".", "C", "T", "1|0"), ("6", 18130687, ".", "T", "C", "0|1"))
+        self.assertEqual(diplotypes(cis), {"TPMT": "*1/*3A"})
+        self.assertEqual(diplotypes(trans), {"TPMT": "*3B/*3C"})
+
+    def test_rsid_fallback_and_star_tags_win(self):
+        # GRCh37 coordinates: matched by rsID, ALT still checked.
+        grch37 = vcf(
+            ("chr10", 96541616, "rs4244285", "G", "A", "1/1"),
+            ("chr10", 96521657, "rs12248560", "C", "G", "0/1"),
+        )
+        self.assertEqual(diplotypes(grch37), {"CYP2C19": "*2/*2"})
+
+        tagged = vcf(("chr22", 42128945, "rs3892097", "C", "T", "0/1", "GENE=CYP2D6;STAR=*10"))
+        self.assertEqual(diplotypes(tagged), {"CYP2D6": "*1/*10"})
+
+    def test_definitions_from_tsv(self):
+        rows = export_definitions_tsv() + "CYP2C9\t*8\trs7900194\tchr10\t94942309\tG\tA\n"
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "definitions.tsv")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(rows)
+            caches = (get_allele_definitions, parser.known_rsids, parser.rsid_pattern)
+            for cache in caches:
+                cache.cache_clear()
+            try:
+                with patch.dict(os.environ, {"ALLELE_DEFINITIONS_PATH": path}):
+                    called = diplotypes(vcf(("10", 94942309, ".", "G", "A", "0/1")))
+            finally:
+                for cache in caches:
+                    cache.cache_clear()
+        self.assertEqual(called, {"CYP2C9": "*1/*8"})
+
+
+if __name__ == "__main__":
+    unittest.main()
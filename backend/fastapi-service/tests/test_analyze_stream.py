@@ -0,0 +1,104 @@
+import asyncio
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.result_cache import ResultCache
+
+PAYLOAD = {
+    "patient_id": "PATIENT_001",
+    "drugs": ["codeine", "warfarin"],
+    "variants": [{"gene": "CYP2D6", "diplotype": "*4/*4", "rsid": "rs3892097"}],
+}
+
+
+async def slow_codeine(gene, phenotype, drug, risk):
+    await asyncio.sleep(0.2 if drug == "codeine" else 0)
+    return {"summary": f"{drug} summary", "mechanism": f"{drug} mechanism"}
+
+
+def ndjson_events(body: str) -> list:
+    return [json.loads(line) for line in body.splitlines() if line]
+
+
+class AnalyzeStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.env = patch.dict(os.environ, {"RESULT_CACHE_ENABLED": "false"})
+        self.env.start()
+        self.explain = patch("app.services.pipeline.generate_explanation", side_effect=slow_codeine)
+        self.explain.start()
+
+    def tearDown(self):
+        self.explain.stop()
+        self.env.stop()
+
+    def test_results_come_before_explanations_in_completion_order(self):
+        response = self.client.post("/analyze/stream", json=PAYLOAD)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("application/x-ndjson"))
+        events = ndjson_events(response.text)
+        self.assertEqual(
+            [e["event"] for e in events],
+            ["header", "result", "result", "explanation", "explanation", "done"],
+        )
+        self.assertEqual(events[0]["data"]["patient_id"], "PATIENT_001")
+        self.assertIn("quality_metrics", events[0]["data"])
+        self.assertEqual([events[1]["data"]["drug"], events[2]["data"]["drug"]], ["codeine", "warfarin"])
+        self.assertEqual(events[1]["data"]["risk_assessment"]["risk_label"], "Ineffective")
+        # warfarin's explanation is ready first even though codeine was requested first
+        self.assertEqual([events[3]["data"]["index"], events[4]["data"]["index"]], [1, 0])
+        self.assertEqual(events[3]["data"]["llm_generated_explanation"]["summary"], "warfarin summary")
+        self.assertEqual(events[5]["data"], {"patient_id": "PATIENT_001", "results": 2})
+
+    def test_stream_matches_analyze(self):
+        streamed = ndjson_events(self.client.post("/analyze/stream", json=PAYLOAD).text)
+        full = self.client.post("/analyze", json=PAYLOAD).json()
+
+        results = {e["data"]["index"]: dict(e["data"]) for e in streamed if e["event"] == "result"}
+        for e in streamed:
+            if e["event"] == "explanation":
+                results[e["data"]["index"]]["llm_generated_explanation"] = e["data"]["llm_generated_explanation"]
+        for index, result in results.items():
+            del result["index"]
+            self.assertEqual(result, full["results"][index])
+
+    def test_server_sent_events(self):
+        response = self.client.post("/analyze/stream?format=sse", json=PAYLOAD)
+
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        self.assertEqual(response.headers["cache-control"], "no-cache")
+        blocks = [b for b in response.text.split("\n\n") if b]
+        self.assertEqual(blocks[0].split("\n")[0], "event: header")
+        self.assertEqual(blocks[-1].split("\n")[0], "event: done")
+        self.assertEqual(json.loads(blocks[-1].split("\n")[1][len("data: "):])["results"], 2)
+
+    def test_cached_response_is_replayed(self):
+        cache = ResultCache()
+        with patch.dict(os.environ, {"RESULT_CACHE_ENABLED": "true"}), \
+                patch("app.services.pipeline.get_result_cache", return_value=cache):
+            self.client.post("/analyze/stream", json=PAYLOAD)
+            self.explain.stop()
+            with patch("app.services.pipeline.generate_explanation") as explain:
+                events = ndjson_events(self.client.post("/analyze/stream", json=PAYLOAD).text)
+            self.explain.start()
+
+        explain.assert_not_called()
+        self.assertEqual(cache.stats()["stores"], 1)
+        explanations = [e["data"] for e in events if e["event"] == "explanation"]
+        self.assertEqual([e["drug"] for e in explanations], ["codeine", "warfarin"])
+        self.assertEqual(explanations[0]["llm_generated_explanation"]["summary"], "codeine summary")
+
+    def test_unsupported_drug_is_rejected_before_streaming(self):
+        response = self.client.post("/analyze/stream", json={**PAYLOAD, "drugs": ["not-a-drug"]})
+
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import json
+import multiprocessing
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.batch import evaluate_batch
+
+TESTS_DIR = Path(__file__).resolve().parent
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+
+
+class BatchAnalysisTest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.payloads = [
+            {
+                "patient_id": "PATIENT_001",
+                "drugs": DRUGS,
+                "vcf_content": (TESTS_DIR / "TC_P1_PATIENT_001_Normal.vcf").read_text(encoding="utf-8"),
+            },
+            {"patient_id": "BAD_DRUG", "drugs": ["notadrug"], "variants": []},
+            {"patient_id": "MISSING_DRUGS"},
+            {
+                "patient_id": "PATIENT_002",
+                "drugs": DRUGS,
+                "vcf_content": (TESTS_DIR / "TC_P2_PATIENT_002_HighRisk.vcf").read_text(encoding="utf-8"),
+            },
+        ]
+
+    @staticmethod
+    def _mock_explanation(*args, **kwargs):
+        return {"summary": "Mocked summary.", "mechanism": "Mocked mechanism."}
+
+    def _assert_batch(self, data):
+        self.assertEqual([r["index"] for r in data["results"]], [0, 1, 2, 3])
+        self.assertEqual([r["status"] for r in data["results"]], ["ok", "error", "error", "ok"])
+        self.assertEqual(data["results"][1]["error"]["status_code"], 400)
+        self.assertEqual(data["results"][2]["error"]["status_code"], 422)
+        self.assertEqual(data["results"][3]["response"]["patient_id"], "PATIENT_002")
+        risk = {r["drug"]: r["risk_assessment"]["risk_label"] for r in data["results"][3]["response"]["results"]}
+        self.assertEqual(risk["warfarin"], "Toxic")
+        self.assertEqual(data["succeeded"], 2)
+        self.assertEqual(data["failed"], 2)
+
+    def test_json_array_batch(self):
+        with patch("app.services.pipeline.generate_explanation", side_effect=self._mock_explanation):
+            response = self.client.post("/analyze/batch", json=self.payloads)
+        self.assertEqual(response.status_code, 200)
+        self._assert_batch(response.json())
+
+    def test_ndjson_batch_with_malformed_line(self):
+        body = "\n".join(json.dumps(p) for p in self.payloads) + "\n{not json\n"
+        with patch("app.services.pipeline.generate_explanation", side_effect=self._mock_explanation):
+            response = self.client.post(
+                "/analyze/batch", content=body, headers={"content-type": "application/x-ndjson"}
+            )
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        data["results"], last = data["results"][:4], data["results"][4]
+        data["failed"] -= 1
+        self._assert_batch(data)
+        self.assertEqual(last["error"]["status_code"], 400)
+
+    def test_identical_results_share_one_explanation_call(self):
+        payloads = [{**self.payloads[3], "patient_id": f"P{i}"} for i in range(20)]
+        with patch("app.services.pipeline.generate_explanation", side_effect=self._mock_explanation) as explain:
+            response = self.client.post("/analyze/batch", json=payloads)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["succeeded"], 20)
+        self.assertEqual(explain.call_count, len(DRUGS))
+
+    def test_process_pool_matches_inline(self):
+        inline = evaluate_batch(self.payloads)
+        with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as executor:
+            pooled = evaluate_batch(self.payloads, executor=executor)
+
+        for item in inline + pooled:
+            if item["ok"]:
+                item["response"].pop("timestamp")
+        self.assertEqual(pooled, inline)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import io
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import numpy as np
+
+from app.schemas.request import AnalysisRequest
+from app.services.cohort import parse_cohort_lines
+from app.services.parser import parse_variants
+from app.services.pipeline import analyze_variants
+
+TESTS_DIR = Path(__file__).resolve().parent
+
+COHORT_VCF = "\n".join([
+    "##fileformat=VCFv4.2",
+    "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tA\tB\tC\tD",
+    "chr10\t94781859\trs4244285\tG\tA\t99\tPASS\tGENE=CYP2C19;STAR=*2\tGT:DP\t0/0:30\t0/1:30\t1|1:30\t./.:0",
+    "chr10\t94761900\trs12248560\tC\tT\t99\tPASS\tGENE=CYP2C19;STAR=*17\tGT:DP\t0/1:30\t0/1:30\t0/0:30\t0/0:30",
+    "chr22\t42522613\trs3892097\tC\tT\t99\tPASS\tGENE=CYP2D6;STAR=*4\tDP:GT\t30:1/1\t30:0/0\t30:0/1\t30:0/0",
+    "chr1\t1000\t.\tA\tG\t99\tPASS\tAF=0.1\tGT\t0/1\t0/1\t0/1\t0/1",
+])
+
+
+class CohortParsingTest(unittest.TestCase):
+    def test_single_sample_matches_parse_variants(self):
+        for name in ("TC_P1_PATIENT_001_Normal.vcf", "TC_P2_PATIENT_002_HighRisk.vcf"):
+            vcf = (TESTS_DIR / name).read_text(encoding="utf-8")
+            cohort = parse_cohort_lines(io.StringIO(vcf))
+            expected = parse_variants(AnalysisRequest(patient_id="P", drugs=["warfarin"], vcf_content=vcf))
+            self.assertEqual(cohort.sample_variants(), [expected])
+
+    def test_matrix_and_per_sample_diplotypes(self):
+        cohort = parse_cohort_lines(COHORT_VCF.splitlines())
+
+        self.assertEqual(cohort.samples, ["A", "B", "C", "D"])
+        self.assertEqual(cohort.counts.dtype, np.int8)
+        self.assertEqual(cohort.counts.tolist(), [[0, 1, 2, 0], [1, 1, 0, 0], [2, 0, 1, 0]])
+        self.assertEqual(cohort.diplotypes("CYP2C19").tolist(), ["*1/*17", "*2/*17", "*2/*2", "*1/*1"])
+        self.assertEqual(cohort.diplotypes("CYP2D6").tolist(), ["*4/*4", "*1/*1", "*1/*4", "*1/*1"])
+
+    def test_phenotypes_for_the_whole_cohort(self):
+        cohort = parse_cohort_lines(COHORT_VCF.splitlines())
+        self.assertEqual(cohort.phenotypes("CYP2C19").tolist(), ["RM", "IM", "PM", "NM"])
+        self.assertEqual(cohort.phenotypes("CYP2D6").tolist(), ["PM", "NM", "IM", "NM"])
+        self.assertEqual(cohort.phenotypes("TPMT").tolist(), ["Normal"] * 4)
+
+    def test_sample_variants_feed_the_pipeline(self):
+        cohort = parse_cohort_lines(COHORT_VCF.splitlines())
+        sample, variants = list(cohort.iter_sample_variants())[2]
+
+        with patch("app.services.pipeline.generate_explanation", side_effect=lambda *args: {"summary": "s", "mechanism": "m"}):
+            response = analyze_variants(sample, ["clopidogrel"], variants)
+        self.assertEqual(response["patient_id"], "C")
+        self.assertEqual(response["results"][0]["pharmacogenomic_profile"]["phenotype"], "PM")
+
+
+if __name__ == "__main__":
+    unittest.main()
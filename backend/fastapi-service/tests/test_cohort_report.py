@@ -0,0 +1,192 @@
+import gzip
+import json
+import unittest
+from pathlib import Path
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.request import AnalysisRequest
+from app.services.cohort import parse_cohort_lines
+from app.services.cohort_report import CohortReport, report_payload_stream
+from app.services.parser import parse_variants
+
+TESTS_DIR = Path(__file__).resolve().parent
+DRUGS = ["codeine", "clopidogrel", "Plavix", "warfarin"]
+
+COHORT_VCF = "\n".join([
+    "##fileformat=VCFv4.2",
+    "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tA\tB\tC\tD",
+    "chr10\t94781859\trs4244285\tG\tA\t99\tPASS\tGENE=CYP2C19;STAR=*2\tGT:DP\t0/0:30\t0/1:30\t1|1:30\t./.:0",
+    "chr10\t94761900\trs12248560\tC\tT\t99\tPASS\tGENE=CYP2C19;STAR=*17\tGT:DP\t0/1:30\t0/1:30\t0/0:30\t0/0:30",
+    "chr22\t42522613\trs3892097\tC\tT\t99\tPASS\tGENE=CYP2D6;STAR=*4\tDP:GT\t30:1/1\t30:0/0\t30:0/1\t30:0/0",
+])
+# Unsupported gene, off-target GENE tag, INFO RS, an untagged background record.
+MIXED_VCF = "\n".join([
+    "##fileformat=VCFv4.2",
+    "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tA\tB\tC",
+    "chr17\t43045712\trs80357906\tG\tA\t99\tPASS\tGENE=BRCA1;STAR=*2\tGT\t0/1\t1/1\t0/0",
+    "chr10\t94781859\trs4244285\tG\tA\t99\tPASS\tGENE=CYP2C19;STAR=*2\tGT\t0/1\t0/0\t1|1",
+    "chr3\t1000\t.\tC\tT\t99\tPASS\tGENE=CYP2D6;STAR=*4\tGT\t1/1\t0/1\t0/0",
+    "chr10\t94981296\t.\tA\tC\t99\tPASS\tRS=rs1057910;GENE=CYP2C9;STAR=*3\tGT\t0/0\t0/1\t0/1",
+    "chr1\t1000\t.\tA\tG\t99\tPASS\tAF=0.1\tGT\t0/1\t0/1\t0/1",
+])
+# No STAR tags except one CYP2D6 record: calls come from the GRCh38 allele definitions,
+# phased TPMT in cis (C) and trans (D), a tagged sample (E) and a sample without calls (F).
+UNTAGGED_VCF = "\n".join([
+    "##fileformat=VCFv4.2",
+    "##reference=GRCh38",
+    "#CHROM\tPOS\tID\tREF\tALT\tQUAL\tFILTER\tINFO\tFORMAT\tA\tB\tC\tD\tE\tF",
+    "chr22\t42128945\t.\tC\tT\t99\tPASS\tDP=30\tGT\t0/1\t0/0\t0|1\t0/0\t0/0\t0/0",
+    "chr22\t42130692\t.\tG\tA\t99\tPASS\tDP=30\tGT\t1/1\t0/1\t0|1\t0/0\t1/1\t0/0",
+    "chr22\t42126611\t.\tC\tG\t99\tPASS\tDP=30\tGT\t1/1\t0/0\t0|0\t0/0\t0/0\t0/0",
+    "chr22\t42127941\trs16947\tG\tA\t99\tPASS\tGENE=CYP2D6;STAR=*2\tGT\t0/0\t0/0\t0/0\t0/0\t0/1\t0/0",
+    "chr10\t94781859\t.\tG\tA\t99\tPASS\tDP=30\tGT\t0/1\t1/1\t0/0\t0|1\t0/1\t0/0",
+    "chr10\t94761900\t.\tC\tT\t99\tPASS\tDP=30\tGT\t0/1\t0/0\t1/1\t0|1\t0/0\t0/0",
+    "chr6\t18138997\t.\tC\tT\t99\tPASS\tDP=30\tGT\t0/1\t0/0\t1|0\t1|0\t0/0\t0/0",
+    "chr6\t18130687\t.\tT\tC\t99\tPASS\tDP=30\tGT\t0/1\t0/0\t1|0\t0|1\t0/0\t0/0",
+    "chr1\t97082391\t.\tT\tA\t99\tPASS\tDP=30\tGT\t0/1\t0/0\t0/0\t1/1\t0/0\t0/0",
+    "chr1\t1000000\t.\tA\tG\t99\tPASS\tDP=30\tGT\t1/1\t1/1\t1/1\t1/1\t1/1\t1/1",
+])
+
+
+def single_sample(vcf: str, column: int) -> str:
+    # The cohort VCF cut down to its column-th sample.
+    lines = []
+    for line in vcf.splitlines():
+        fields = line.split("\t")
+        lines.append(line if line.startswith("##") else "\t".join(fields[:9] + [fields[9 + column]]))
+    return "\n".join(lines) + "\n"
+
+
+class CohortReportTest(unittest.TestCase):
+    def test_vectorized_cohort_matches_per_patient_counts(self):
+        cohort = parse_cohort_lines(COHORT_VCF.splitlines())
+        vectorized = CohortReport(DRUGS)
+        vectorized.add_cohort(cohort)
+        per_patient = CohortReport(DRUGS)
+        for _, variants in cohort.iter_sample_variants():
+            per_patient.add_variants(variants)
+
+        self.assertEqual(vectorized.to_dict(), per_patient.to_dict())
+        data = vectorized.to_dict()
+        self.assertEqual(data["patients"], 4)
+        self.assertEqual(data["genes"]["CYP2C19"]["phenotypes"]["PM"], 1)
+        self.assertEqual(data["genes"]["TPMT"]["missing"], 4)
+        self.assertEqual(data["drugs"]["codeine"]["risk_labels"]["Ineffective"], 1)
+        # Brand names count under their generic's rule.
+        self.assertEqual(data["drugs"]["Plavix"]["risk_labels"], data["drugs"]["clopidogrel"]["risk_labels"])
+
+    def test_cohort_vcf_matches_single_sample_parsing(self):
+        cohort = parse_cohort_lines(MIXED_VCF.splitlines())
+        per_sample = [
+            parse_variants(AnalysisRequest(patient_id=sample, drugs=DRUGS, vcf_content=single_sample(MIXED_VCF, j)))
+            for j, sample in enumerate(cohort.samples)
+        ]
+        self.assertEqual(cohort.sample_variants(), per_sample)
+        self.assertEqual(per_sample[0], [
+            {"gene": "CYP2C19", "diplotype": "*1/*2", "rsid": "rs4244285"},
+            {"gene": "CYP2D6", "diplotype": "*4/*4", "rsid": None},
+            {"gene": "CYP2C9", "diplotype": "*1/*1", "rsid": "rs1057910"},
+        ])
+
+        vectorized = CohortReport(DRUGS)
+        vectorized.add_cohort(cohort)
+        expected = CohortReport(DRUGS)
+        for variants in per_sample:
+            expected.add_variants(variants)
+        self.assertEqual(vectorized.to_dict(), expected.to_dict())
+
+    def test_untagged_cohort_is_called_from_allele_definitions(self):
+        drugs = DRUGS + ["azathioprine", "fluorouracil"]
+        cohort = parse_cohort_lines(UNTAGGED_VCF.splitlines())
+        per_sample = [
+            parse_variants(AnalysisRequest(patient_id=sample, drugs=drugs, vcf_content=single_sample(UNTAGGED_VCF, j)))
+            for j, sample in enumerate(cohort.samples)
+        ]
+        self.assertEqual(cohort.sample_variants(), per_sample)
+        calls = [{v["gene"]: v["diplotype"] for v in variants} for variants in per_sample]
+        self.assertEqual(calls[0], {"CYP2D6": "*4/*10", "CYP2C19": "*2/*17", "TPMT": "*1/*3A", "DPYD": "*1/c.2846A>T"})
+        self.assertEqual(calls[1]["CYP2C19"], "*2/*2")
+        self.assertEqual(calls[2]["TPMT"], "*1/*3A")
+        self.assertEqual(calls[3]["TPMT"], "*3B/*3C")
+        self.assertEqual(calls[4]["CYP2D6"], "*1/*2")
+        self.assertEqual(set(calls[5].values()), {"*1/*1"})
+
+        vectorized = CohortReport(drugs)
+        vectorized.add_cohort(cohort)
+        expected = CohortReport(drugs)
+        for variants in per_sample:
+            expected.add_variants(variants)
+        self.assertEqual(vectorized.to_dict(), expected.to_dict())
+        self.assertEqual(vectorized.to_dict()["genes"]["CYP2C19"]["phenotypes"]["PM"], 1)
+
+    def test_merged_halves_equal_the_whole(self):
+        payloads = [
+            {"patient_id": "P1", "vcf_content": (TESTS_DIR / "TC_P1_PATIENT_001_Normal.vcf").read_text(encoding="utf-8")},
+            {"patient_id": "P2", "vcf_content": (TESTS_DIR / "TC_P2_PATIENT_002_HighRisk.vcf").read_text(encoding="utf-8")},
+            {"patient_id": "P3", "variants": [{"gene": "CYP2C19", "diplotype": "*2/*2", "rsid": "rs4244285"}]},
+        ] * 3
+        whole = report_payload_stream(DRUGS, payloads)
+        halves = report_payload_stream(DRUGS, payloads[:4], chunk_size=2)
+        halves.merge(report_payload_stream(DRUGS, payloads[4:], chunk_size=2))
+
+        self.assertEqual(whole.to_dict(), halves.to_dict())
+        self.assertEqual(whole.patients, 9)
+        self.assertEqual(CohortReport.from_dict(whole.to_dict()).to_dict(), whole.to_dict())
+        with self.assertRaises(ValueError):
+            whole.merge(CohortReport(["codeine"]))
+
+    def test_failed_payloads_are_counted(self):
+        report = CohortReport(["codeine"])
+        report.add_payload("not an object")
+        report.add_payload({"patient_id": "X", "genotype_id": "missing"})
+        report.add_payload({"patient_id": "Y", "variants": [{"gene": "NOTAGENE", "diplotype": "*1/*1", "rsid": "rs1"}]})
+        report.add_payload({"patient_id": "Z", "variants": []})
+
+        self.assertEqual((report.patients, report.failed), (1, 3))
+
+
+class CohortReportApiTest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_vcf_body_plain_and_gzip(self):
+        for vcf in (COHORT_VCF, MIXED_VCF):
+            expected = CohortReport(DRUGS)
+            expected.add_cohort(parse_cohort_lines(vcf.splitlines()))
+
+            for body in (vcf.encode(), gzip.compress(vcf.encode())):
+                response = self.client.post("/cohort/report", params={"drugs": ",".join(DRUGS)}, content=body)
+                self.assertEqual(response.status_code, 200, response.text)
+                self.assertEqual(response.json(), expected.to_dict())
+
+    def test_ndjson_body(self):
+        lines = [
+            json.dumps({"patient_id": "A", "variants": [{"gene": "CYP2D6", "diplotype": "*4/*4", "rsid": "rs3892097"}]}),
+            "",
+            "{not json",
+            json.dumps({"patient_id": "B", "variants": [{"gene": "CYP2C19", "diplotype": "*17/*17", "rsid": "rs12248560"}]}),
+        ]
+        response = self.client.post(
+            "/cohort/report?drugs=codeine&drugs=clopidogrel",
+            content="\n".join(lines).encode(),
+            headers={"Content-Type": "application/x-ndjson"},
+        )
+
+        self.assertEqual(response.status_code, 200, response.text)
+        data = response.json()
+        self.assertEqual((data["patients"], data["failed"]), (2, 1))
+        self.assertEqual(data["genes"]["CYP2D6"]["phenotypes"]["PM"], 1)
+        self.assertEqual(data["drugs"]["codeine"]["risk_labels"]["Ineffective"], 1)
+        self.assertEqual(data["actionable_patients"], 1)
+
+    def test_unknown_or_missing_drug_is_rejected(self):
+        response = self.client.post("/cohort/report?drugs=warfarine", content=COHORT_VCF.encode())
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("warfarin", response.json()["detail"])
+        self.assertEqual(self.client.post("/cohort/report", content=COHORT_VCF.encode()).status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+SERVICE_DIR = Path(__file__).resolve().parent.parent
+
+
+class ColdStartTest(unittest.TestCase):
+    def test_entry_point_does_not_import_heavy_dependencies(self):
+        code = (
+            "import json, sys; sys.path.insert(0, 'api'); import index; "
+            "print(json.dumps([m for m in ('groq', 'httpx', 'dotenv', 'pandas', 'numpy', 'multiprocessing') if m in sys.modules]))"
+        )
+        out = subprocess.run([sys.executable, "-c", code], cwd=SERVICE_DIR, capture_output=True, text=True, check=True)
+        self.assertEqual(json.loads(out.stdout), [])
+
+    def test_prewarm_on_startup(self):
+        from app import main
+
+        with patch.dict(os.environ, {"PREWARM_ON_STARTUP": "true", "GROQ_API_KEY": "test-key"}), \
+                patch.object(main.llm_service, "get_client") as get_client:
+            with TestClient(main.app) as client:
+                self.assertEqual(client.get("/health").status_code, 200)
+        get_client.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
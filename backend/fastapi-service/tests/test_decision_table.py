@@ -0,0 +1,53 @@
+import unittest
+
+from app.services.confidence import get_confidence_score
+from app.services.cpic_rules import get_cpic_recommendation
+from app.services.decision_table import compile_decision_table, validation_report
+from app.services.drug_gene_map import get_drug_gene_map
+from app.services.phenotype_engine import PHENOTYPE_MAP, get_phenotype
+
+
+class DecisionTableTest(unittest.TestCase):
+    def setUp(self):
+        self.table = compile_decision_table()
+
+    def test_agrees_with_uncompiled_rules(self):
+        for drug, gene in get_drug_gene_map().items():
+            diplotypes = list(PHENOTYPE_MAP.get(gene, {}))
+            diplotypes += [f"{d.split('/')[1]} / {d.split('/')[0]}" for d in diplotypes]
+            diplotypes += ["*99/*1", "garbage"]
+            for diplotype in diplotypes:
+                for spelling in (drug, f" {drug.upper()} "):
+                    phenotype = get_phenotype(gene, diplotype)
+                    cpic = get_cpic_recommendation(gene, phenotype, spelling)
+                    rec = self.table.lookup(gene, diplotype, spelling)
+                    self.assertEqual(rec.phenotype, phenotype)
+                    self.assertEqual(
+                        (rec.risk_label, rec.severity, rec.action, rec.details),
+                        (cpic["risk_label"], cpic["severity"], cpic["action"], cpic["details"]),
+                    )
+                    self.assertEqual(rec.confidence_score, get_confidence_score(cpic.get("evidence", "C")))
+
+    def test_orderings_share_one_recommendation(self):
+        self.assertIs(
+            self.table.lookup("DPYD", "*2A/*1", "fluorouracil"),
+            self.table.lookup("DPYD", "*1/*2A", "fluorouracil"),
+        )
+        self.assertIs(
+            self.table.lookup("CYP2D6", "*1/*1", "codeine"),
+            self.table.lookup("CYP2D6", "*1/*2", "codeine"),
+        )
+
+    def test_validation_report(self):
+        report = validation_report(self.table)
+        # UM is reachable through copy number (*1/*1xN).
+        self.assertEqual(report["unreachable_rules"], [])
+        self.assertIn(
+            ("CYP2D6", "*1/*4", "codeine", "IM"),
+            {(u["gene"], u["diplotype"], u["drug"], u["phenotype"]) for u in report["unknown_diplotypes"]},
+        )
+        self.assertLess(report["distinct_recommendations"], report["entries"])
+
+
+if __name__ == "__main__":
+    unittest.main()
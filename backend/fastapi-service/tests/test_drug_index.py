@@ -0,0 +1,104 @@
+import unittest
+from unittest.mock import patch
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.drug_gene_builder import REQUIRED_DRUG_MAP
+from app.services.drug_gene_map import DRUG_ALIASES, resolve_drug
+from app.services.drug_index import DrugIndex, base_key, bounded_edit_distance, drug_key
+from app.services.pipeline import analyze_variants
+
+
+def extended_map(n: int = 3000) -> dict:
+    mapping = dict(REQUIRED_DRUG_MAP)
+    mapping.update({f"drug{i:05d}mab": "CYP2D6" for i in range(n)})
+    mapping.update({"mercaptopurine": "TPMT", "capecitabine": "DPYD", "tamoxifen": "CYP2D6"})
+    return mapping
+
+
+class DrugIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = DrugIndex(extended_map(), DRUG_ALIASES)
+
+    def test_keys(self):
+        self.assertEqual(drug_key(" 5-Fluoro uracil "), "5fluorouracil")
+        self.assertEqual(base_key("Clopidogrel Hydrogen Sulfate"), "clopidogrel")
+        self.assertEqual(base_key("sodium"), "sodium")
+
+    def test_resolve(self):
+        cases = {
+            "Warfarin": "warfarin",
+            "  WARFARIN  sodium ": "warfarin",
+            "clopidogrel bisulfate": "clopidogrel",
+            "Plavix": "clopidogrel",
+            "5-FU": "fluorouracil",
+            "5 fluorouracil": "fluorouracil",
+            "mercaptopurine hydrochloride monohydrate": "mercaptopurine",
+            "Xeloda": "capecitabine",
+            "drug00042-mab": "drug00042mab",
+        }
+        for name, drug in cases.items():
+            self.assertEqual(self.index.resolve(name), drug, name)
+        self.assertIsNone(self.index.resolve("aspirin"))
+        self.assertIsNone(self.index.resolve(""))
+
+    def test_aliases_to_drugs_outside_the_map_are_dropped(self):
+        index = DrugIndex(dict(REQUIRED_DRUG_MAP), DRUG_ALIASES)
+        self.assertIsNone(index.resolve("xeloda"))
+        self.assertEqual(index.resolve("coumadin"), "warfarin")
+
+    def test_prefix(self):
+        matches = self.index.prefix("Clop")
+        self.assertEqual([m["drug"] for m in matches], ["clopidogrel"])
+        self.assertEqual(matches[0]["gene"], "CYP2C19")
+
+        brands = {m["drug"]: m["matched"] for m in self.index.prefix("5-f")}
+        self.assertEqual(brands, {"fluorouracil": "5-fluorouracil"})
+        self.assertEqual(len(self.index.prefix("drug0", limit=7)), 7)
+        self.assertEqual(self.index.prefix("zzz"), [])
+
+    def test_suggest(self):
+        self.assertEqual(self.index.suggest("warfarine")[0], "warfarin")
+        self.assertEqual(self.index.suggest("clopidogrl bisulfate")[0], "clopidogrel")
+        self.assertEqual(self.index.suggest("tamoxifan"), ["tamoxifen"])
+        self.assertEqual(self.index.suggest("aspirin"), [])
+
+    def test_bounded_edit_distance(self):
+        self.assertEqual(bounded_edit_distance("kitten", "sitting", 5), 3)
+        self.assertEqual(bounded_edit_distance("kitten", "sitting", 2), 3)
+        self.assertEqual(bounded_edit_distance("a", "abcd", 1), 2)
+
+
+class DrugResolutionApiTest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    def test_drugs_endpoint(self):
+        body = self.client.get("/drugs", params={"prefix": "war"}).json()
+        self.assertEqual(body["prefix"], "war")
+        self.assertEqual(body["drugs"], [{"drug": "warfarin", "gene": "CYP2C9", "matched": "warfarin"}])
+        self.assertEqual(self.client.get("/drugs", params={"limit": 0}).status_code, 422)
+
+    def test_misses_suggest_close_names(self):
+        with self.assertRaises(HTTPException) as ctx:
+            resolve_drug("warfrin")
+        self.assertEqual(ctx.exception.status_code, 400)
+        self.assertIn("Did you mean: warfarin?", ctx.exception.detail)
+
+    def test_brand_names_get_the_generic_rule(self):
+        variants = [{"gene": "CYP2C19", "diplotype": "*2/*2", "rsid": "rs4244285"}]
+        with patch("app.services.pipeline.generate_explanation", side_effect=lambda *args: {"summary": "s", "mechanism": "m"}) as explain, \
+                patch.dict("os.environ", {"RESULT_CACHE_ENABLED": "false"}):
+            response = analyze_variants("P", ["Plavix", "clopidogrel"], variants)
+        brand, generic = response["results"]
+        self.assertEqual(brand["drug"], "Plavix")
+        # Explanations are keyed on the canonical name.
+        self.assertEqual([call.args[2] for call in explain.call_args_list], ["clopidogrel", "clopidogrel"])
+        self.assertEqual(brand["risk_assessment"], generic["risk_assessment"])
+        self.assertEqual(brand["risk_assessment"]["risk_label"], "Ineffective")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import os
+import stat
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from benchmarks.mock_llm import MockLLMServer
+from app.services import llm_service
+from app.services import explanation_cache
+from app.services.explanation_cache import ExplanationCache, make_key, reachable_combinations
+
+EXPLANATION = {"summary": "s", "mechanism": "m"}
+
+
+class ExplanationCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "explanations.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_memory_then_disk_tier(self):
+        cache = ExplanationCache(self.path, memory_size=1)
+        cache.put("a", EXPLANATION)
+        cache.put("b", EXPLANATION)
+
+        self.assertEqual(cache.get("b"), EXPLANATION)
+        self.assertEqual(cache.get("a"), EXPLANATION)
+        self.assertIsNone(cache.get("c"))
+        self.assertEqual(cache.stats()["memory_hits"], 1)
+        self.assertEqual(cache.stats()["disk_hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+        reopened = ExplanationCache(self.path)
+        self.assertEqual(reopened.get("a"), EXPLANATION)
+
+    def test_ttl_and_size_eviction(self):
+        cache = ExplanationCache(self.path, memory_size=0, ttl_seconds=-1)
+        cache.put("a", EXPLANATION)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats()["expired"], 1)
+
+        cache = ExplanationCache(self.path, memory_size=0, max_entries=2)
+        for key in ("a", "b", "c"):
+            cache.put(key, EXPLANATION)
+        self.assertEqual(cache.stats()["disk_entries"], 2)
+        self.assertIsNone(cache.get("a"))
+
+    def test_disk_tier_is_opt_in_and_private(self):
+        explanation_cache._build_cache.cache_clear()
+        try:
+            with patch.dict(os.environ, {"EXPLANATION_CACHE_ENABLED": "true"}):
+                os.environ.pop("EXPLANATION_CACHE_PATH", None)
+                self.assertIsNone(explanation_cache.get_explanation_cache().path)
+        finally:
+            explanation_cache._build_cache.cache_clear()
+        ExplanationCache(self.path)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_key_is_normalized(self):
+        self.assertEqual(
+            make_key("v1", "cyp2c9", " PM", "Warfarin ", "Toxic"),
+            make_key("v1", "CYP2C9", "PM", "warfarin", "Toxic"),
+        )
+
+    def test_reachable_combinations_cover_rules(self):
+        combos = set(reachable_combinations())
+        self.assertIn(("CYP2C9", "PM", "warfarin", "Toxic"), combos)
+        self.assertIn(("CYP2C19", "RM", "clopidogrel", "Safe"), combos)
+        self.assertIn(("TPMT", "Unknown", "azathioprine", "Unknown"), combos)
+
+    def test_repeat_explanations_skip_the_network(self):
+        server = MockLLMServer().start()
+        cache = ExplanationCache(self.path)
+        env = {"GROQ_API_KEY": "test-key", "GROQ_BASE_URL": server.base_url}
+        try:
+            with patch.dict(os.environ, env), patch.object(llm_service, "get_explanation_cache", return_value=cache):
+                for _ in range(3):
+                    explanation = llm_service.run_llm(
+                        llm_service.generate_explanation("CYP2C9", "PM", "warfarin", "Toxic")
+                    )
+        finally:
+            server.stop()
+
+        self.assertEqual(explanation["summary"], "Mock summary.")
+        self.assertEqual(server.requests, 1)
+        self.assertEqual(cache.stats()["memory_hits"], 2)
+
+    def test_disk_tier_runs_off_the_llm_loop(self):
+        cache = ExplanationCache(self.path, memory_size=0)
+        cache.put(llm_service.explanation_cache_key("CYP2C9", "PM", "warfarin", "Toxic"), EXPLANATION)
+        threads = []
+        get_disk = cache.get_disk
+
+        def recording_get_disk(key):
+            threads.append(threading.current_thread())
+            return get_disk(key)
+
+        with patch.object(cache, "get_disk", recording_get_disk), \
+                patch.object(llm_service, "get_explanation_cache", return_value=cache):
+            explanation = llm_service.run_llm(llm_service.generate_explanation("CYP2C9", "PM", "warfarin", "Toxic"))
+
+        async def loop_thread():
+            return threading.current_thread()
+
+        self.assertEqual(explanation, EXPLANATION)
+        self.assertEqual(len(threads), 1)
+        self.assertIsNot(threads[0], llm_service.run_llm(loop_thread()))
+
+
+if __name__ == "__main__":
+    unittest.main()
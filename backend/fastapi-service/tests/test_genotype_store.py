@@ -0,0 +1,165 @@
+import gzip
+import itertools
+import os
+import stat
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import genotype_store
+from app.services.genotype_store import GenotypeStore, genotype_id
+
+TESTS_DIR = Path(__file__).resolve().parent
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+PROFILE = [{"gene": "CYP2D6", "diplotype": "*4/*4", "rsid": "rs3892097"}]
+
+
+def profile(i: int) -> list:
+    return [{"gene": "CYP2C19", "diplotype": f"*1/*{i}", "rsid": None}]
+
+
+class GenotypeStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "genotypes.sqlite3")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_content_addressed_and_persistent(self):
+        store = GenotypeStore(self.path)
+        profile_id, created = store.put(PROFILE)
+        self.assertTrue(created)
+        self.assertEqual(profile_id, genotype_id([dict(v) for v in PROFILE]))
+        self.assertEqual(store.put(PROFILE), (profile_id, False))
+        self.assertNotEqual(store.put(profile(2))[0], profile_id)
+
+        self.assertEqual(GenotypeStore(self.path).get(profile_id), PROFILE)
+        self.assertIsNone(store.get("missing"))
+        self.assertEqual(store.stats()["stores"], 2)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o600)
+
+    def test_memory_only_by_default(self):
+        with patch.dict(os.environ, {"GENOTYPE_STORE_PATH": ""}):
+            genotype_store.get_genotype_store.cache_clear()
+            try:
+                self.assertIsNone(genotype_store.get_genotype_store().path)
+            finally:
+                genotype_store.get_genotype_store.cache_clear()
+
+    def test_reads_write_back_accessed_at_once_per_interval(self):
+        clock = SimpleNamespace(time=itertools.count(int(time.time())).__next__)
+        with patch.object(genotype_store, "time", clock):
+            store = GenotypeStore(self.path, ttl_seconds=100)
+            profile_id, _ = store.put(PROFILE)
+            for _ in range(25):
+                store.get(profile_id)
+            disk = GenotypeStore(self.path, memory_size=0, ttl_seconds=100)
+            for _ in range(25):
+                disk.get(profile_id)
+        # One write per 10 s (a tenth of the TTL) of a clock ticking 1 s per read.
+        self.assertEqual(store.stats()["touches"], 2)
+        self.assertEqual(disk.stats()["touches"], 2)
+
+    def test_least_recently_used_is_evicted(self):
+        clock = SimpleNamespace(time=itertools.count(int(time.time())).__next__)
+        with patch.object(genotype_store, "time", clock):
+            store = GenotypeStore(self.path, memory_size=1, max_entries=2, ttl_seconds=10)
+            first, _ = store.put(profile(1))
+            second, _ = store.put(profile(2))
+            store.get(first)
+            store.put(profile(3))
+
+        self.assertIsNotNone(store.get(first))
+        self.assertIsNone(store.get(second))
+        self.assertEqual(store.stats()["evictions"], 1)
+
+    def test_unused_profiles_expire(self):
+        store = GenotypeStore(self.path, memory_size=0, ttl_seconds=-1)
+        profile_id, _ = store.put(PROFILE)
+        self.assertIsNone(store.get(profile_id))
+        self.assertEqual(store.stats()["expired"], 1)
+
+
+class GenotypeApiTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.env = patch.dict(os.environ, {
+            "GENOTYPE_STORE_PATH": os.path.join(self.tmpdir.name, "genotypes.sqlite3"),
+            "RESULT_CACHE_ENABLED": "false",
+        })
+        self.env.start()
+        genotype_store.get_genotype_store.cache_clear()
+        self.explain = patch(
+            "app.services.pipeline.generate_explanation",
+            side_effect=lambda *args: {"summary": "s", "mechanism": "m"},
+        )
+        self.explain.start()
+        self.client = TestClient(app)
+        self.vcf_text = (TESTS_DIR / "TC_P2_PATIENT_002_HighRisk.vcf").read_text(encoding="utf-8")
+
+    def tearDown(self):
+        self.explain.stop()
+        genotype_store.get_genotype_store.cache_clear()
+        self.env.stop()
+        self.tmpdir.cleanup()
+
+    def test_upload_once_analyze_many(self):
+        created = self.client.post("/genotypes", json={"vcf_content": self.vcf_text})
+        self.assertEqual(created.status_code, 201)
+        body = created.json()
+        self.assertTrue(body["created"])
+        self.assertEqual(body["variant_count"], 6)
+
+        direct = self.client.post("/analyze", json={"patient_id": "P2", "drugs": DRUGS, "vcf_content": self.vcf_text}).json()
+        for drugs in (DRUGS, ["warfarin"]):
+            stored = self.client.post("/analyze", json={"patient_id": "P2", "drugs": drugs, "genotype_id": body["genotype_id"]})
+            self.assertEqual(stored.status_code, 200)
+            expected = [r for r in direct["results"] if r["drug"] in drugs]
+            self.assertEqual(stored.json()["results"], expected)
+            self.assertEqual(stored.json()["quality_metrics"], direct["quality_metrics"])
+
+    def test_raw_gzip_upload_gives_the_same_id(self):
+        json_id = self.client.post("/genotypes", json={"vcf_content": self.vcf_text}).json()["genotype_id"]
+        raw = self.client.post("/genotypes", content=gzip.compress(self.vcf_text.encode()),
+                               headers={"content-type": "application/gzip"})
+        self.assertEqual(raw.status_code, 201)
+        self.assertEqual(raw.json()["genotype_id"], json_id)
+        self.assertFalse(raw.json()["created"])
+
+    def test_get_and_missing(self):
+        profile_id = self.client.post("/genotypes", json={"variants": PROFILE}).json()["genotype_id"]
+        self.assertEqual(self.client.get(f"/genotypes/{profile_id}").json()["variants"], PROFILE)
+        # Ids are shared by identical profiles, so callers cannot delete them.
+        self.assertEqual(self.client.delete(f"/genotypes/{profile_id}").status_code, 405)
+
+        self.assertEqual(self.client.get("/genotypes/missing").status_code, 404)
+        response = self.client.post("/analyze", json={"patient_id": "P", "drugs": ["warfarin"], "genotype_id": "missing"})
+        self.assertEqual(response.status_code, 404)
+
+    def test_memory_only_store_feeds_the_batch_pool(self):
+        with patch.dict(os.environ, {"GENOTYPE_STORE_PATH": ""}):
+            genotype_store.get_genotype_store.cache_clear()
+            profile_id = self.client.post("/genotypes", json={"variants": PROFILE}).json()["genotype_id"]
+            payloads = [{"patient_id": f"P{i}", "drugs": ["codeine"], "genotype_id": profile_id} for i in range(8)]
+            payloads.append({"patient_id": "X", "drugs": ["codeine"], "genotype_id": "missing"})
+            data = self.client.post("/analyze/batch", json=payloads).json()
+        self.assertEqual(data["succeeded"], 8)
+        self.assertEqual(data["results"][8]["error"]["status_code"], 404)
+        self.assertEqual(data["results"][0]["response"]["results"][0]["pharmacogenomic_profile"]["diplotype"], "*4/*4")
+
+    def test_invalid_bodies(self):
+        self.assertEqual(self.client.post("/genotypes", json={}).status_code, 400)
+        self.assertEqual(self.client.post("/genotypes", json={"variants": [{"gene": "CYP2D6"}]}).status_code, 422)
+        self.assertEqual(self.client.post("/genotypes", json={"variants": [
+            {"gene": "BRCA1", "diplotype": "*1/*1", "rsid": "rs1"}]}).status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
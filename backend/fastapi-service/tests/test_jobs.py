@@ -0,0 +1,164 @@
+import glob
+import gzip
+import os
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import wait
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.jobs import (
+    CANCELLED,
+    FAILED,
+    SUCCEEDED,
+    InMemoryJobStore,
+    JobManager,
+    SQLiteJobStore,
+)
+
+TESTS_DIR = Path(__file__).resolve().parent
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+
+
+def _wait(manager, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in (SUCCEEDED, FAILED, CANCELLED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+class JobManagerTest(unittest.TestCase):
+    def test_progress_result_and_expiry(self):
+        for store in (InMemoryJobStore(), SQLiteJobStore(os.path.join(tempfile.mkdtemp(), "jobs.sqlite3"))):
+            manager = JobManager(store, result_ttl=0.2)
+
+            def work(payload, progress):
+                progress(lines_parsed=10)
+                progress(drugs_evaluated=2)
+                return {"echo": payload}
+
+            job = _wait(manager, manager.submit("analysis", work, {"x": 1})["id"])
+            self.assertEqual(job["status"], SUCCEEDED)
+            self.assertEqual(job["progress"], {"lines_parsed": 10, "drugs_evaluated": 2})
+            self.assertEqual(manager.result(job["id"]), {"echo": {"x": 1}})
+
+            time.sleep(0.25)
+            self.assertIsNone(manager.get(job["id"]))
+
+    def test_cancel_running_job(self):
+        manager = JobManager(InMemoryJobStore())
+        started = threading.Event()
+
+        def work(payload, progress):
+            started.set()
+            while True:
+                progress(lines_parsed=1)
+                time.sleep(0.01)
+
+        job_id = manager.submit("analysis", work, None)["id"]
+        started.wait(5)
+        manager.cancel(job_id)
+        self.assertEqual(_wait(manager, job_id)["status"], CANCELLED)
+
+    def test_job_finishing_during_submit_is_not_leaked(self):
+        manager = JobManager(InMemoryJobStore())
+        submit = manager._executor.submit
+
+        def submit_and_let_it_finish(*args):
+            # Give the job the chance to finish before submit registers its future.
+            future = submit(*args)
+            wait([future], timeout=0.5)
+            return future
+
+        def work(payload, progress):
+            raise ValueError("bad payload")
+
+        with patch.object(manager._executor, "submit", submit_and_let_it_finish):
+            job_id = manager.submit("analysis", work, None)["id"]
+        self.assertEqual(_wait(manager, job_id)["status"], FAILED)
+        self.assertEqual(manager._futures, {})
+
+
+class JobApiTest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    @staticmethod
+    def _mock_explanation(*args, **kwargs):
+        return {"summary": "Mocked summary.", "mechanism": "Mocked mechanism."}
+
+    def _poll(self, job_id):
+        for _ in range(500):
+            job = self.client.get(f"/jobs/{job_id}").json()
+            if job["status"] in (SUCCEEDED, FAILED, CANCELLED):
+                return job
+            time.sleep(0.01)
+        raise AssertionError("job did not finish")
+
+    def test_submit_poll_and_fetch(self):
+        payload = {
+            "patient_id": "PATIENT_002",
+            "drugs": DRUGS,
+            "vcf_content": (TESTS_DIR / "TC_P2_PATIENT_002_HighRisk.vcf").read_text(encoding="utf-8"),
+        }
+        with patch("app.services.pipeline.generate_explanation", side_effect=self._mock_explanation):
+            submitted = self.client.post("/jobs", json=payload)
+            self.assertEqual(submitted.status_code, 202)
+            job = self._poll(submitted.json()["id"])
+
+        self.assertEqual(job["status"], SUCCEEDED)
+        self.assertEqual(job["progress"]["drugs_evaluated"], len(DRUGS))
+        self.assertEqual(job["progress"]["lines_parsed"], 7)
+
+        result = self.client.get(f"/jobs/{job['id']}/result").json()
+        risk = {r["drug"]: r["risk_assessment"]["risk_label"] for r in result["results"]}
+        self.assertEqual(risk["codeine"], "Ineffective")
+
+    def test_vcf_upload_jobs(self):
+        vcf = (TESTS_DIR / "TC_P2_PATIENT_002_HighRisk.vcf").read_bytes()
+        spooled = os.path.join(tempfile.gettempdir(), "pharmaguard_upload_*")
+        before = set(glob.glob(spooled))
+        with patch("app.services.pipeline.generate_explanation", side_effect=self._mock_explanation):
+            raw = self.client.post(
+                "/jobs",
+                params={"patient_id": "PATIENT_002", "drugs": "codeine,warfarin"},
+                content=gzip.compress(vcf),
+                headers={"content-type": "application/gzip"},
+            )
+            multipart = self.client.post(
+                "/jobs",
+                data={"patient_id": "PATIENT_002", "drugs": ["codeine", "warfarin"]},
+                files={"file": ("patient.vcf", vcf, "text/plain")},
+            )
+            jobs = [self._poll(response.json()["id"]) for response in (raw, multipart)]
+
+        for job in jobs:
+            self.assertEqual(job["status"], SUCCEEDED)
+            self.assertEqual(job["progress"]["lines_parsed"], 7)
+            result = self.client.get(f"/jobs/{job['id']}/result").json()
+            risk = {r["drug"]: r["risk_assessment"]["risk_label"] for r in result["results"]}
+            self.assertEqual(risk, {"codeine": "Ineffective", "warfarin": "Toxic"})
+        self.assertEqual(set(glob.glob(spooled)), before)
+
+        missing = self.client.post("/jobs", content=vcf, headers={"content-type": "text/plain"})
+        self.assertEqual(missing.status_code, 400)
+        self.assertEqual(set(glob.glob(spooled)), before)
+
+    def test_failed_job_and_unknown_job(self):
+        job = self._poll(self.client.post("/jobs", json={"patient_id": "P", "drugs": ["notadrug"]}).json()["id"])
+        self.assertEqual(job["status"], FAILED)
+        self.assertEqual(job["error"]["status_code"], 400)
+        self.assertEqual(self.client.get(f"/jobs/{job['id']}/result").status_code, 409)
+        self.assertEqual(self.client.get("/jobs/does-not-exist").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
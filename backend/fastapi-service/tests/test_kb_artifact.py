@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.services.drug_gene_builder import build_drug_gene_map
+from app.services.kb_artifact import KnowledgeBase, build_artifact
+
+TSV = """Entity1_id\tEntity1_name\tEntity2_id\tEntity2_name\tAssociation
+PA1\tCYP2C19\tPA2\tClopidogrel\tassociated
+PA3\tCYP2D6\tPA4\tTramadol\tmetabolizes
+PA5\tCYP2C19\tPA6\t Tramadol \tAssociated
+PA7\tTPMT\tPA8\tMercaptopurine\tassociated
+PA9\tVKORC1\tPA10\tWarfarin\tassociated
+PA11\tDPYD\tPA12\tCapecitabine\tambiguous
+PA13\tCYP2C9\tPA14\tCélécoxib\taffects
+"""
+
+
+class KnowledgeBaseArtifactTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.tsv = os.path.join(self.dir, "relationships.tsv")
+        self.out = os.path.join(self.dir, "relationships.pgkb")
+        with open(self.tsv, "w", encoding="utf-8") as f:
+            f.write(TSV)
+        build_artifact(self.tsv, self.out)
+
+    def test_lookup_and_multiple_genes(self):
+        kb = KnowledgeBase(self.out)
+        self.assertEqual(list(kb), sorted(kb, key=lambda d: d.encode()))
+        self.assertEqual(len(kb), 4)
+        self.assertEqual(kb["tramadol"], "CYP2C19")
+        self.assertEqual(kb.links("tramadol"), [("CYP2C19", "associated"), ("CYP2D6", "metabolizes")])
+        self.assertEqual(kb["célécoxib"], "CYP2C9")
+        self.assertNotIn("warfarin", kb)
+        self.assertNotIn("capecitabine", kb)
+        self.assertIsNone(kb.get("unknown"))
+
+    def test_matches_pandas_loader(self):
+        env = {"ENABLE_EXTENDED_DRUG_MAP": "true", "RELATIONSHIPS_PATH": self.tsv}
+        with patch.dict(os.environ, dict(env, KB_ARTIFACT_PATH="")):
+            legacy = build_drug_gene_map()
+        with patch.dict(os.environ, dict(env, KB_ARTIFACT_PATH=self.out)):
+            compiled = build_drug_gene_map()
+        self.assertIsInstance(legacy, dict)
+        self.assertNotIsInstance(compiled, dict)
+        self.assertEqual(dict(compiled), legacy)
+
+
+if __name__ == "__main__":
+    unittest.main()
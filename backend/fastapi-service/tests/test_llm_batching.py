@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import unittest
+from unittest.mock import patch
+
+from benchmarks.mock_llm import MockLLMServer
+from app.services import llm_service, metrics
+from app.services.llm_service import parse_batch, parse_single
+from app.services.resilience import CircuitBreaker
+from app.services.pipeline import analyze_variants, explain_results, is_fallback
+
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+MOCK = {"summary": "Mock summary.", "mechanism": "Mock mechanism."}
+
+
+class ParseTest(unittest.TestCase):
+    def test_single(self):
+        self.assertEqual(parse_single(json.dumps({"summary": " S ", "mechanism": "M"})), {"summary": "S", "mechanism": "M"})
+        self.assertIsNone(parse_single("Summary line\nMechanism"))
+        self.assertIsNone(parse_single(json.dumps({"summary": "S"})))
+        self.assertIsNone(parse_single(json.dumps({"summary": "", "mechanism": "M"})))
+        self.assertIsNone(parse_single(json.dumps(["S", "M"])))
+
+    def test_batch_entries_are_validated_one_by_one(self):
+        content = json.dumps({"explanations": [
+            {"id": 2, "summary": "S2", "mechanism": "M2"},
+            {"id": "0", "summary": "S0", "mechanism": "M0"},
+            {"id": 1, "summary": "S1"},
+            {"id": 7, "summary": "S7", "mechanism": "M7"},
+            "junk",
+        ]})
+        self.assertEqual(parse_batch(content, 4), [
+            {"summary": "S0", "mechanism": "M0"}, None, {"summary": "S2", "mechanism": "M2"}, None,
+        ])
+
+    def test_batch_without_ids_or_json(self):
+        content = json.dumps([{"summary": "A", "mechanism": "a"}, {"summary": "B", "mechanism": "b"}])
+        self.assertEqual([e["summary"] for e in parse_batch(content, 2)], ["A", "B"])
+        self.assertEqual(parse_batch("not json", 3), [None, None, None])
+        self.assertEqual(parse_batch(json.dumps({"explanations": {}}), 1), [None])
+
+
+class PartialMockLLM(MockLLMServer):
+    # Answers a batch with item 0 missing and item 1 malformed.
+    def completion_text(self, prompt: str) -> str:
+        entries = json.loads(super().completion_text(prompt))["explanations"]
+        entries[1]["mechanism"] = 42
+        return json.dumps({"explanations": entries[1:]})
+
+
+class BatchedModeCase(unittest.TestCase):
+    server_class = MockLLMServer
+
+    def setUp(self):
+        self.server = self.server_class().start()
+        self.env = patch.dict(os.environ, {
+            "GROQ_API_KEY": "test-key",
+            "GROQ_BASE_URL": self.server.base_url,
+            "EXPLANATION_CACHE_ENABLED": "false",
+            "RESULT_CACHE_ENABLED": "false",
+        })
+        self.env.start()
+        self.patches = [
+            patch.object(llm_service, "LLM_EXPLANATION_MODE", "batched"),
+            patch.object(llm_service, "LLM_MAX_RETRIES", 0),
+            patch.object(llm_service, "_batcher", None),
+            patch.object(llm_service, "get_breaker", return_value=CircuitBreaker("llm-test", 100, 30)),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.env.stop()
+        self.server.stop()
+
+
+class BatchedModeTest(BatchedModeCase):
+    def test_one_completion_per_patient(self):
+        response = analyze_variants("P1", DRUGS, [])
+        self.assertEqual(self.server.requests, 1)
+        self.assertIn('"drug": "fluorouracil"', self.server.prompts[0])
+        for result in response["results"]:
+            self.assertEqual(result["llm_generated_explanation"], MOCK)
+
+    def test_concurrent_patients_share_a_micro_batch(self):
+        first = analyze_variants("P1", DRUGS[:3], [])["results"]
+        self.server.requests = 0
+
+        async def two_patients():
+            return await asyncio.gather(explain_results(first), explain_results(first + first[:1]))
+
+        explained = llm_service.run_llm(two_patients())
+        self.assertEqual(self.server.requests, 1)
+        # Equal (gene, phenotype, drug, risk) items are sent once.
+        self.assertEqual(len(json.loads(self.server.prompts[-1].split("Items:", 1)[1])), 3)
+        self.assertEqual([len(e) for e in explained], [3, 4])
+
+    def test_batches_are_capped(self):
+        with patch.object(llm_service, "LLM_BATCH_MAX_ITEMS", 2):
+            analyze_variants("P1", DRUGS, [])
+        self.assertEqual(self.server.requests, 3)
+
+    def test_upstream_error_falls_back_for_every_item(self):
+        self.server.status = 503
+        before = metrics.LLM_FALLBACKS.value("error")
+        response = analyze_variants("P1", DRUGS[:2], [])
+        self.assertEqual(self.server.requests, 1)
+        for result in response["results"]:
+            self.assertTrue(is_fallback(result, result["llm_generated_explanation"]))
+        if metrics.ENABLED:
+            self.assertEqual(metrics.LLM_FALLBACKS.value("error") - before, 2)
+
+    def test_cancelled_flush_resolves_its_waiters(self):
+        self.server.delay = 5
+        batcher = llm_service._get_batcher()
+
+        async def cancel_flush():
+            waiter = asyncio.ensure_future(llm_service.generate_explanation("CYP2C9", "PM", "warfarin", "Toxic"))
+            while not batcher._tasks:
+                await asyncio.sleep(0.005)
+            for task in list(batcher._tasks):
+                task.cancel()
+            return await asyncio.wait_for(waiter, 2)
+
+        explanation = llm_service.run_llm(cancel_flush())
+        self.assertEqual(explanation, llm_service.fallback_explanation("CYP2C9", "PM", "warfarin", "Toxic"))
+
+
+class ForkResetTest(unittest.TestCase):
+    def test_new_pid_resets_loop_bound_state(self):
+        parent_loop = llm_service.get_llm_loop()
+        with patch.object(llm_service, "_semaphore", asyncio.Semaphore(1)), \
+                patch.object(llm_service, "_batcher", llm_service.ExplanationBatcher(0.01, 2)), \
+                patch.object(llm_service, "_loop_pid", -1), \
+                patch.object(llm_service, "_loop", parent_loop):
+            child_loop = llm_service.get_llm_loop()
+            self.assertIsNot(child_loop, parent_loop)
+            self.assertIsNone(llm_service._semaphore)
+            self.assertIsNone(llm_service._batcher)
+            child_loop.call_soon_threadsafe(child_loop.stop)
+
+
+class PartialOutputTest(BatchedModeCase):
+    server_class = PartialMockLLM
+
+    def test_missing_and_malformed_items_fall_back(self):
+        before = metrics.LLM_FALLBACKS.value("malformed")
+        response = analyze_variants("P1", DRUGS[:3], [])
+        results = response["results"]
+        self.assertEqual(results[2]["llm_generated_explanation"], MOCK)
+        for result in results[:2]:
+            self.assertTrue(is_fallback(result, result["llm_generated_explanation"]))
+        if metrics.ENABLED:
+            self.assertEqual(metrics.LLM_FALLBACKS.value("malformed") - before, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
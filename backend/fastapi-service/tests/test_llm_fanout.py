@@ -0,0 +1,64 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from benchmarks.mock_llm import MockLLMServer
+from app.services import llm_service
+from app.services.pipeline import analyze_variants
+
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+
+
+class LLMFanOutTest(unittest.TestCase):
+    def setUp(self):
+        self.server = MockLLMServer(delay=0.3).start()
+        self.env = patch.dict(os.environ, {
+            "GROQ_API_KEY": "test-key",
+            "GROQ_BASE_URL": self.server.base_url,
+            "EXPLANATION_CACHE_ENABLED": "false",
+            "RESULT_CACHE_ENABLED": "false",
+        })
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        self.server.stop()
+
+    def test_drug_explanations_run_concurrently(self):
+        start = time.perf_counter()
+        response = analyze_variants("PATIENT_001", DRUGS, [])
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(self.server.requests, len(DRUGS))
+        self.assertGreater(self.server.max_in_flight, 1)
+        self.assertLess(elapsed, 0.3 * len(DRUGS) / 2)
+        for result in response["results"]:
+            self.assertEqual(result["llm_generated_explanation"]["summary"], "Mock summary.")
+            self.assertEqual(result["llm_generated_explanation"]["mechanism"], "Mock mechanism.")
+
+    def test_client_is_shared_and_connections_are_pooled(self):
+        self.server.delay = 0
+        for _ in range(3):
+            analyze_variants("PATIENT_001", ["warfarin"], [])
+
+        self.assertEqual(self.server.requests, 3)
+        self.assertEqual(self.server.connections, 1)
+        self.assertIs(
+            llm_service.get_client("test-key", self.server.base_url),
+            llm_service.get_client("test-key", self.server.base_url),
+        )
+
+    def test_unreachable_server_falls_back_to_template(self):
+        self.server.stop()
+        with patch.object(llm_service, "LLM_MAX_RETRIES", 0):
+            explanation = llm_service.run_llm(
+                llm_service.generate_explanation("CYP2C9", "PM", "warfarin", "Toxic")
+            )
+        self.server = MockLLMServer().start()
+
+        self.assertEqual(explanation, llm_service.fallback_explanation("CYP2C9", "PM", "warfarin", "Toxic"))
+
+
+if __name__ == "__main__":
+    unittest.main()
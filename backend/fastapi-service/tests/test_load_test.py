@@ -0,0 +1,78 @@
+import asyncio
+import os
+import statistics
+import unittest
+from unittest.mock import patch
+
+import httpx
+
+from app.main import app
+from app.services import llm_service
+from app.services.resilience import CircuitBreaker
+from benchmarks.load_test import make_payloads, percentile, run_level
+from benchmarks.mock_llm import MockLLMServer
+
+
+class MockLLMDistributionTest(unittest.TestCase):
+    def test_latency_distributions(self):
+        for latency in ("uniform", "exponential", "lognormal"):
+            server = MockLLMServer(delay=0.2, latency=latency, seed=1)
+            try:
+                delays = [server.delay_for(n) for n in range(1, 2001)]
+            finally:
+                server.server_close()
+            self.assertTrue(all(d >= 0 for d in delays))
+            self.assertGreater(len(set(delays)), 1000)
+            center = statistics.median(delays) if latency == "lognormal" else statistics.mean(delays)
+            self.assertAlmostEqual(center, 0.2, delta=0.03, msg=latency)
+
+        with self.assertRaises(ValueError):
+            MockLLMServer(latency="normal")
+
+    def test_error_rate(self):
+        server = MockLLMServer(error_rate=0.25, error_status=429, seed=1)
+        try:
+            statuses = [server.status_for(n) for n in range(1, 4001)]
+        finally:
+            server.server_close()
+        self.assertEqual(set(statuses), {200, 429})
+        self.assertAlmostEqual(statuses.count(429) / len(statuses), 0.25, delta=0.03)
+
+
+class LoadGeneratorTest(unittest.TestCase):
+    def test_percentile_is_nearest_rank(self):
+        values = list(range(1, 101))
+        self.assertEqual([percentile(values, q) for q in (50, 95, 99, 100)], [50, 95, 99, 100])
+        self.assertEqual(percentile([], 99), 0.0)
+
+    def test_open_loop_level_against_the_app(self):
+        server = MockLLMServer(delay=0.02, latency="exponential", seed=1).start()
+        env = {
+            "GROQ_API_KEY": "test-key",
+            "GROQ_BASE_URL": server.base_url,
+            "EXPLANATION_CACHE_ENABLED": "false",
+            "RESULT_CACHE_ENABLED": "false",
+        }
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await run_level(client, make_payloads(3, records=200), rps=40, duration=0.25, arrival="constant")
+
+        try:
+            with patch.dict(os.environ, env), \
+                    patch.object(llm_service, "get_breaker", return_value=CircuitBreaker("llm-test", 100, 30)):
+                level = asyncio.run(run())
+        finally:
+            server.stop()
+
+        self.assertEqual(level["sent"], 10)
+        self.assertEqual((level["ok"], level["error_rate"], level["dropped"]), (10, 0.0, 0))
+        self.assertEqual(server.requests, 60)
+        self.assertLessEqual(level["p50_ms"], level["p95_ms"])
+        self.assertLessEqual(level["p95_ms"], level["p99_ms"])
+        self.assertGreaterEqual(level["peak_in_flight"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import metrics
+
+TESTS_DIR = Path(__file__).resolve().parent
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.payload = {
+            "patient_id": "PATIENT_002",
+            "drugs": DRUGS,
+            "vcf_content": (TESTS_DIR / "TC_P2_PATIENT_002_HighRisk.vcf").read_text(encoding="utf-8"),
+        }
+
+    @staticmethod
+    def _mock_explanation(*args, **kwargs):
+        return {"summary": "Mocked summary.", "mechanism": "Mocked mechanism."}
+
+    def _analyze(self):
+        with patch.dict(os.environ, {"RESULT_CACHE_ENABLED": "false"}), \
+                patch("app.services.pipeline.generate_explanation", side_effect=self._mock_explanation):
+            response = self.client.post("/analyze", json=self.payload)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_server_timing_and_prometheus_output(self):
+        parsed_before = metrics.RECORDS_PARSED.value()
+        llm_before = metrics.STAGE_SECONDS.count("llm")
+
+        response = self._analyze()
+        stages = [entry.split(";")[0] for entry in response.headers["server-timing"].split(", ")]
+        self.assertEqual(stages, ["parse", "resolve", "rules", "llm", "app"])
+        self.assertEqual(metrics.RECORDS_PARSED.value() - parsed_before, 7)
+        self.assertEqual(metrics.STAGE_SECONDS.count("llm") - llm_before, 1)
+
+        text = self.client.get("/metrics").text
+        self.assertIn('pharmaguard_stage_duration_seconds_bucket{stage="parse",le="+Inf"}', text)
+        self.assertIn("# TYPE pharmaguard_vcf_records_skipped_total counter", text)
+        self.assertIn('pharmaguard_http_request_duration_seconds_count{method="POST",status="200"}', text)
+
+    def test_disabled(self):
+        with patch.object(metrics, "ENABLED", False):
+            count = metrics.STAGE_SECONDS.count("parse")
+            response = self._analyze()
+            self.assertNotIn("server-timing", response.headers)
+            self.assertEqual(metrics.STAGE_SECONDS.count("parse"), count)
+            self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
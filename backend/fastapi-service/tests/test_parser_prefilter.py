@@ -0,0 +1,95 @@
+import gzip
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from benchmarks.synthetic import iter_synthetic_lines
+from app.services import parser
+from app.services.gene_regions import pgx_region_index
+from app.services.parser import VcfAccumulator, genotype, info_value, parse_vcf_text
+from app.services.vcf_stream import parse_vcf_stream
+
+TESTS_DIR = Path(__file__).resolve().parent
+
+
+def full_scan(text: str) -> tuple:
+    accumulator = VcfAccumulator(prefilter=False)
+    for line in text.splitlines():
+        accumulator.add_line(line)
+    return accumulator.variants(), accumulator.lines_parsed, accumulator.lines_skipped
+
+
+class PositionPrefilterTest(unittest.TestCase):
+    def assert_same_as_full_scan(self, text: str):
+        variants, parsed, skipped = full_scan(text)
+        accumulator = VcfAccumulator(prefilter=True)
+        accumulator.add_text(text.rstrip("\n"))
+        self.assertEqual(accumulator.variants(), variants)
+        self.assertEqual((accumulator.lines_parsed, accumulator.lines_skipped), (parsed, skipped))
+
+        self.assertEqual(parse_vcf_text(text, prefilter=True), variants)
+        data = gzip.compress(text.encode())
+        self.assertEqual(parse_vcf_stream(data[i:i + 1000] for i in range(0, len(data), 1000)), variants)
+
+    def test_matches_full_scan_on_synthetic_genomes(self):
+        for seed in range(3):
+            text = "".join(iter_synthetic_lines(records=5000, pgx_fraction=0.02, seed=seed, info_fields=4 * seed, samples=seed + 1))
+            with patch.object(parser, "SCAN_BLOCK_CHARS", 4096):
+                self.assert_same_as_full_scan(text)
+
+    def test_matches_full_scan_on_fixtures(self):
+        for name in ("TC_P1_PATIENT_001_Normal.vcf", "TC_P2_PATIENT_002_HighRisk.vcf"):
+            text = (TESTS_DIR / name).read_text(encoding="utf-8")
+            self.assert_same_as_full_scan(text)
+            self.assert_same_as_full_scan(text.replace("\n", "\r\n"))
+            self.assert_same_as_full_scan("\n".join(l for l in text.splitlines() if not l.startswith("#")))
+
+    def test_known_rsid_outside_the_intervals_is_kept(self):
+        text = "chr2\t100\t.\tA\tG\t99\tPASS\tDP=3\tGT\t0/1\nchr10\t123\trs4244285\tG\tA\t99\tPASS\tSTAR=*2\tGT\t0/1"
+        self.assertEqual(parse_vcf_text(text, prefilter=True), [{"gene": "CYP2C19", "diplotype": "*1/*2", "rsid": "rs4244285"}])
+
+    def test_gene_tags_are_honoured_at_any_position(self):
+        text = "\n".join([
+            "chr3\t42128945\t.\tC\tT\t99\tPASS\tGENE=CYP2D6;STAR=*4\tGT\t1/1",
+            "chr22\t42128945\t.\tC\tT\t99\tPASS\tGENE=BRCA1;STAR=*4\tGT\t1/1",
+            "chr5\t100\t.\tA\tG\t99\tPASS\tDP=3;GENE=cyp2c9\tGT\t0/1",
+        ])
+        expected = [
+            {"gene": "CYP2D6", "diplotype": "*4/*4", "rsid": None},
+            {"gene": "CYP2C9", "diplotype": "*1/*1", "rsid": None},
+        ]
+        self.assertEqual(parse_vcf_text(text, prefilter=True), expected)
+        self.assertEqual(parse_vcf_text(text, prefilter=False), expected)
+        self.assert_same_as_full_scan(text)
+
+    def test_env_toggle(self):
+        with patch.dict("os.environ", {"VCF_POSITION_PREFILTER": "false"}):
+            self.assertIsNone(VcfAccumulator().regions)
+        with patch.dict("os.environ", {"VCF_POSITION_PREFILTER": "true"}):
+            self.assertIsNotNone(VcfAccumulator().regions)
+
+
+class FieldExtractionTest(unittest.TestCase):
+    def test_info_value(self):
+        info = "XGENE=A;GENE=CYP2D6;STAR=*4;FLAG"
+        self.assertEqual(info_value(info, "GENE"), "CYP2D6")
+        self.assertEqual(info_value(info, "STAR"), "*4")
+        self.assertIsNone(info_value(info, "RS"))
+        self.assertIsNone(info_value(info, "FLAG"))
+
+    def test_genotype(self):
+        self.assertEqual(genotype("GT:DP", "0|1:30"), "0|1")
+        self.assertEqual(genotype("DP:GT", "30:1/1"), "1/1")
+        self.assertIsNone(genotype("DP", "30"))
+
+    def test_region_index(self):
+        index = pgx_region_index()
+        self.assertTrue(index.contains("chr10", "94781859"))  # CYP2C19*2, GRCh38
+        self.assertTrue(index.contains("22", 42522613))       # CYP2D6*4, GRCh37
+        self.assertFalse(index.contains("chr10", "1000"))
+        self.assertFalse(index.contains("chrX", "94781859"))
+        self.assertFalse(index.contains("chr10", "."))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import os
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import profiling
+
+TESTS_DIR = Path(__file__).resolve().parent
+TOKEN = "test-profile-token"
+
+
+class ProfilingTest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.profile_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.profile_dir.cleanup)
+        env = patch.dict(os.environ, {
+            "PROFILE_DIR": self.profile_dir.name,
+            "GROQ_API_KEY": "",
+            "RESULT_CACHE_ENABLED": "false",
+            "EXPLANATION_CACHE_ENABLED": "false",
+        })
+        env.start()
+        self.addCleanup(env.stop)
+        self.payload = {
+            "patient_id": "SLOW_PATIENT",
+            "drugs": ["codeine", "clopidogrel"],
+            "vcf_content": (TESTS_DIR / "TC_P2_PATIENT_002_HighRisk.vcf").read_text(encoding="utf-8"),
+        }
+
+    def _headers(self, token=TOKEN, **extra):
+        return {"X-Profile-Token": token, **extra}
+
+    def test_off_without_a_configured_token(self):
+        with patch.object(profiling, "PROFILE_TOKEN", ""), \
+                patch.object(profiling, "profile_session", side_effect=AssertionError("profiled")):
+            response = self.client.post("/analyze", json=self.payload, headers=self._headers())
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("x-profile-id", response.headers)
+            self.assertEqual(self.client.get("/admin/profiles", headers=self._headers()).status_code, 404)
+
+    def test_requests_without_the_header_are_not_profiled(self):
+        with patch.object(profiling, "PROFILE_TOKEN", TOKEN), \
+                patch.object(profiling, "profile_session", side_effect=AssertionError("profiled")):
+            response = self.client.post("/analyze", json=self.payload)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("x-profile-id", response.headers)
+
+    def test_bad_token_and_mode(self):
+        with patch.object(profiling, "PROFILE_TOKEN", TOKEN):
+            self.assertEqual(self.client.post("/analyze", json=self.payload, headers=self._headers("wrong")).status_code, 403)
+            response = self.client.post("/analyze", json=self.payload, headers=self._headers(**{"X-Profile-Mode": "perf"}))
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(self.client.get("/admin/profiles", headers=self._headers("wrong")).status_code, 403)
+            self.assertEqual(self.client.get("/admin/profiles/..%2Fsecrets", headers=self._headers()).status_code, 404)
+
+    def test_profiles_in_both_modes(self):
+        with patch.object(profiling, "PROFILE_TOKEN", TOKEN):
+            for mode in profiling.PROFILE_MODES:
+                response = self.client.post("/analyze", json=self.payload, headers=self._headers(**{"X-Profile-Mode": mode}))
+                self.assertEqual(response.status_code, 200, mode)
+                self.assertEqual(response.json()["patient_id"], "SLOW_PATIENT")
+                profile_id = response.headers["x-profile-id"]
+
+                stored = self.client.get(f"/admin/profiles/{profile_id}?format=json", headers=self._headers()).json()
+                self.assertEqual(stored["mode"], mode)
+                self.assertGreater(stored["wall_ms"], 0)
+                self.assertIn("top_allocations", stored["memory"])
+
+                if mode == "trace":
+                    collapsed = self.client.get(f"/admin/profiles/{profile_id}?format=collapsed", headers=self._headers()).text
+                    self.assertTrue(any("run_analysis" in line and "parse_variants" in line for line in collapsed.splitlines()))
+                    for line in collapsed.splitlines():
+                        self.assertRegex(line, r"^\S.* \d+$")
+
+                speedscope = self.client.get(f"/admin/profiles/{profile_id}", headers=self._headers()).json()
+                profile = speedscope["profiles"][0]
+                frames = speedscope["shared"]["frames"]
+                self.assertEqual(profile["type"], "sampled")
+                self.assertEqual(len(profile["samples"]), len(profile["weights"]))
+                self.assertTrue(all(0 <= i < len(frames) for stack in profile["samples"] for i in stack))
+
+            listed = self.client.get("/admin/profiles", headers=self._headers()).json()
+            self.assertEqual([p["mode"] for p in listed], ["trace", "sample"])
+
+    def test_failing_requests_keep_their_profile(self):
+        with patch.object(profiling, "PROFILE_TOKEN", TOKEN):
+            response = self.client.post(
+                "/analyze", json={**self.payload, "drugs": ["notadrug"]}, headers=self._headers(**{"X-Profile-Mode": "trace"}),
+            )
+            self.assertEqual(response.status_code, 400)
+            profile_id = response.headers["x-profile-id"]
+            self.assertEqual(self.client.get(f"/admin/profiles/{profile_id}?format=json", headers=self._headers()).status_code, 200)
+
+    def test_one_profile_at_a_time_and_pruning(self):
+        with patch.object(profiling, "PROFILE_MAX_STORED", 2):
+            with profiling.profile_session("trace"):
+                with self.assertRaises(profiling.HTTPException) as ctx:
+                    with profiling.profile_session("trace"):
+                        pass
+                self.assertEqual(ctx.exception.status_code, 409)
+            for _ in range(3):
+                with profiling.profile_session("sample"):
+                    sum(range(1000))
+        self.assertEqual(len(profiling.list_profiles()), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
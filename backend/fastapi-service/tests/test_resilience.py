@@ -0,0 +1,198 @@
+import asyncio
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from benchmarks.mock_llm import MockLLMServer
+from app.services import llm_service, metrics
+from app.services.pipeline import analyze_variants
+from app.services.resilience import CircuitBreaker, CircuitOpenError, Deadline, hedged
+
+ARGS = ("CYP2C9", "PM", "warfarin", "Toxic")
+FALLBACK = llm_service.fallback_explanation(*ARGS)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=10, clock=self.clock)
+
+    def test_opens_after_consecutive_failures(self):
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_failure()
+        self.breaker.record_success()
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "closed")
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, "open")
+        self.assertFalse(self.breaker.allow())
+        self.assertEqual(self.breaker.stats()["rejected"], 1)
+
+    def test_half_open_probe_closes_or_reopens(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 10
+        self.assertEqual(self.breaker.state, "half_open")
+        self.assertTrue(self.breaker.allow())
+        self.assertFalse(self.breaker.allow())  # one probe at a time
+
+        self.breaker.record_failure()
+        self.assertEqual(self.breaker.state, "open")
+        self.clock.now = 15
+        self.assertFalse(self.breaker.allow())
+
+        self.clock.now = 20
+        self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_cancelled_probe_frees_its_slot(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+        self.clock.now = 10
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        async def cancel_probe():
+            task = asyncio.ensure_future(self.breaker.call(hang))
+            await asyncio.sleep(0)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_probe())
+        self.assertEqual(self.breaker.state, "half_open")
+        self.assertTrue(self.breaker.allow())
+
+    def test_call_raises_when_open(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+        async def never():
+            raise AssertionError("should not be called")
+
+        with self.assertRaises(CircuitOpenError):
+            asyncio.run(self.breaker.call(never))
+
+
+class HedgeAndDeadlineTest(unittest.TestCase):
+    def test_hedged_returns_the_faster_attempt(self):
+        delays = [1.0, 0.0]
+
+        async def attempt():
+            delay = delays.pop(0)
+            await asyncio.sleep(delay)
+            return delay
+
+        start = time.perf_counter()
+        self.assertEqual(asyncio.run(hedged(attempt, 0.05)), 0.0)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_hedged_fails_only_when_every_attempt_fails(self):
+        async def attempt():
+            await asyncio.sleep(0.1)
+            raise ValueError("down")
+
+        with self.assertRaises(ValueError):
+            asyncio.run(hedged(attempt, 0.01))
+
+    def test_deadline(self):
+        self.assertIsNone(Deadline(0).remaining())
+        self.assertFalse(Deadline(None).expired)
+        deadline = Deadline(5)
+        self.assertGreater(deadline.remaining(), 4)
+        self.assertTrue(Deadline(1e-9).expired)
+
+
+class LLMFaultInjectionTest(unittest.TestCase):
+    def setUp(self):
+        self.server = MockLLMServer().start()
+        self.env = patch.dict(os.environ, {
+            "GROQ_API_KEY": "test-key",
+            "GROQ_BASE_URL": self.server.base_url,
+            "EXPLANATION_CACHE_ENABLED": "false",
+            "RESULT_CACHE_ENABLED": "false",
+        })
+        self.env.start()
+        self.breaker = CircuitBreaker("llm-test", failure_threshold=2, reset_timeout=0.2)
+        self.patches = [
+            patch.object(llm_service, "get_breaker", return_value=self.breaker),
+            patch.object(llm_service, "LLM_MAX_RETRIES", 0),
+        ]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        self.env.stop()
+        self.server.stop()
+
+    def explain(self):
+        return llm_service.run_llm(llm_service.generate_explanation(*ARGS))
+
+    def test_slow_upstream_times_out(self):
+        self.server.delay = 2
+        before = metrics.LLM_FALLBACKS.value("timeout")
+        start = time.perf_counter()
+        with patch.object(llm_service, "LLM_TIMEOUT_SECONDS", 0.2):
+            self.assertEqual(self.explain(), FALLBACK)
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(metrics.LLM_FALLBACKS.value("timeout") - before, 1)
+
+    def test_breaker_opens_then_recovers_through_half_open(self):
+        self.server.status = 503
+        self.assertEqual(self.explain(), FALLBACK)
+        self.assertEqual(self.explain(), FALLBACK)
+        self.assertEqual(self.breaker.state, "open")
+
+        # Open: no call reaches the upstream.
+        before = metrics.LLM_FALLBACKS.value("circuit_open")
+        self.assertEqual(self.explain(), FALLBACK)
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(metrics.LLM_FALLBACKS.value("circuit_open") - before, 1)
+
+        self.server.status = 200
+        time.sleep(0.25)
+        self.assertEqual(self.breaker.state, "half_open")
+        self.assertEqual(self.explain()["summary"], "Mock summary.")
+        self.assertEqual(self.breaker.state, "closed")
+        self.assertEqual(self.server.requests, 3)
+
+    def test_request_budget_caps_the_whole_analysis(self):
+        self.server.delay = 2
+        before = metrics.LLM_FALLBACKS.value("deadline")
+        start = time.perf_counter()
+        with patch.object(llm_service, "LLM_REQUEST_BUDGET_SECONDS", 0.3):
+            response = analyze_variants("PATIENT_001", ["warfarin", "codeine"], [])
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(metrics.LLM_FALLBACKS.value("deadline") - before, 2)
+        for result in response["results"]:
+            self.assertIn("may affect response to", result["llm_generated_explanation"]["summary"])
+        # Abandoned calls are not held against the upstream.
+        self.assertEqual(self.breaker.state, "closed")
+
+    def test_hedged_attempt_beats_a_stalled_first_call(self):
+        self.server.delay_for = lambda n: 2 if n == 1 else 0
+        before = metrics.LLM_HEDGES.value()
+        start = time.perf_counter()
+        with patch.object(llm_service, "LLM_HEDGE_AFTER_SECONDS", 0.1):
+            self.assertEqual(self.explain()["summary"], "Mock summary.")
+        self.assertLess(time.perf_counter() - start, 1)
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(metrics.LLM_HEDGES.value() - before, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
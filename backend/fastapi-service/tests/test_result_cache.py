@@ -0,0 +1,97 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from app.services.pipeline import analyze_variants
+from app.services.result_cache import ResultCache, cache_version, fingerprint
+
+DRUGS = ["codeine", "warfarin"]
+VARIANTS = [
+    {"gene": "CYP2D6", "diplotype": "*4/*4", "rsid": "rs3892097"},
+    {"gene": "CYP2C9", "diplotype": "*1/*3", "rsid": "rs1057910"},
+]
+
+
+class ResultCacheTest(unittest.TestCase):
+    def test_fingerprint_ignores_irrelevant_differences(self):
+        version = cache_version()
+        base = fingerprint(VARIANTS, DRUGS, version)
+        self.assertEqual(base, fingerprint(list(reversed(VARIANTS)), DRUGS, version))
+        self.assertNotEqual(base, fingerprint(VARIANTS, list(reversed(DRUGS)), version))
+        self.assertNotEqual(base, fingerprint(VARIANTS[:1], DRUGS, version))
+        self.assertNotEqual(base, fingerprint(VARIANTS, DRUGS, version + "x"))
+
+    def test_single_flight_and_eviction(self):
+        cache = ResultCache(max_entries=2)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return {"value": len(calls)}, True
+
+        out = []
+        threads = [threading.Thread(target=lambda: out.append(cache.get_or_compute("k", compute))) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(out, [{"value": 1}] * 8)
+
+        cache.get_or_compute("a", lambda: ({}, True))
+        cache.get_or_compute("b", lambda: ({}, True))
+        stats = cache.stats()
+        self.assertEqual((stats["misses"], stats["coalesced"], stats["evictions"], stats["entries"]), (3, 7, 1, 2))
+
+        cache.sync_version("next")
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_waiters_recompute_when_leader_fails(self):
+        cache = ResultCache()
+        started = threading.Event()
+
+        def failing():
+            started.set()
+            time.sleep(0.1)
+            raise RuntimeError("cancelled")
+
+        errors = []
+
+        def lead():
+            try:
+                cache.get_or_compute("k", failing)
+            except RuntimeError as exc:
+                errors.append(exc)
+
+        leader = threading.Thread(target=lead)
+        leader.start()
+        started.wait(5)
+        self.assertEqual(cache.get_or_compute("k", lambda: ({"ok": True}, True)), {"ok": True})
+        leader.join()
+        self.assertEqual(len(errors), 1)
+
+    def test_analysis_hit_restamps_patient(self):
+        cache = ResultCache()
+        explain = {"summary": "Cached summary.", "mechanism": "Cached mechanism."}
+        with patch("app.services.pipeline.get_result_cache", return_value=cache), \
+                patch("app.services.pipeline.generate_explanation", return_value=explain) as mocked:
+            first = analyze_variants("PATIENT_A", DRUGS, VARIANTS)
+            second = analyze_variants("PATIENT_B", DRUGS, VARIANTS)
+
+        self.assertEqual(mocked.call_count, len(DRUGS))
+        self.assertEqual(second["patient_id"], "PATIENT_B")
+        self.assertEqual(second["results"], first["results"])
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_fallback_explanations_are_not_cached(self):
+        cache = ResultCache()
+        with patch("app.services.pipeline.get_result_cache", return_value=cache), \
+                patch.dict("os.environ", {"GROQ_API_KEY": "", "EXPLANATION_CACHE_ENABLED": "false"}):
+            analyze_variants("PATIENT_A", DRUGS, VARIANTS)
+        self.assertEqual((cache.stats()["uncacheable"], cache.stats()["entries"]), (1, 0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import serialization
+from app.services.serialization import negotiate_encoding, negotiate_media_type, respond
+
+TESTS_DIR = Path(__file__).resolve().parent
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+
+
+class NegotiationTest(unittest.TestCase):
+    def test_media_type(self):
+        self.assertEqual(negotiate_media_type(""), "application/json")
+        self.assertEqual(negotiate_media_type("*/*"), "application/json")
+        with patch.object(serialization, "msgpack", object()):
+            self.assertEqual(negotiate_media_type("application/msgpack"), "application/msgpack")
+            self.assertEqual(negotiate_media_type("application/x-msgpack, */*;q=0.1"), "application/msgpack")
+            self.assertEqual(negotiate_media_type("application/json, application/msgpack;q=0.5"), "application/json")
+            self.assertEqual(negotiate_media_type("application/msgpack;q=0"), "application/json")
+        with patch.object(serialization, "msgpack", None):
+            self.assertEqual(negotiate_media_type("application/msgpack"), "application/json")
+
+    def test_encoding(self):
+        self.assertIsNone(negotiate_encoding(""))
+        self.assertIsNone(negotiate_encoding("identity, gzip;q=0"))
+        self.assertEqual(negotiate_encoding("gzip, deflate"), "gzip")
+        with patch.object(serialization, "brotli", None):
+            self.assertEqual(negotiate_encoding("br, gzip"), "gzip")
+        with patch.object(serialization, "brotli", object()):
+            self.assertEqual(negotiate_encoding("br, gzip"), "br")
+            self.assertEqual(negotiate_encoding("br;q=0, gzip"), "gzip")
+
+    def test_disabled_passes_payload_through(self):
+        payload = {"results": []}
+        with patch.object(serialization, "ENABLED", False):
+            self.assertIs(respond(None, payload), payload)
+
+
+class FastResponseApiTest(unittest.TestCase):
+    def setUp(self):
+        self.env = patch.dict(os.environ, {"RESULT_CACHE_ENABLED": "false"})
+        self.env.start()
+        self.explain = patch(
+            "app.services.pipeline.generate_explanation",
+            side_effect=lambda *args: {"summary": "s", "mechanism": "m"},
+        )
+        self.explain.start()
+        self.client = TestClient(app)
+        vcf_text = (TESTS_DIR / "TC_P2_PATIENT_002_HighRisk.vcf").read_text(encoding="utf-8")
+        self.body = {"patient_id": "P2", "drugs": DRUGS, "vcf_content": vcf_text}
+
+    def tearDown(self):
+        self.explain.stop()
+        self.env.stop()
+
+    def post(self, path, body, enabled, **kwargs):
+        with patch.object(serialization, "ENABLED", enabled):
+            return self.client.post(path, json=body, **kwargs)
+
+    def without_timestamps(self, payload):
+        payload.pop("timestamp", None)
+        for item in payload.get("results", []):
+            (item.get("response") or {}).pop("timestamp", None)
+        return payload
+
+    def test_same_json_as_the_validated_path(self):
+        batch = [self.body, {"patient_id": "P3", "drugs": ["warfarin"], "variants": [{"gene": "BRCA1"}]}]
+        for path, body in (("/analyze", self.body), ("/analyze/batch", batch)):
+            default = self.post(path, body, enabled=False)
+            fast = self.post(path, body, enabled=True)
+            self.assertEqual(fast.status_code, default.status_code)
+            self.assertEqual(fast.headers["content-type"], "application/json")
+            self.assertEqual(self.without_timestamps(fast.json()), self.without_timestamps(default.json()))
+
+    def test_large_bodies_are_compressed(self):
+        with patch.object(serialization, "COMPRESS_MIN_BYTES", 0):
+            response = self.post("/analyze", self.body, enabled=True, headers={"accept-encoding": "gzip"})
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response.headers["vary"])
+        self.assertEqual(len(response.json()["results"]), len(DRUGS))
+
+        with patch.object(serialization, "COMPRESS_MIN_BYTES", 1 << 30):
+            response = self.post("/analyze", self.body, enabled=True, headers={"accept-encoding": "gzip"})
+        self.assertNotIn("content-encoding", response.headers)
+
+    def test_msgpack_falls_back_to_json_when_unavailable(self):
+        with patch.object(serialization, "msgpack", None):
+            response = self.post("/analyze", self.body, enabled=True, headers={"accept": "application/msgpack"})
+        self.assertEqual(response.headers["content-type"], "application/json")
+        self.assertEqual(response.json()["patient_id"], "P2")
+
+    @unittest.skipIf(serialization.msgpack is None, "msgpack not installed")
+    def test_msgpack(self):
+        response = self.post("/analyze", self.body, enabled=True, headers={"accept": "application/msgpack"})
+        self.assertEqual(response.headers["content-type"], "application/msgpack")
+        self.assertEqual(serialization.msgpack.unpackb(response.content)["patient_id"], "P2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import io
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.bgzf import BgzfReader
+from app.services.tabix import iter_region_lines, parse_index, write_bgzf_with_index
+from app.services.vcf_stream import iter_file_chunks, parse_indexed_vcf, parse_vcf_stream
+
+
+def _with_background(vcf_text: str, per_gap: int = 4000) -> list:
+    # Interleaves the fixture with non-PGx records so most BGZF blocks are irrelevant.
+    header = [l for l in vcf_text.splitlines() if l.startswith("#")]
+    records = [l for l in vcf_text.splitlines() if l and not l.startswith("#")]
+    by_chrom = {}
+    for record in records:
+        by_chrom.setdefault(record.split("\t")[0], []).append(record)
+
+    lines = list(header)
+    for chrom in sorted(by_chrom, key=lambda c: int(c[3:])):
+        pgx = sorted(by_chrom[chrom], key=lambda r: int(r.split("\t")[1]))
+        filler = [
+            f"{chrom}\t{1000 + i * 50}\t.\tA\tG\t50\tPASS\tAF=0.1;DP=30\tGT:DP\t0/1:30"
+            for i in range(per_gap)
+        ]
+        lines.extend(sorted(filler + pgx, key=lambda r: int(r.split("\t")[1])))
+    return lines
+
+
+class TabixRegionTest(unittest.TestCase):
+    def setUp(self):
+        vcf_text = (Path(__file__).resolve().parent / "TC_P1_PATIENT_001_Normal.vcf").read_text(encoding="utf-8")
+        self.lines = _with_background(vcf_text)
+        self.bgzf = io.BytesIO()
+        self.index = write_bgzf_with_index(self.lines, self.bgzf)
+
+    def test_indexed_parse_matches_full_scan(self):
+        self.bgzf.seek(0)
+        full = parse_vcf_stream(iter_file_chunks(self.bgzf))
+        self.bgzf.seek(0)
+        indexed = parse_indexed_vcf(self.bgzf, self.index)
+        self.assertEqual(indexed, full)
+
+    def test_only_pgx_blocks_are_decoded(self):
+        index = parse_index(self.index)
+        decoded = []
+        original = BgzfReader.read_block
+
+        def counting_read_block(reader, coffset):
+            decoded.append(coffset)
+            return original(reader, coffset)
+
+        with patch.object(BgzfReader, "read_block", counting_read_block):
+            records = [l for l in iter_region_lines(self.bgzf, index) if not l.startswith("#")]
+
+        self.assertEqual(len(records), len([l for l in self.lines if "GENE=" in l]))
+        total_blocks = self.bgzf.getvalue().count(b"\x1f\x8b\x08\x04")
+        self.assertLess(len(set(decoded)), total_blocks // 2)
+
+    @staticmethod
+    def _mock_explanation(*args, **kwargs):
+        return {"summary": "Mocked summary.", "mechanism": "Mocked mechanism."}
+
+    def test_multipart_upload_with_index(self):
+        client = TestClient(app)
+        with patch("app.services.pipeline.generate_explanation", side_effect=self._mock_explanation):
+            response = client.post(
+                "/analyze/upload",
+                data={"patient_id": "PATIENT_001", "drugs": "warfarin,clopidogrel"},
+                files={
+                    "file": ("patient.vcf.gz", self.bgzf.getvalue(), "application/gzip"),
+                    "index": ("patient.vcf.gz.tbi", self.index, "application/octet-stream"),
+                },
+            )
+
+        self.assertEqual(response.status_code, 200)
+        for result in response.json()["results"]:
+            self.assertEqual(result["risk_assessment"]["risk_label"], "Safe")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import gzip
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.schemas.request import AnalysisRequest
+from app.services.parser import parse_variants
+from app.services.vcf_stream import parse_vcf_stream
+
+DRUGS = ["codeine", "warfarin", "clopidogrel", "simvastatin", "azathioprine", "fluorouracil"]
+
+
+def _chunks(data: bytes, size: int):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class VcfStreamTest(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.vcf_text = (
+            Path(__file__).resolve().parent / "TC_P2_PATIENT_002_HighRisk.vcf"
+        ).read_text(encoding="utf-8")
+        self.expected = parse_variants(AnalysisRequest(patient_id="P", drugs=DRUGS, vcf_content=self.vcf_text))
+
+    @staticmethod
+    def _mock_explanation(*args, **kwargs):
+        return {"summary": "Mocked summary.", "mechanism": "Mocked mechanism."}
+
+    def test_plain_stream_matches_parse_variants_for_any_chunking(self):
+        data = self.vcf_text.encode("utf-8")
+        for size in (1, 7, 64, len(data)):
+            self.assertEqual(parse_vcf_stream(_chunks(data, size)), self.expected)
+
+    def test_multi_member_gzip_stream(self):
+        # BGZF is a series of independent gzip members.
+        lines = self.vcf_text.encode("utf-8").splitlines(keepends=True)
+        data = b"".join(gzip.compress(b"".join(lines[i:i + 3])) for i in range(0, len(lines), 3))
+        self.assertEqual(parse_vcf_stream(_chunks(data, 5)), self.expected)
+
+    def test_truncated_gzip_stream_is_rejected(self):
+        lines = self.vcf_text.encode("utf-8").splitlines(keepends=True)
+        members = [gzip.compress(b"".join(lines[i:i + 3])) for i in range(0, len(lines), 3)]
+        # Cut off in the middle of the second member.
+        data = members[0] + members[1][:len(members[1]) // 2]
+        with self.assertRaises(HTTPException) as raised:
+            parse_vcf_stream(_chunks(data, 5))
+        self.assertEqual(raised.exception.status_code, 400)
+        self.assertIn("truncated", raised.exception.detail)
+
+    def test_raw_gzip_upload(self):
+        with patch("app.services.pipeline.generate_explanation", side_effect=self._mock_explanation):
+            response = self.client.post(
+                "/analyze/upload",
+                params={"patient_id": "PATIENT_002", "drugs": "codeine,warfarin"},
+                content=gzip.compress(self.vcf_text.encode("utf-8")),
+                headers={"content-type": "application/gzip"},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        results_by_drug = {item["drug"]: item for item in response.json()["results"]}
+        self.assertEqual(results_by_drug["codeine"]["risk_assessment"]["risk_label"], "Ineffective")
+        self.assertEqual(results_by_drug["warfarin"]["risk_assessment"]["risk_label"], "Toxic")
+
+    def test_multipart_upload(self):
+        with patch("app.services.pipeline.generate_explanation", side_effect=self._mock_explanation):
+            response = self.client.post(
+                "/analyze/upload",
+                data={"patient_id": "PATIENT_002", "drugs": DRUGS},
+                files={"file": ("patient.vcf", self.vcf_text.encode("utf-8"), "text/plain")},
+            )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["patient_id"], "PATIENT_002")
+        self.assertEqual(len(data["results"]), len(DRUGS))
+        self.assertEqual(data["quality_metrics"]["parsed_variant_count"], len(self.expected))
+
+    def test_raw_upload_requires_drugs(self):
+        response = self.client.post("/analyze/upload", params={"patient_id": "P"}, content=b"#CHROM\n")
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()